@@ -39,6 +39,7 @@ def route__api__entity_type__network__entity_id(entity_type, entity_id):
         on_mobile=on_mobile,
         cache=True,
         roles=original_roles,
+        year=original_year,
         )
     if data is None:
         raise exceptions.APIError(message='No Data', status_code=400)
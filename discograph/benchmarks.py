@@ -0,0 +1,591 @@
+# -*- encoding: utf-8 -*-
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from discograph.library.Bootstrapper import Bootstrapper
+from discograph.library.BulkLoader import BulkLoader
+from discograph.library.CreditRole import CreditRole
+from discograph.library.PostgresEntity import PostgresEntity
+from discograph.library.PostgresMaster import PostgresMaster
+from discograph.library.PostgresModel import PostgresModel
+from discograph.library.PostgresRelation import PostgresRelation
+from discograph.library.PostgresRelease import PostgresRelease
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+xml_tags = (
+    'artist',
+    'label',
+    'master',
+    'release',
+    )
+
+
+ingest_sinks = (
+    'null',
+    'postgres',
+    )
+
+
+model_classes = {
+    'artist': PostgresEntity,
+    'label': PostgresEntity,
+    'master': PostgresMaster,
+    'release': PostgresRelease,
+    }
+
+
+skip_without = {
+    'master': ['title'],
+    'release': ['title'],
+    }
+
+
+def benchmark_reader(tag, threaded=False, repeat=3):
+    xml_path = Bootstrapper.get_xml_path(tag, test=True)
+    timings = []
+    for _ in range(repeat):
+        count = 0
+        start_time = time.time()
+        with Bootstrapper.open_xml(xml_path, threaded=threaded) as file_pointer:
+            for element in Bootstrapper.iterparse(file_pointer, tag):
+                count += 1
+        timings.append(time.time() - start_time)
+    return count, min(timings)
+
+
+def report_reader(tags=xml_tags, repeat=3):
+    template = '{:<8} {:>8} {:>12.1f} {:>12.1f} {:>8.2f}x'
+    print('{:<8} {:>8} {:>12} {:>12} {:>9}'.format(
+        'tag', 'records', 'serial/s', 'threaded/s', 'speedup'))
+    for tag in tags:
+        count, serial_time = benchmark_reader(
+            tag, threaded=False, repeat=repeat)
+        count, threaded_time = benchmark_reader(
+            tag, threaded=True, repeat=repeat)
+        print(template.format(
+            tag,
+            count,
+            count / serial_time,
+            count / threaded_time,
+            serial_time / threaded_time,
+            ))
+
+
+def benchmark_dates(procedure, scale=100000, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        Bootstrapper._release_date_cache.clear()
+        start_time = time.time()
+        for _ in range(scale):
+            for date_string in Bootstrapper.release_date_samples:
+                procedure(date_string)
+        timings.append(time.time() - start_time)
+    return min(timings)
+
+
+def benchmark_fields(elements, procedure, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start_time = time.time()
+        for element in elements:
+            procedure(element)
+        timings.append(time.time() - start_time)
+    return min(timings)
+
+
+def get_elements(tag):
+    xml_path = Bootstrapper.get_xml_path(tag, test=True)
+    with Bootstrapper.open_xml(xml_path) as file_pointer:
+        return list(Bootstrapper.iterparse(file_pointer, tag))
+
+
+legacy_release_mappings = {
+    'element_to_artist_credits': '_artists_mapping',
+    'element_to_company_credits': '_companies_mapping',
+    'element_to_tracks': '_tracks_mapping',
+    }
+
+
+def legacy_element_to_credits(element, mapping):
+    result = []
+    if element is None or not len(element):
+        return result
+    for subelement in element:
+        data = legacy_tags_to_fields(
+            PostgresRelease,
+            subelement,
+            ignore_none=True,
+            mapping=mapping,
+            )
+        result.append(data)
+    return result
+
+
+def legacy_tags_to_fields(
+    model_class,
+    element,
+    ignore_none=None,
+    mapping=None,
+    ):
+    data = {}
+    mapping = mapping or model_class._tags_to_fields_mapping
+    for child_element in element:
+        entry = mapping.get(child_element.tag, None)
+        if entry is None:
+            continue
+        field_name, procedure = entry
+        nested_mapping = None
+        if getattr(procedure, '__self__', None) is PostgresRelease:
+            nested_mapping = legacy_release_mappings.get(procedure.__name__)
+        if nested_mapping is not None:
+            value = legacy_element_to_credits(
+                child_element,
+                getattr(PostgresRelease, nested_mapping),
+                )
+        else:
+            value = procedure(child_element)
+        if ignore_none and value is None:
+            continue
+        data[field_name] = value
+    data = model_class.preprocess_data(data, element)
+    return data
+
+
+def report_fields(tags=xml_tags, repeat=3):
+    template = '{:<8} {:>8} {:>12.1f} {:>12.1f} {:>8.2f}x'
+    print('{:<8} {:>8} {:>12} {:>12} {:>9}'.format(
+        'tag', 'records', 'legacy/s', 'compiled/s', 'speedup'))
+    for tag in tags:
+        model_class = model_classes[tag]
+        elements = get_elements(tag)
+        mismatches = [
+            _ for _ in elements
+            if legacy_tags_to_fields(model_class, _) !=
+            model_class.extract_fields(_)
+            ]
+        if mismatches:
+            raise AssertionError('{}: {} records differ from legacy'.format(
+                tag, len(mismatches)))
+        legacy_time = benchmark_fields(
+            elements,
+            lambda _: legacy_tags_to_fields(model_class, _),
+            repeat=repeat,
+            )
+        compiled_time = benchmark_fields(
+            elements, model_class.extract_fields, repeat=repeat)
+        print(template.format(
+            tag,
+            len(elements),
+            len(elements) / legacy_time,
+            len(elements) / compiled_time,
+            legacy_time / compiled_time,
+            ))
+
+
+def report_dates(scale=100000, repeat=3):
+    count = scale * len(Bootstrapper.release_date_samples)
+    template = '{:<8} {:>8} {:>12.1f} {:>12.1f} {:>8.2f}x'
+    print('{:<8} {:>8} {:>12} {:>12} {:>9}'.format(
+        'field', 'dates', 'uncached/s', 'cached/s', 'speedup'))
+    uncached_time = benchmark_dates(
+        Bootstrapper.parse_release_date, scale=scale, repeat=repeat)
+    cached_time = benchmark_dates(
+        Bootstrapper.parse_release_date_cached, scale=scale, repeat=repeat)
+    print(template.format(
+        'released',
+        count,
+        count / uncached_time,
+        count / cached_time,
+        uncached_time / cached_time,
+        ))
+
+
+def get_role_texts():
+    xml_path = Bootstrapper.get_xml_path('release', test=True)
+    role_texts = []
+    with Bootstrapper.open_xml(xml_path) as file_pointer:
+        for element in Bootstrapper.iterparse(file_pointer, 'release'):
+            for role_element in element.iter('role'):
+                if role_element.text:
+                    role_texts.append(role_element.text)
+    return role_texts
+
+
+def legacy_parse_role(text):
+    name = ''
+    current_buffer = ''
+    details = []
+    had_detail = False
+    bracket_depth = 0
+    for character in text:
+        if character == '[':
+            bracket_depth += 1
+            if bracket_depth == 1 and not had_detail:
+                name = current_buffer
+                current_buffer = ''
+                had_detail = True
+            elif 1 < bracket_depth:
+                current_buffer += character
+        elif character == ']':
+            bracket_depth -= 1
+            if not bracket_depth:
+                details.append(current_buffer)
+                current_buffer = ''
+            else:
+                current_buffer += character
+        else:
+            current_buffer += character
+    if current_buffer and not had_detail:
+        name = current_buffer
+    name = name.strip()
+    detail = ', '.join(_.strip() for _ in details)
+    return name, detail or None
+
+
+def legacy_parse_roles(text):
+    credit_roles = []
+    current_text = ''
+    bracket_depth = 0
+    for character in text:
+        if character == '[':
+            bracket_depth += 1
+        elif character == ']':
+            bracket_depth -= 1
+        elif not bracket_depth and character == ',':
+            current_text = current_text.strip()
+            if current_text:
+                credit_roles.append(legacy_parse_role(current_text))
+            current_text = ''
+            continue
+        current_text += character
+    current_text = current_text.strip()
+    if current_text:
+        credit_roles.append(legacy_parse_role(current_text))
+    return tuple(credit_roles)
+
+
+def benchmark_legacy_roles(role_texts, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start_time = time.time()
+        for role_text in role_texts:
+            legacy_parse_roles(role_text)
+        timings.append(time.time() - start_time)
+    return min(timings)
+
+
+def benchmark_roles(role_texts, cache_size, repeat=3):
+    original_cache_size = CreditRole._role_cache_size
+    timings = []
+    try:
+        CreditRole._role_cache_size = cache_size
+        for _ in range(repeat):
+            CreditRole._role_cache.clear()
+            start_time = time.time()
+            for role_text in role_texts:
+                CreditRole.parse_roles(role_text)
+            timings.append(time.time() - start_time)
+    finally:
+        CreditRole._role_cache_size = original_cache_size
+        CreditRole._role_cache.clear()
+    return min(timings)
+
+
+def report_roles(repeat=3, scale=100):
+    role_texts = get_role_texts()
+    mismatches = [
+        _ for _ in set(role_texts)
+        if legacy_parse_roles(_) != tuple(CreditRole.parse_roles(_))
+        ]
+    role_texts = role_texts * scale
+    count = len(role_texts)
+    template = '{:<10} {:>8} {:>12.1f} {:>8.2f}x'
+    print('{} texts, {} unique, {} mismatches against legacy'.format(
+        count, len(set(role_texts)), len(mismatches)))
+    print('{:<10} {:>8} {:>12} {:>9}'.format(
+        'parser', 'texts', 'texts/s', 'speedup'))
+    legacy_time = benchmark_legacy_roles(role_texts, repeat=repeat)
+    uncached_time = benchmark_roles(role_texts, 0, repeat=repeat)
+    cached_time = benchmark_roles(
+        role_texts, CreditRole._role_cache_size, repeat=repeat)
+    for name, elapsed_time in (
+        ('legacy', legacy_time),
+        ('uncached', uncached_time),
+        ('cached', cached_time),
+        ):
+        print(template.format(
+            name,
+            count,
+            count / elapsed_time,
+            legacy_time / elapsed_time,
+            ))
+
+
+def get_peak_rss():
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return peak_rss / (1024. * 1024.)
+    return peak_rss / 1024.
+
+
+def time_stage(tag, stage, procedure):
+    start_rss = get_peak_rss()
+    start_time = time.time()
+    count = procedure()
+    elapsed_time = time.time() - start_time
+    peak_rss = get_peak_rss()
+    rss_growth = None
+    if peak_rss is not None:
+        rss_growth = peak_rss - start_rss
+    return {
+        'peak_rss_mb': peak_rss,
+        'records': count,
+        'records_per_second': count / elapsed_time if elapsed_time else 0.,
+        'rss_growth_mb': rss_growth,
+        'seconds': elapsed_time,
+        'stage': stage,
+        'tag': tag,
+        }
+
+
+def write_rows(model_class, rows, sink='null', batch_size=10000):
+    if sink == 'null':
+        with io.open(os.devnull, 'w', encoding='utf-8') as file_pointer:
+            loader = BulkLoader(
+                model_class,
+                batch_size=batch_size,
+                verbose=False,
+                sink=file_pointer,
+                )
+            with loader:
+                for row in rows:
+                    loader.add(row)
+        return len(rows)
+    database = model_class._meta.database
+    table_name = model_class._meta.db_table
+    benchmark_table_name = 'benchmark_{}'.format(table_name)
+    model_class.create_table_deferred(fail_silently=True)
+    with database.execution_context():
+        database.execute_sql('DROP TABLE IF EXISTS {}'.format(
+            benchmark_table_name))
+        database.execute_sql('CREATE UNLOGGED TABLE {} (LIKE {})'.format(
+            benchmark_table_name, table_name))
+    try:
+        loader = BulkLoader(
+            model_class,
+            batch_size=batch_size,
+            verbose=False,
+            table_name=benchmark_table_name,
+            )
+        with loader:
+            for row in rows:
+                loader.add(row)
+    finally:
+        with database.execution_context():
+            database.execute_sql('DROP TABLE IF EXISTS {}'.format(
+                benchmark_table_name))
+    return len(rows)
+
+
+def get_ingest_stages(tag, sink='null'):
+    stages = ['decompress', 'iterparse', 'tags_to_fields']
+    if tag == 'release':
+        stages.append('from_release')
+    stages.append('write:{}'.format(sink))
+    return stages
+
+
+def run_ingest_stage(tag, stage, batch_size=10000):
+    model_class = model_classes[tag]
+    xml_path = Bootstrapper.get_xml_path(tag, test=True)
+    sink = 'null'
+    if stage.startswith('write:'):
+        sink = stage.partition(':')[2]
+    state = {}
+    def decompress():
+        with Bootstrapper.open_xml(xml_path) as file_pointer:
+            state['data'] = file_pointer.read()
+        return len(state['data'])
+    def parse():
+        source = io.BytesIO(state.pop('data'))
+        iterator = Bootstrapper.iterparse(source, tag)
+        state['elements'] = list(Bootstrapper.clean_elements(iterator))
+        return len(state['elements'])
+    def extract():
+        rows = []
+        for element in state['elements']:
+            data = PostgresModel.element_to_bootstrap_data(
+                model_class,
+                element,
+                skip_without=skip_without.get(tag),
+                )
+            if data is not None:
+                rows.append(data)
+        state['rows'] = rows
+        return len(state['elements'])
+    def relate():
+        for document in state['documents']:
+            PostgresRelation.release_to_relation_records(document)
+        return len(state['documents'])
+    def write():
+        return write_rows(
+            model_class, state['rows'], sink=sink, batch_size=batch_size)
+    procedures = {
+        'decompress': decompress,
+        'iterparse': parse,
+        'tags_to_fields': extract,
+        'from_release': relate,
+        'write:{}'.format(sink): write,
+        }
+    stages = get_ingest_stages(tag, sink=sink)
+    for prerequisite in stages[:stages.index(stage)]:
+        if prerequisite != 'from_release':
+            procedures[prerequisite]()
+    if stage == 'from_release':
+        state['documents'] = []
+        for row in state['rows']:
+            document = model_class(**dict(row, id=int(row['id'])))
+            document.resolve_references({}, spuriously=True)
+            state['documents'].append(document)
+    return time_stage(tag, stage, procedures[stage])
+
+
+def benchmark_ingest(tag, sink='null', batch_size=10000):
+    results = []
+    for stage in get_ingest_stages(tag, sink=sink):
+        command = [
+            sys.executable, '-m', 'discograph.benchmarks', 'ingest-stage',
+            '--tag', tag,
+            '--stage', stage,
+            '--batch-size', str(batch_size),
+            ]
+        output = subprocess.check_output(command).decode('utf-8')
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    decompress_result, parse_result = results[:2]
+    decompress_result['bytes'] = decompress_result['records']
+    decompress_result['records'] = parse_result['records']
+    if decompress_result['seconds']:
+        decompress_result['records_per_second'] = (
+            parse_result['records'] / decompress_result['seconds'])
+    return results
+
+
+def report_ingest(tags=xml_tags, sink='null', batch_size=10000, output=None):
+    results = []
+    for tag in tags:
+        results.extend(benchmark_ingest(
+            tag, sink=sink, batch_size=batch_size))
+    template = '{:<8} {:<16} {:>8} {:>12.1f} {:>10.3f} {:>12} {:>10}'
+    print('{:<8} {:<16} {:>8} {:>12} {:>10} {:>12} {:>10}'.format(
+        'tag', 'stage', 'records', 'records/s', 'seconds', 'peak RSS MB',
+        'stage MB'))
+    for result in results:
+        peak_rss = result['peak_rss_mb']
+        rss_growth = result['rss_growth_mb']
+        print(template.format(
+            result['tag'],
+            result['stage'],
+            result['records'],
+            result['records_per_second'],
+            result['seconds'],
+            '{:.1f}'.format(peak_rss) if peak_rss is not None else '-',
+            '{:.1f}'.format(rss_growth) if rss_growth is not None else '-',
+            ))
+    if output is not None:
+        summary = {
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'results': results,
+            'sink': sink,
+            'timestamp': time.time(),
+            }
+        with open(output, 'w') as file_pointer:
+            json.dump(summary, file_pointer, indent=4, sort_keys=True)
+        print('Results written to {}'.format(output))
+    return results
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark discograph ingest on the test dumps.',
+        )
+    subparsers = parser.add_subparsers(dest='benchmark')
+    reader_parser = subparsers.add_parser(
+        'reader',
+        help='serial vs. threaded gzip decompression under iterparse',
+        )
+    reader_parser.add_argument('--repeat', type=int, default=3)
+    reader_parser.add_argument('--tag', action='append', choices=xml_tags)
+    dates_parser = subparsers.add_parser(
+        'dates',
+        help='uncached vs. cached release date parsing',
+        )
+    dates_parser.add_argument('--repeat', type=int, default=3)
+    dates_parser.add_argument('--scale', type=int, default=100000)
+    ingest_parser = subparsers.add_parser(
+        'ingest',
+        help='per-stage ingest throughput and peak RSS, one process per stage',
+        )
+    ingest_parser.add_argument('--tag', action='append', choices=xml_tags)
+    ingest_parser.add_argument('--sink', choices=ingest_sinks, default='null')
+    ingest_parser.add_argument('--batch-size', type=int, default=10000)
+    ingest_parser.add_argument('--output')
+    ingest_stage_parser = subparsers.add_parser(
+        'ingest-stage',
+        help='run one ingest stage in this process and print its result',
+        )
+    ingest_stage_parser.add_argument('--tag', choices=xml_tags, required=True)
+    ingest_stage_parser.add_argument('--stage', required=True)
+    ingest_stage_parser.add_argument('--batch-size', type=int, default=10000)
+    fields_parser = subparsers.add_parser(
+        'fields',
+        help='legacy tags_to_fields dispatch vs. compiled field extractors',
+        )
+    fields_parser.add_argument('--repeat', type=int, default=3)
+    fields_parser.add_argument('--tag', action='append', choices=xml_tags)
+    roles_parser = subparsers.add_parser(
+        'roles',
+        help='legacy vs. token-based vs. cached credit role parsing',
+        )
+    roles_parser.add_argument('--repeat', type=int, default=3)
+    roles_parser.add_argument('--scale', type=int, default=100)
+    args = parser.parse_args(args)
+    if args.benchmark == 'reader':
+        report_reader(tags=args.tag or xml_tags, repeat=args.repeat)
+    elif args.benchmark == 'dates':
+        report_dates(scale=args.scale, repeat=args.repeat)
+    elif args.benchmark == 'ingest':
+        report_ingest(
+            tags=args.tag or xml_tags,
+            sink=args.sink,
+            batch_size=args.batch_size,
+            output=args.output,
+            )
+    elif args.benchmark == 'ingest-stage':
+        result = run_ingest_stage(
+            args.tag,
+            args.stage,
+            batch_size=args.batch_size,
+            )
+        print(json.dumps(result, sort_keys=True))
+    elif args.benchmark == 'fields':
+        report_fields(tags=args.tag or xml_tags, repeat=args.repeat)
+    elif args.benchmark == 'roles':
+        report_roles(repeat=args.repeat, scale=args.scale)
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
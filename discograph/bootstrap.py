@@ -0,0 +1,139 @@
+# -*- encoding: utf-8 -*-
+import argparse
+from discograph.library.BootstrapThrottle import BootstrapThrottle
+from discograph.library.Bootstrapper import Bootstrapper
+from discograph.library.PostgresBootstrapState import PostgresBootstrapState
+from discograph.library.PostgresModel import PostgresModel
+
+
+def get_graph(args):
+    return PostgresModel.get_bootstrap_stage_graph(
+        pessimistic=args.pessimistic,
+        processes=args.processes,
+        bulk=args.bulk,
+        fused=args.fused,
+        )
+
+
+def report_stages(graph):
+    PostgresBootstrapState.create_table(True)
+    status = graph.get_status()
+    for stage in graph:
+        print('{} {}{}'.format(
+            '[x]' if status[stage.name] else '[ ]',
+            stage.name,
+            ' <- {}'.format(', '.join(stage.dependencies))
+            if stage.dependencies else '',
+            ))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Run the discograph Postgres bootstrap stage graph.',
+        )
+    parser.add_argument('--processes', type=int)
+    parser.add_argument('--pessimistic', action='store_true')
+    parser.add_argument('--no-bulk', dest='bulk', action='store_false')
+    parser.add_argument('--fused', action='store_true')
+    parser.add_argument('--test', action='store_true')
+    parser.add_argument(
+        '--shadow',
+        action='store_true',
+        help='operate on the shadow schema instead of the serving schema',
+        )
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser(
+        'list',
+        help='list stages, their dependencies and completion',
+        )
+    run_parser = subparsers.add_parser(
+        'run',
+        help='run pending stages, in parallel where dependencies allow',
+        )
+    run_parser.add_argument('--resume', action='store_true')
+    run_parser.add_argument(
+        '--no-swap',
+        dest='swap',
+        action='store_false',
+        help='with --shadow, leave the loaded shadow schema unswapped',
+        )
+    run_parser.add_argument(
+        '--duty-cycle',
+        type=float,
+        help='fraction of wall time each worker may spend loading (0-1]',
+        )
+    run_parser.add_argument(
+        '--pruning-profile',
+        choices=sorted(Bootstrapper.pruning_profiles),
+        help='graph-only omits release formats, identifiers and track '
+            'titles from the stored documents (default: full)',
+        )
+    run_parser.add_argument(
+        '--only',
+        action='append',
+        metavar='STAGE',
+        help='run only this stage (repeatable)',
+        )
+    run_parser.add_argument(
+        '--skip',
+        action='append',
+        metavar='STAGE',
+        help='treat this stage as completed (repeatable)',
+        )
+    run_parser.add_argument(
+        '--rerun',
+        action='append',
+        metavar='STAGE',
+        help='run this stage and its dependents again (repeatable)',
+        )
+    subparsers.add_parser(
+        'swap',
+        help='swap the shadow schema into service',
+        )
+    subparsers.add_parser(
+        'rollback',
+        help='swap the retired schema back into service',
+        )
+    args = parser.parse_args(args)
+    if args.test:
+        Bootstrapper.is_test = True
+    if args.command == 'list':
+        if args.shadow:
+            PostgresModel.create_schema(PostgresModel.shadow_schema)
+            PostgresModel.use_schema(PostgresModel.shadow_schema)
+        report_stages(get_graph(args))
+    elif args.command == 'run':
+        keywords = dict(
+            pessimistic=args.pessimistic,
+            processes=args.processes,
+            resume=args.resume,
+            bulk=args.bulk,
+            fused=args.fused,
+            pruning_profile=args.pruning_profile,
+            only=args.only,
+            skip=args.skip,
+            rerun=args.rerun,
+            )
+        if args.shadow:
+            PostgresModel.bootstrap_shadow_models(
+                swap=args.swap,
+                duty_cycle=args.duty_cycle,
+                **keywords
+                )
+        else:
+            if args.duty_cycle is not None:
+                BootstrapThrottle.set_duty_cycle(args.duty_cycle)
+            PostgresModel.bootstrap_postgres_models(**keywords)
+    elif args.command == 'swap':
+        PostgresModel.swap_schemas()
+    elif args.command == 'rollback':
+        PostgresModel.swap_schemas(
+            source_schema=PostgresModel.retired_schema,
+            retired_schema=PostgresModel.shadow_schema,
+            )
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
@@ -33,7 +33,14 @@ def get_entity(entity_type, entity_id):
         return query.get()
 
 
-def get_network(entity_id, entity_type, on_mobile=False, cache=True, roles=None):
+def get_network(
+    entity_id,
+    entity_type,
+    on_mobile=False,
+    cache=True,
+    roles=None,
+    year=None,
+    ):
     import discograph
     assert entity_type in ('artist', 'label')
     template = 'discograph:/api/{entity_type}/network/{entity_id}'
@@ -42,6 +49,7 @@ def get_network(entity_id, entity_type, on_mobile=False, cache=True, roles=None)
         entity_type,
         entity_id,
         roles=roles,
+        year=year,
         )
     if on_mobile:
         template = '{}/mobile'.format(template)
@@ -66,6 +74,7 @@ def get_network(entity_id, entity_type, on_mobile=False, cache=True, roles=None)
         degree=degree,
         max_nodes=max_nodes,
         roles=roles,
+        year=year,
         )
     with systemtools.Timer(exit_message='Network query time:'):
         with discograph.PostgresModel._meta.database.execution_context():
@@ -140,11 +149,11 @@ def parse_request_args(args):
         if key == 'year':
             value = args[key]
             try:
-                if '-' in year:
-                    start, _, stop = year.partition('-')
+                if '-' in value:
+                    start, _, stop = value.partition('-')
                     year = tuple(sorted((int(start), int(stop))))
                 else:
-                    year = int(year)
+                    year = int(value)
             except:
                 pass
         elif args_roles_pattern.match(key):
@@ -0,0 +1,237 @@
+# -*- encoding: utf-8 -*-
+import multiprocessing
+import signal
+import time
+import traceback
+from six.moves import queue
+from discograph.library.BootstrapTelemetry import BootstrapTelemetry
+from discograph.library.BootstrapThrottle import BootstrapThrottle
+
+
+class BootstrapScheduler(object):
+
+    ### CLASS VARIABLES ###
+
+    __slots__ = (
+        '_cancel_event',
+        '_failed_tasks',
+        '_finalizer',
+        '_initializer',
+        '_name',
+        '_procedure',
+        '_processes',
+        '_summary_path',
+        '_tasks',
+        '_telemetry',
+        '_worker_telemetry',
+        )
+
+    class Worker(multiprocessing.Process):
+
+        def __init__(
+            self,
+            procedure,
+            task_queue,
+            result_queue,
+            cancel_event,
+            initializer=None,
+            finalizer=None,
+            ):
+            multiprocessing.Process.__init__(self)
+            self.procedure = procedure
+            self.task_queue = task_queue
+            self.result_queue = result_queue
+            self.cancel_event = cancel_event
+            self.initializer = initializer
+            self.finalizer = finalizer
+
+        def run(self):
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            telemetry = BootstrapTelemetry(name=self.name)
+            context = None
+            if self.initializer is not None:
+                context = self.initializer()
+            try:
+                while not self.cancel_event.is_set():
+                    try:
+                        task = self.task_queue.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                    if task is None:
+                        break
+                    self.run_task(task, context, telemetry)
+            finally:
+                if self.finalizer is not None:
+                    self.finalizer(context)
+                self.result_queue.put(
+                    (self.name, None, 0, 0., telemetry.as_dict(), False))
+
+        def run_task(self, task, context, telemetry):
+            start_time = time.time()
+            count = 0
+            is_failed = False
+            try:
+                count = self.procedure(
+                    task, context, self.name, telemetry) or 0
+            except Exception:
+                is_failed = True
+                telemetry.increment('errors')
+                print('ERROR:', task, self.name)
+                traceback.print_exc()
+            telemetry.increment('tasks')
+            telemetry.increment('items', count)
+            elapsed_time = time.time() - start_time
+            if BootstrapThrottle.pause(elapsed_time):
+                telemetry.increment('throttled')
+            self.result_queue.put((
+                self.name,
+                task,
+                count,
+                elapsed_time,
+                telemetry.as_dict(),
+                is_failed,
+                ))
+
+    ### INITIALIZER ###
+
+    def __init__(
+        self,
+        procedure,
+        tasks,
+        processes=None,
+        initializer=None,
+        finalizer=None,
+        name='BOOTSTRAP',
+        interval=10.,
+        summary_path=None,
+        ):
+        self._procedure = procedure
+        self._tasks = list(tasks)
+        self._processes = processes or multiprocessing.cpu_count()
+        self._initializer = initializer
+        self._finalizer = finalizer
+        self._name = name
+        self._cancel_event = multiprocessing.Event()
+        self._failed_tasks = []
+        self._summary_path = summary_path
+        self._telemetry = BootstrapTelemetry(name=name, interval=interval)
+        self._worker_telemetry = {}
+
+    ### PUBLIC METHODS ###
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def get_telemetry(self):
+        telemetry = BootstrapTelemetry(
+            name=self.name,
+            start_time=self._telemetry.start_time,
+            )
+        for worker_telemetry in self._worker_telemetry.values():
+            telemetry.merge(worker_telemetry)
+        return telemetry
+
+    def report(self):
+        for worker_name in sorted(self._worker_telemetry):
+            self._worker_telemetry[worker_name].report(annotation=self.name)
+        self.get_telemetry().write_summary(
+            self._summary_path,
+            workers=self._worker_telemetry,
+            )
+
+    def run(self):
+        self._failed_tasks = []
+        if not self.tasks:
+            return 0
+        task_queue = multiprocessing.Queue()
+        result_queue = multiprocessing.Queue()
+        for task in self.tasks:
+            task_queue.put(task)
+        process_count = min(self.processes, len(self.tasks))
+        for _ in range(process_count):
+            task_queue.put(None)
+        workers = [
+            self.Worker(
+                self._procedure,
+                task_queue,
+                result_queue,
+                self._cancel_event,
+                initializer=self._initializer,
+                finalizer=self._finalizer,
+                )
+            for _ in range(process_count)
+            ]
+        for worker in workers:
+            worker.start()
+        finished = 0
+        stopped = 0
+        try:
+            while stopped < len(workers):
+                try:
+                    (
+                        worker_name,
+                        task,
+                        count,
+                        elapsed_time,
+                        telemetry,
+                        is_failed,
+                        ) = result_queue.get(timeout=1)
+                except queue.Empty:
+                    if not any(_.is_alive() for _ in workers):
+                        break
+                    continue
+                self._worker_telemetry[worker_name] = \
+                    BootstrapTelemetry.from_dict(telemetry)
+                if task is None:
+                    stopped += 1
+                    continue
+                if is_failed:
+                    self._failed_tasks.append(task)
+                    continue
+                finished += 1
+                if self._telemetry.maybe_report():
+                    self.get_telemetry().report(
+                        progress=float(finished) / len(self.tasks))
+        except KeyboardInterrupt:
+            print(u'{} [SCHEDULER] CANCELLING: waiting for {} workers'.format(
+                self.name, len(workers)))
+            self.cancel()
+            task_queue.cancel_join_thread()
+            raise
+        finally:
+            for worker in workers:
+                worker.join()
+            self.report()
+        if self._failed_tasks:
+            raise RuntimeError('{} [SCHEDULER] {} failed tasks: {}'.format(
+                self.name,
+                len(self._failed_tasks),
+                ', '.join(repr(_) for _ in self._failed_tasks),
+                ))
+        unfinished = len(self.tasks) - finished
+        if unfinished:
+            raise RuntimeError('{} [SCHEDULER] {} unfinished tasks'.format(
+                self.name, unfinished))
+        return finished
+
+    ### PUBLIC PROPERTIES ###
+
+    @property
+    def failed_tasks(self):
+        return list(self._failed_tasks)
+
+    @property
+    def is_cancelled(self):
+        return self._cancel_event.is_set()
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def processes(self):
+        return self._processes
+
+    @property
+    def tasks(self):
+        return self._tasks
@@ -0,0 +1,288 @@
+# -*- encoding: utf-8 -*-
+import collections
+import multiprocessing
+import time
+
+
+class BootstrapStageGraph(object):
+
+    ### CLASS VARIABLES ###
+
+    __slots__ = (
+        '_processes',
+        '_stages',
+        '_state',
+        )
+
+    class Stage(object):
+
+        __slots__ = (
+            'dependencies',
+            'keywords',
+            'name',
+            'parallel',
+            'procedure',
+            )
+
+        def __init__(
+            self,
+            name,
+            procedure,
+            dependencies=(),
+            parallel=True,
+            keywords=None,
+            ):
+            self.name = name
+            self.procedure = procedure
+            self.dependencies = tuple(dependencies)
+            self.parallel = parallel
+            self.keywords = dict(keywords or {})
+
+        def __repr__(self):
+            return '{}({!r}, dependencies={!r})'.format(
+                type(self).__name__,
+                self.name,
+                self.dependencies,
+                )
+
+        def run(self, processes=None, resume=False, state=None):
+            keywords = dict(self.keywords)
+            if self.parallel:
+                keywords['processes'] = processes
+            self.procedure(resume=resume, **keywords)
+            if state is not None:
+                with state._meta.database.execution_context():
+                    state.mark_completed(self.name)
+
+    class Worker(multiprocessing.Process):
+
+        def __init__(self, stage, processes, resume=False, state=None):
+            multiprocessing.Process.__init__(self)
+            self.stage = stage
+            self.processes = processes
+            self.resume = resume
+            self.state = state
+
+        def run(self):
+            self.stage.run(
+                processes=self.processes,
+                resume=self.resume,
+                state=self.state,
+                )
+
+    ### INITIALIZER ###
+
+    def __init__(self, processes=None, state=None):
+        self._processes = processes or multiprocessing.cpu_count()
+        self._state = state
+        self._stages = collections.OrderedDict()
+
+    ### SPECIAL METHODS ###
+
+    def __contains__(self, name):
+        return name in self._stages
+
+    def __getitem__(self, name):
+        return self._stages[name]
+
+    def __iter__(self):
+        return iter(self._stages.values())
+
+    def __len__(self):
+        return len(self._stages)
+
+    ### PRIVATE METHODS ###
+
+    def _allocate(self, stage, available, remaining):
+        if not stage.parallel:
+            return 1
+        return max(1, available // remaining)
+
+    def _is_completed(self, name):
+        if self._state is None:
+            return False
+        with self._state._meta.database.execution_context():
+            if not self._state.table_exists():
+                return False
+            return self._state.is_completed(name)
+
+    def _reset(self, name):
+        if self._state is None:
+            return
+        with self._state._meta.database.execution_context():
+            if not self._state.table_exists():
+                return
+            self._state.reset(name)
+
+    ### PUBLIC METHODS ###
+
+    def add_stage(
+        self,
+        name,
+        procedure,
+        dependencies=(),
+        parallel=True,
+        **keywords
+        ):
+        if name in self._stages:
+            raise ValueError('Duplicate stage: {}'.format(name))
+        for dependency in dependencies:
+            if dependency not in self._stages:
+                raise ValueError('Unknown dependency of {}: {}'.format(
+                    name, dependency))
+        stage = self.Stage(
+            name,
+            procedure,
+            dependencies=dependencies,
+            parallel=parallel,
+            keywords=keywords,
+            )
+        self._stages[name] = stage
+        return stage
+
+    def get_dependents(self, names):
+        dependents = set(names)
+        for stage in self:
+            if dependents.intersection(stage.dependencies):
+                dependents.add(stage.name)
+        return [_.name for _ in self if _.name in dependents]
+
+    def get_pending(self, only=None, skip=None, rerun=None):
+        only, skip, rerun = (tuple(_ or ()) for _ in (only, skip, rerun))
+        names = set(self._stages)
+        for name in only + skip + rerun:
+            if name not in names:
+                raise ValueError('Unknown stage: {}'.format(name))
+        rerun = set(self.get_dependents(rerun))
+        pending = []
+        for stage in self:
+            if only and stage.name not in only:
+                continue
+            if skip and stage.name in skip:
+                continue
+            if stage.name not in rerun and self._is_completed(stage.name):
+                continue
+            pending.append(stage.name)
+        satisfied = set(skip)
+        for stage in self:
+            if stage.name in pending or stage.name in satisfied:
+                continue
+            if stage.name not in rerun and self._is_completed(stage.name):
+                satisfied.add(stage.name)
+        for name in pending:
+            for dependency in self[name].dependencies:
+                if dependency in pending or dependency in satisfied:
+                    continue
+                message = 'Stage {} depends on incomplete stage {}'
+                raise ValueError(message.format(name, dependency))
+        return pending, rerun
+
+    def get_status(self):
+        status = collections.OrderedDict()
+        for stage in self:
+            status[stage.name] = self._is_completed(stage.name)
+        return status
+
+    def run(self, only=None, skip=None, rerun=None, resume=False):
+        pending, rerun = self.get_pending(only=only, skip=skip, rerun=rerun)
+        for stage in self:
+            if stage.name not in pending:
+                print('BOOTSTRAP [SKIPPED]: {}'.format(stage.name))
+        for name in pending:
+            if name in rerun:
+                self._reset(name)
+        if self._processes == 1:
+            return self.run_serial(pending, rerun=rerun, resume=resume)
+        return self.run_parallel(pending, rerun=rerun, resume=resume)
+
+    def run_parallel(self, pending, rerun=(), resume=False):
+        pending = list(pending)
+        running = {}
+        completed = set()
+        failed = set()
+        try:
+            while pending or running:
+                for name, (worker, processes, start_time) in \
+                    list(running.items()):
+                    if worker.is_alive():
+                        continue
+                    worker.join()
+                    del(running[name])
+                    elapsed_time = time.time() - start_time
+                    if worker.exitcode == 0:
+                        completed.add(name)
+                        print('BOOTSTRAP [COMPLETED]: {} [{:.3f}s]'.format(
+                            name, elapsed_time))
+                    else:
+                        failed.add(name)
+                        print('BOOTSTRAP [FAILED]: {} [{:.3f}s]'.format(
+                            name, elapsed_time))
+                blocked = [
+                    name for name in pending
+                    if failed.intersection(self[name].dependencies)
+                    ]
+                for name in blocked:
+                    pending.remove(name)
+                    failed.add(name)
+                    print('BOOTSTRAP [BLOCKED]: {}'.format(name))
+                ready = [
+                    name for name in pending
+                    if not any(
+                        _ in pending or _ in running
+                        for _ in self[name].dependencies
+                        )
+                    ]
+                available = self._processes - sum(
+                    processes for _, processes, _ in running.values())
+                for i, name in enumerate(ready):
+                    if available < 1:
+                        break
+                    stage = self[name]
+                    processes = self._allocate(
+                        stage, available, len(ready) - i)
+                    print('BOOTSTRAP: {} [{} processes]'.format(
+                        name, processes))
+                    worker = self.Worker(
+                        stage,
+                        processes,
+                        resume=resume and name not in rerun,
+                        state=self._state,
+                        )
+                    if self._state is not None:
+                        self._state.close_connections()
+                    worker.start()
+                    running[name] = (worker, processes, time.time())
+                    pending.remove(name)
+                    available -= processes
+                if running:
+                    time.sleep(0.1)
+        finally:
+            for worker, _, _ in running.values():
+                worker.join()
+        if failed:
+            raise RuntimeError('Failed bootstrap stages: {}'.format(
+                ', '.join(_.name for _ in self if _.name in failed)))
+        return [_.name for _ in self if _.name in completed]
+
+    def run_serial(self, pending, rerun=(), resume=False):
+        for name in pending:
+            print('BOOTSTRAP: {}'.format(name))
+            start_time = time.time()
+            self[name].run(
+                processes=self._processes,
+                resume=resume and name not in rerun,
+                state=self._state,
+                )
+            print('BOOTSTRAP [COMPLETED]: {} [{:.3f}s]'.format(
+                name, time.time() - start_time))
+        return list(pending)
+
+    ### PUBLIC PROPERTIES ###
+
+    @property
+    def processes(self):
+        return self._processes
+
+    @property
+    def stage_names(self):
+        return list(self._stages)
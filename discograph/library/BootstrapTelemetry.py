@@ -0,0 +1,179 @@
+# -*- encoding: utf-8 -*-
+import json
+import math
+import time
+
+
+class BootstrapTelemetry(object):
+
+    ### CLASS VARIABLES ###
+
+    __slots__ = (
+        '_counters',
+        '_histogram',
+        '_interval',
+        '_last_report_time',
+        '_name',
+        '_start_time',
+        )
+
+    _bucket_base = 2 ** 0.125
+
+    _minimum_latency = 1e-6
+
+    ### INITIALIZER ###
+
+    def __init__(self, name='BOOTSTRAP', interval=10., start_time=None):
+        self._name = name
+        self._interval = interval
+        self._counters = {}
+        self._histogram = {}
+        self._start_time = start_time or time.time()
+        self._last_report_time = self._start_time
+
+    ### PRIVATE METHODS ###
+
+    @classmethod
+    def _bucket_to_latency(cls, bucket):
+        return cls._bucket_base ** (bucket + 0.5)
+
+    @classmethod
+    def _latency_to_bucket(cls, latency):
+        latency = max(latency, cls._minimum_latency)
+        return int(math.floor(math.log(latency, cls._bucket_base)))
+
+    ### PUBLIC METHODS ###
+
+    def as_dict(self):
+        return {
+            'counters': dict(self._counters),
+            'elapsed_time': self.elapsed_time,
+            'histogram': dict(
+                (str(bucket), count)
+                for bucket, count in self._histogram.items()
+                ),
+            'name': self.name,
+            }
+
+    @classmethod
+    def from_dict(cls, data):
+        telemetry = cls(
+            name=data.get('name', 'BOOTSTRAP'),
+            start_time=time.time() - data.get('elapsed_time', 0.),
+            )
+        telemetry.merge(data)
+        return telemetry
+
+    def get_count(self, counter):
+        return self._counters.get(counter, 0)
+
+    def get_eta(self, progress):
+        if not progress:
+            return None
+        return self.elapsed_time * (1. - progress) / progress
+
+    def get_summary(self, workers=None):
+        summary = self.as_dict()
+        summary['rows_per_second'] = self.rows_per_second
+        summary['p50'] = self.percentile(0.5)
+        summary['p99'] = self.percentile(0.99)
+        if workers:
+            summary['workers'] = dict(
+                (name, telemetry.as_dict())
+                for name, telemetry in workers.items()
+                )
+        return summary
+
+    def increment(self, counter, amount=1):
+        self._counters[counter] = self._counters.get(counter, 0) + amount
+
+    def maybe_report(self, progress=None):
+        if time.time() - self._last_report_time < self._interval:
+            return False
+        self.report(progress=progress)
+        return True
+
+    def merge(self, other):
+        if isinstance(other, type(self)):
+            other = other.as_dict()
+        for counter, count in other.get('counters', {}).items():
+            self.increment(counter, count)
+        for bucket, count in other.get('histogram', {}).items():
+            bucket = int(bucket)
+            self._histogram[bucket] = self._histogram.get(bucket, 0) + count
+        return self
+
+    def percentile(self, fraction):
+        total = sum(self._histogram.values())
+        if not total:
+            return None
+        threshold = fraction * total
+        cumulative = 0
+        for bucket in sorted(self._histogram):
+            cumulative += self._histogram[bucket]
+            if threshold <= cumulative:
+                return self._bucket_to_latency(bucket)
+        return self._bucket_to_latency(max(self._histogram))
+
+    def record(self, latency, counter=None, amount=1):
+        self.increment('rows', amount)
+        if counter is not None:
+            self.increment(counter, amount)
+        if not amount:
+            return
+        bucket = self._latency_to_bucket(float(latency) / amount)
+        self._histogram[bucket] = self._histogram.get(bucket, 0) + amount
+
+    def report(self, progress=None, annotation=''):
+        pieces = [u'{} [TELEMETRY]'.format(self.name)]
+        if annotation:
+            pieces.append(u'[{}]'.format(annotation))
+        if progress is not None:
+            pieces.append(u'{:.3%}'.format(progress))
+        pieces.append(u'{} rows ({:.1f} rows/sec)'.format(
+            self.get_count('rows'), self.rows_per_second))
+        for counter in sorted(self._counters):
+            if counter == 'rows':
+                continue
+            pieces.append(u'{}: {}'.format(counter, self._counters[counter]))
+        p50, p99 = self.percentile(0.5), self.percentile(0.99)
+        if p50 is not None:
+            pieces.append(u'p50: {:.3f}ms p99: {:.3f}ms'.format(
+                p50 * 1000, p99 * 1000))
+        eta = self.get_eta(progress)
+        if eta is not None:
+            pieces.append(u'ETA: {:.0f}s'.format(eta))
+        print(u' '.join(pieces))
+        self._last_report_time = time.time()
+
+    def write_summary(self, file_path=None, workers=None):
+        summary = self.get_summary(workers=workers)
+        string = json.dumps(summary, sort_keys=True)
+        if file_path is None:
+            print(u'{} [TELEMETRY] {}'.format(self.name, string))
+            return
+        with open(file_path, 'w') as file_pointer:
+            file_pointer.write(string)
+        print(u'{} [TELEMETRY] summary written to {}'.format(
+            self.name, file_path))
+
+    ### PUBLIC PROPERTIES ###
+
+    @property
+    def elapsed_time(self):
+        return time.time() - self._start_time
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def rows_per_second(self):
+        elapsed_time = self.elapsed_time
+        if not elapsed_time:
+            return 0.
+        return self.get_count('rows') / elapsed_time
+
+    @property
+    def start_time(self):
+        return self._start_time
@@ -0,0 +1,35 @@
+# -*- encoding: utf-8 -*-
+import time
+
+
+class BootstrapThrottle(object):
+
+    ### CLASS VARIABLES ###
+
+    duty_cycle = 1.
+
+    maximum_pause = 60.
+
+    ### PUBLIC METHODS ###
+
+    @classmethod
+    def get_pause(cls, elapsed_time):
+        duty_cycle = cls.duty_cycle
+        if not 0. < duty_cycle < 1. or elapsed_time <= 0.:
+            return 0.
+        pause = elapsed_time * (1. - duty_cycle) / duty_cycle
+        return min(pause, cls.maximum_pause)
+
+    @classmethod
+    def pause(cls, elapsed_time):
+        pause = cls.get_pause(elapsed_time)
+        if pause:
+            time.sleep(pause)
+        return pause
+
+    @classmethod
+    def set_duty_cycle(cls, duty_cycle):
+        duty_cycle = float(duty_cycle)
+        if not 0. < duty_cycle <= 1.:
+            raise ValueError(duty_cycle)
+        cls.duty_cycle = duty_cycle
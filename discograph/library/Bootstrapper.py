@@ -1,12 +1,15 @@
 # -*- encoding: utf-8 -*-
+import bisect
 import datetime
 import glob
 import gzip
 import os
 import re
+import struct
 import traceback
 from xml.dom import minidom
 from abjad.tools import systemtools
+from discograph.library.ThreadedGzipReader import ThreadedGzipReader
 try:
     from xml.etree import cElementTree as ElementTree
 except ImportError:
@@ -17,10 +20,96 @@ class Bootstrapper(object):
 
     ### CLASS VARIABLES ###
 
+    class RecordSliceReader(object):
+
+        def __init__(self, file_pointer, start, stop):
+            file_pointer.seek(start)
+            self.file_pointer = file_pointer
+            self.remaining = stop - start
+            self.prefix = b'<slice>'
+            self.suffix = b'</slice>'
+
+        def read(self, size=-1):
+            if self.prefix:
+                data, self.prefix = self.prefix, b''
+                return data
+            if 0 < self.remaining:
+                if size < 0 or self.remaining < size:
+                    size = self.remaining
+                data = self.file_pointer.read(size)
+                self.remaining -= len(data)
+                if data:
+                    return data
+                self.remaining = 0
+            data, self.suffix = self.suffix, b''
+            return data
+
     date_regex = re.compile('^(\d{4})-(\d{2})-(\d{2})$')
     date_no_dashes_regex = re.compile('^(\d{4})(\d{2})(\d{2})$')
     year_regex = re.compile('^\d\d\d\d$')
     is_test = False
+    malformed_release_date_count = 0
+    use_threaded_reader = False
+
+    _release_date_cache = {}
+
+    _release_date_cache_size = 100000
+
+    release_date_samples = (
+        '1989-06-23',
+        '2015-06-31',
+        '2014-06-00',
+        '2013-00-00',
+        '19890623',
+        '2001',
+        '1971',
+        '?',
+        '????',
+        'None',
+        '',
+        )
+
+    pruning_profile = 'full'
+
+    pruning_profiles = {
+        'full': {},
+        # graph-only keeps everything relation building reads, but stores
+        # releases without formats, identifiers, catalog numbers, track
+        # positions, titles and durations, or credit anv/join/tracks
+        'graph-only': {
+            'artist': (
+                'images',
+                ),
+            'label': (
+                'images',
+                ),
+            'master': (
+                'data_quality',
+                'images',
+                'notes',
+                'videos',
+                ),
+            'release': (
+                'artists/artist/anv',
+                'artists/artist/join',
+                'artists/artist/tracks',
+                'companies/company/catno',
+                'companies/company/resource_url',
+                'data_quality',
+                'extraartists/artist/anv',
+                'extraartists/artist/join',
+                'extraartists/artist/tracks',
+                'formats',
+                'identifiers',
+                'images',
+                'notes',
+                'tracklist/track/duration',
+                'tracklist/track/position',
+                'tracklist/track/title',
+                'videos',
+                ),
+            },
+        }
 
     ### PUBLIC METHODS ###
 
@@ -39,6 +128,50 @@ class Bootstrapper(object):
             files = sorted(glob.glob(glob_pattern))
         return os.path.join(data_directory, files[-1])
 
+    @staticmethod
+    def build_record_index(xml_path, tag, block_size=1024 * 1024):
+        pattern = re.compile(
+            br'<(/?)' + tag.encode('ascii') + br'(?=[\s/>])[^>]*?(/?)>')
+        offsets = []
+        depth = 0
+        position = 0
+        pending = b''
+        end = None
+        with Bootstrapper.open_xml(xml_path) as file_pointer:
+            while True:
+                block = file_pointer.read(block_size)
+                data = pending + block
+                cut = len(data)
+                if block:
+                    last_open = data.rfind(b'<')
+                    if last_open != -1 and b'>' not in data[last_open:]:
+                        cut = last_open
+                for match in pattern.finditer(data, 0, cut):
+                    closing, self_closing = match.groups()
+                    if closing:
+                        depth -= 1
+                        if not depth:
+                            end = position + match.end()
+                    elif self_closing:
+                        if not depth:
+                            offsets.append(position + match.start())
+                            end = position + match.end()
+                    else:
+                        if not depth:
+                            offsets.append(position + match.start())
+                        depth += 1
+                position += cut
+                pending = data[cut:]
+                if not block:
+                    break
+        if end is not None:
+            offsets.append(end)
+        index_path = Bootstrapper.get_record_index_path(xml_path)
+        with open(index_path, 'wb') as file_pointer:
+            file_pointer.write(struct.pack(
+                '<{}Q'.format(len(offsets)), *offsets))
+        return offsets
+
     @staticmethod
     def clean_elements(elements):
         for element in elements:
@@ -51,34 +184,59 @@ class Bootstrapper(object):
             yield element
 
     @staticmethod
-    def parse_release_date(date_string):
+    def match_release_date(date_string):
         # empty string
         if not date_string:
             return None
         # yyyy-mm-dd
         match = Bootstrapper.date_regex.match(date_string)
         if match:
-            year, month, day = match.groups()
-            return Bootstrapper.validate_release_date(year, month, day)
+            return match.groups()
         # yyyymmdd
         match = Bootstrapper.date_no_dashes_regex.match(date_string)
         if match:
-            year, month, day = match.groups()
-            return Bootstrapper.validate_release_date(year, month, day)
+            return match.groups()
         # yyyy
         match = Bootstrapper.year_regex.match(date_string)
         if match:
-            year, month, day = match.group(), '1', '1'
-            return Bootstrapper.validate_release_date(year, month, day)
+            return match.group(), '1', '1'
         # other: "?", "????", "None", "Unknown"
         return None
 
+    @staticmethod
+    def parse_release_date(date_string):
+        parts = Bootstrapper.match_release_date(date_string)
+        if parts is None:
+            return None
+        year, month, day = parts
+        return Bootstrapper.validate_release_date(year, month, day)
+
+    @staticmethod
+    def parse_release_date_cached(date_string):
+        cache = Bootstrapper._release_date_cache
+        if date_string in cache:
+            date, is_malformed = cache[date_string]
+        else:
+            date, is_malformed = None, False
+            parts = Bootstrapper.match_release_date(date_string)
+            if parts is not None:
+                year, month, day = parts
+                date = Bootstrapper.validate_release_date(
+                    year, month, day, verbose=False)
+                is_malformed = date is None
+            if Bootstrapper._release_date_cache_size <= len(cache):
+                cache.clear()
+            cache[date_string] = date, is_malformed
+        if is_malformed:
+            Bootstrapper.malformed_release_date_count += 1
+        return date
+
     @staticmethod
     def element_to_datetime(element):
         if element is None:
             return None
         date_string = element.text.strip()
-        return Bootstrapper.parse_release_date(date_string)
+        return Bootstrapper.parse_release_date_cached(date_string)
 
     @staticmethod
     def element_to_integer(element):
@@ -99,15 +257,88 @@ class Bootstrapper(object):
         return None
 
     @staticmethod
-    def get_iterator(tag):
+    def get_iterator(tag, threaded=None):
         file_path = Bootstrapper.get_xml_path(tag)
-        file_pointer = gzip.GzipFile(file_path, 'r')
+        file_pointer = Bootstrapper.open_xml(file_path, threaded=threaded)
         iterator = Bootstrapper.iterparse(file_pointer, tag)
         iterator = Bootstrapper.clean_elements(iterator)
         return iterator
 
     @staticmethod
-    def iterparse(source, tag):
+    def get_pruned_paths(tag, profile=None):
+        if profile is None:
+            profile = Bootstrapper.pruning_profile
+        paths = Bootstrapper.pruning_profiles[profile].get(tag, ())
+        return frozenset(tuple(_.split('/')) for _ in paths)
+
+    @staticmethod
+    def get_record_index(xml_path, tag):
+        index_path = Bootstrapper.get_record_index_path(xml_path)
+        if (
+            not os.path.exists(index_path) or
+            os.path.getmtime(index_path) < os.path.getmtime(xml_path)
+            ):
+            return Bootstrapper.build_record_index(xml_path, tag)
+        with open(index_path, 'rb') as file_pointer:
+            data = file_pointer.read()
+        count = len(data) // struct.calcsize('<Q')
+        return list(struct.unpack_from('<{}Q'.format(count), data))
+
+    @staticmethod
+    def get_record_index_path(xml_path):
+        return '{}.idx'.format(xml_path)
+
+    @staticmethod
+    def get_record_slices(xml_path, tag, count):
+        offsets = Bootstrapper.get_record_index(xml_path, tag)
+        record_count = len(offsets) - 1
+        if record_count < 1:
+            return []
+        first, end = offsets[0], offsets[-1]
+        step = float(end - first) / count
+        boundaries = [0]
+        for i in range(1, count):
+            target = first + int(step * i)
+            boundary = bisect.bisect_left(offsets, target, 0, record_count)
+            if boundaries[-1] < boundary < record_count:
+                boundaries.append(boundary)
+        boundaries.append(record_count)
+        return list(zip(boundaries[:-1], boundaries[1:]))
+
+    @staticmethod
+    def iterparse_records(xml_path, tag, start=0, stop=None):
+        if not start and stop is None:
+            with Bootstrapper.open_xml(xml_path) as file_pointer:
+                for element in Bootstrapper.iterparse(file_pointer, tag):
+                    yield element
+            return
+        offsets = Bootstrapper.get_record_index(xml_path, tag)
+        if stop is None:
+            stop = len(offsets) - 1
+        iterator = Bootstrapper.iterparse_slice(
+            xml_path,
+            tag,
+            offsets[start],
+            offsets[stop],
+            )
+        for element in iterator:
+            yield element
+
+    @staticmethod
+    def iterparse_slice(xml_path, tag, start, stop):
+        with Bootstrapper.open_xml(xml_path) as file_pointer:
+            reader = Bootstrapper.RecordSliceReader(file_pointer, start, stop)
+            for element in Bootstrapper.iterparse(reader, tag):
+                yield element
+
+    @staticmethod
+    def iterparse(source, tag, profile=None):
+        pruned_paths = Bootstrapper.get_pruned_paths(tag, profile=profile)
+        if pruned_paths:
+            iterator = Bootstrapper.iterparse_pruned(source, tag, pruned_paths)
+            for element in iterator:
+                yield element
+            return
         context = ElementTree.iterparse(
             source,
             events=('start', 'end',),
@@ -125,6 +356,42 @@ class Bootstrapper(object):
                         yield element
                         root.clear()
 
+    @staticmethod
+    def iterparse_pruned(source, tag, pruned_paths):
+        context = ElementTree.iterparse(
+            source,
+            events=('start', 'end',),
+            )
+        context = iter(context)
+        _, root = next(context)
+        elements = []
+        path = []
+        for event, element in context:
+            if event == 'start':
+                if elements or element.tag == tag:
+                    elements.append(element)
+                    path.append(element.tag)
+                continue
+            if not elements:
+                continue
+            elements.pop()
+            if not elements:
+                path.pop()
+                yield element
+                root.clear()
+                continue
+            if tuple(path[1:]) in pruned_paths:
+                elements[-1].remove(element)
+            path.pop()
+
+    @staticmethod
+    def open_xml(xml_path, threaded=None):
+        if threaded is None:
+            threaded = Bootstrapper.use_threaded_reader
+        if threaded:
+            return ThreadedGzipReader(xml_path)
+        return gzip.GzipFile(xml_path, 'r')
+
     @staticmethod
     def prettify(element):
         string = ElementTree.tostring(element, 'utf-8')
@@ -132,7 +399,7 @@ class Bootstrapper(object):
         return reparsed.toprettyxml(indent='    ')
 
     @staticmethod
-    def validate_release_date(year, month, day):
+    def validate_release_date(year, month, day, verbose=True):
         try:
             year = int(year)
             if month.isdigit():
@@ -149,7 +416,8 @@ class Bootstrapper(object):
             day_offset = day - 1
             date = date + datetime.timedelta(days=day_offset)
         except ValueError:
-            traceback.print_exc()
-            print('BAD DATE:', year, month, day)
+            if verbose:
+                traceback.print_exc()
+                print('BAD DATE:', year, month, day)
             date = None
         return date
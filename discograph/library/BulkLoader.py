@@ -0,0 +1,284 @@
+# -*- encoding: utf-8 -*-
+import datetime
+import io
+import json
+import peewee
+import six
+import time
+import traceback
+from playhouse import postgres_ext
+from discograph.library.BootstrapThrottle import BootstrapThrottle
+
+
+class BulkLoader(object):
+
+    ### CLASS VARIABLES ###
+
+    __slots__ = (
+        '_batch_count',
+        '_batch_size',
+        '_buffer',
+        '_checkpoint',
+        '_elapsed_time',
+        '_fields',
+        '_model_class',
+        '_position',
+        '_row_count',
+        '_sink',
+        '_start_time',
+        '_table_name',
+        '_verbose',
+        )
+
+    _copy_escapes = (
+        ('\\', '\\\\'),
+        ('\n', '\\n'),
+        ('\r', '\\r'),
+        ('\t', '\\t'),
+        )
+
+    _array_escapes = (
+        ('\\', '\\\\'),
+        ('"', '\\"'),
+        )
+
+    ### INITIALIZER ###
+
+    def __init__(
+        self,
+        model_class,
+        batch_size=10000,
+        checkpoint=None,
+        verbose=True,
+        sink=None,
+        table_name=None,
+        ):
+        batch_size = int(batch_size)
+        assert 0 < batch_size
+        self._model_class = model_class
+        self._sink = sink
+        self._table_name = table_name or model_class._meta.db_table
+        self._batch_size = batch_size
+        self._checkpoint = checkpoint
+        self._position = None
+        self._verbose = bool(verbose)
+        self._fields = tuple(
+            field for field in model_class._meta.sorted_fields
+            if not isinstance(field, peewee.PrimaryKeyField)
+            )
+        self._buffer = []
+        self._batch_count = 0
+        self._row_count = 0
+        self._elapsed_time = 0.
+        self._start_time = time.time()
+
+    ### SPECIAL METHODS ###
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        if exc_type is None:
+            self.flush()
+            if self.verbose:
+                self.report()
+
+    ### PRIVATE METHODS ###
+
+    @classmethod
+    def _encode_array(cls, value):
+        items = []
+        for item in value:
+            if item is None:
+                items.append('NULL')
+                continue
+            item = six.text_type(item)
+            for old, new in cls._array_escapes:
+                item = item.replace(old, new)
+            items.append(u'"{}"'.format(item))
+        return u'{{{}}}'.format(u','.join(items))
+
+    @classmethod
+    def _escape(cls, value):
+        for old, new in cls._copy_escapes:
+            value = value.replace(old, new)
+        return value
+
+    def _copy(
+        self,
+        stream,
+        pre_statements,
+        copy_statement,
+        post_statements,
+        ):
+        database = self.model_class._meta.database
+        with database.execution_context():
+            cursor = database.get_cursor()
+            for statement in pre_statements:
+                cursor.execute(statement)
+            cursor.copy_expert(copy_statement, stream)
+            for statement in post_statements:
+                cursor.execute(statement)
+            if self._checkpoint is not None and \
+                self._position is not None:
+                self._checkpoint(self._position)
+
+    def _encode_row(self, data, function_columns):
+        values = []
+        for field in self.fields:
+            value = data.get(field.name)
+            if isinstance(value, peewee.Func):
+                function_columns[field.db_column] = value.name
+                value = value.arguments[0]
+            values.append(self.encode_value(field, value))
+        return u'\t'.join(values)
+
+    def _get_copy_statements(self, function_columns):
+        table_name = self.table_name
+        columns = [field.db_column for field in self.fields]
+        column_list = ', '.join('"{}"'.format(_) for _ in columns)
+        if not function_columns:
+            copy_statement = 'COPY "{}" ({}) FROM STDIN'.format(
+                table_name, column_list)
+            return [], copy_statement, []
+        staging_table_name = '{}_staging'.format(table_name)
+        pre_statements = [
+            'CREATE TEMPORARY TABLE "{}" (LIKE "{}") ON COMMIT DROP'.format(
+                staging_table_name, table_name),
+            ]
+        for column in sorted(function_columns):
+            pre_statements.append(
+                'ALTER TABLE "{}" ALTER COLUMN "{}" TYPE text'.format(
+                    staging_table_name, column))
+        copy_statement = 'COPY "{}" ({}) FROM STDIN'.format(
+            staging_table_name, column_list)
+        expressions = []
+        for column in columns:
+            if column in function_columns:
+                expressions.append('{}("{}")'.format(
+                    function_columns[column], column))
+            else:
+                expressions.append('"{}"'.format(column))
+        post_statements = [
+            'INSERT INTO "{}" ({}) SELECT {} FROM "{}"'.format(
+                table_name,
+                column_list,
+                ', '.join(expressions),
+                staging_table_name,
+                ),
+            ]
+        return pre_statements, copy_statement, post_statements
+
+    ### PUBLIC METHODS ###
+
+    def add(self, data, position=None):
+        self._buffer.append(data)
+        if position is not None:
+            self._position = position
+        if self.batch_size <= len(self._buffer):
+            self.flush()
+
+    @classmethod
+    def encode_value(cls, field, value):
+        if value is None:
+            return u'\\N'
+        if isinstance(field, postgres_ext.JSONField):
+            value = json.dumps(value)
+        elif isinstance(field, postgres_ext.ArrayField):
+            value = cls._encode_array(value)
+        elif isinstance(value, (datetime.date, datetime.datetime)):
+            value = value.isoformat()
+        elif isinstance(value, bool):
+            value = u't' if value else u'f'
+        value = six.text_type(value)
+        return cls._escape(value)
+
+    def flush(self):
+        if not self._buffer:
+            return
+        function_columns = {}
+        lines = [self._encode_row(_, function_columns) for _ in self._buffer]
+        lines.append(u'')
+        stream = io.StringIO(u'\n'.join(lines))
+        pre_statements, copy_statement, post_statements = \
+            self._get_copy_statements(function_columns)
+        start_time = time.time()
+        try:
+            if self._sink is not None:
+                self._sink.write(stream.getvalue())
+            else:
+                self._copy(
+                    stream,
+                    pre_statements,
+                    copy_statement,
+                    post_statements,
+                    )
+        except Exception:
+            print('{} (Pass 1) [COPY] FAILED: batch {} ({} rows)'.format(
+                self.model_class.__name__.upper(),
+                self._batch_count + 1,
+                len(self._buffer),
+                ))
+            traceback.print_exc()
+            raise
+        elapsed_time = time.time() - start_time
+        row_count = len(self._buffer)
+        self._buffer[:] = []
+        self._batch_count += 1
+        self._row_count += row_count
+        self._elapsed_time += elapsed_time
+        if self.verbose:
+            template = u'{} (Pass 1) [COPY] batch {}: {} rows [{:.3f}s]'
+            print(template.format(
+                self.model_class.__name__.upper(),
+                self._batch_count,
+                row_count,
+                elapsed_time,
+                ))
+        if self._sink is None:
+            BootstrapThrottle.pause(elapsed_time)
+
+    def report(self):
+        template = u'{} (Pass 1) [COPY] {} rows in {} batches '
+        template += u'[{:.3f}s total, {:.3f}s copying]: {:.1f} rows/sec'
+        print(template.format(
+            self.model_class.__name__.upper(),
+            self.row_count,
+            self._batch_count,
+            time.time() - self._start_time,
+            self._elapsed_time,
+            self.rows_per_second,
+            ))
+
+    ### PUBLIC PROPERTIES ###
+
+    @property
+    def batch_size(self):
+        return self._batch_size
+
+    @property
+    def fields(self):
+        return self._fields
+
+    @property
+    def model_class(self):
+        return self._model_class
+
+    @property
+    def row_count(self):
+        return self._row_count
+
+    @property
+    def rows_per_second(self):
+        elapsed_time = time.time() - self._start_time
+        if not elapsed_time:
+            return 0.
+        return self._row_count / elapsed_time
+
+    @property
+    def table_name(self):
+        return self._table_name
+
+    @property
+    def verbose(self):
+        return self._verbose
@@ -36,6 +36,12 @@ class CreditRole(abctools.AbjadValueObject):
 
     _bracket_pattern = re.compile('\[(.+?)\]')
 
+    _role_cache = collections.OrderedDict()
+
+    _role_cache_size = 10000
+
+    _role_token_pattern = re.compile(r'[\[\],]|[^\[\],]+')
+
     category_names = {
         Category.ACTING_LITERARY_AND_SPOKEN: 'Acting, Literary & Spoken',
         Category.COMPANIES: 'Companies',
@@ -767,62 +773,73 @@ class CreditRole(abctools.AbjadValueObject):
         self._name = name
         self._detail = detail
 
-    ### PUBLIC METHODS ###
+    ### PRIVATE METHODS ###
 
     @classmethod
-    def from_element(cls, element):
-        credit_roles = []
-        if element is None or not element.text:
-            return credit_roles
-        current_text = ''
-        bracket_depth = 0
-        for character in element.text:
-            if character == '[':
-                bracket_depth += 1
-            elif character == ']':
-                bracket_depth -= 1
-            elif not bracket_depth and character == ',':
-                current_text = current_text.strip()
-                if current_text:
-                    credit_roles.append(cls.from_text(current_text))
-                current_text = ''
-                continue
-            current_text += character
-        current_text = current_text.strip()
-        if current_text:
-            credit_roles.append(cls.from_text(current_text))
-        return credit_roles
-
-    @classmethod
-    def from_text(cls, text):
+    def _parse_role(cls, tokens):
         name = ''
-        current_buffer = ''
+        current_buffer = []
         details = []
         had_detail = False
         bracket_depth = 0
-        for character in text:
-            if character == '[':
+        for token in tokens:
+            if token == '[':
                 bracket_depth += 1
                 if bracket_depth == 1 and not had_detail:
-                    name = current_buffer
-                    current_buffer = ''
+                    name = ''.join(current_buffer)
+                    current_buffer = []
                     had_detail = True
                 elif 1 < bracket_depth:
-                    current_buffer += character
-            elif character == ']':
+                    current_buffer.append(token)
+            elif token == ']':
                 bracket_depth -= 1
                 if not bracket_depth:
-                    details.append(current_buffer)
-                    current_buffer = ''
+                    details.append(''.join(current_buffer))
+                    current_buffer = []
                 else:
-                    current_buffer += character
+                    current_buffer.append(token)
             else:
-                current_buffer += character
+                current_buffer.append(token)
         if current_buffer and not had_detail:
-            name = current_buffer
+            name = ''.join(current_buffer)
         name = name.strip()
         detail = ', '.join(_.strip() for _ in details)
-        detail = detail or None
+        return name, detail or None
+
+    @classmethod
+    def _parse_roles(cls, text):
+        credit_roles = []
+        current_tokens = []
+        bracket_depth = 0
+        for token in cls._role_token_pattern.findall(text):
+            if token == '[':
+                bracket_depth += 1
+            elif token == ']':
+                bracket_depth -= 1
+            elif not bracket_depth and token == ',':
+                if ''.join(current_tokens).strip():
+                    credit_roles.append(cls._parse_role(current_tokens))
+                current_tokens = []
+                continue
+            current_tokens.append(token)
+        if ''.join(current_tokens).strip():
+            credit_roles.append(cls._parse_role(current_tokens))
+        return tuple(credit_roles)
+
+    ### PUBLIC METHODS ###
+
+    @classmethod
+    def from_element(cls, element):
+        if element is None or not element.text:
+            return []
+        return [
+            cls(name=name, detail=detail)
+            for name, detail in cls.parse_roles(element.text)
+            ]
+
+    @classmethod
+    def from_text(cls, text):
+        name, detail = cls._parse_role(cls._role_token_pattern.findall(text))
         return cls(name=name, detail=detail)
 
     @classmethod
@@ -846,6 +863,18 @@ class CreditRole(abctools.AbjadValueObject):
             mapping[category_name].append(role)
         return mapping
 
+    @classmethod
+    def parse_roles(cls, text):
+        cache = cls._role_cache
+        if text in cache:
+            credit_roles = cache.pop(text)
+        else:
+            credit_roles = cls._parse_roles(text)
+        cache[text] = credit_roles
+        while cls._role_cache_size < len(cache):
+            cache.popitem(last=False)
+        return credit_roles
+
     ### PUBLIC PROPERTIES ###
 
     @property
@@ -4,10 +4,12 @@ from playhouse import test_utils
 from playhouse import pool
 from discograph.app import app
 from discograph.library.Bootstrapper import Bootstrapper
+from discograph.library.PostgresBootstrapState import PostgresBootstrapState
 from discograph.library.PostgresEntity import PostgresEntity
 from discograph.library.PostgresMaster import PostgresMaster
 from discograph.library.PostgresModel import PostgresModel
 from discograph.library.PostgresRelation import PostgresRelation
+from discograph.library.PostgresRelationRelease import PostgresRelationRelease
 from discograph.library.PostgresRelease import PostgresRelease
 
 
@@ -21,10 +23,12 @@ class DiscographTestCase(unittest.TestCase):
         )
 
     models = (
+        PostgresBootstrapState,
         PostgresEntity,
         PostgresMaster,
         PostgresModel,
         PostgresRelation,
+        PostgresRelationRelease,
         PostgresRelease,
         )
 
@@ -0,0 +1,160 @@
+# -*- encoding: utf-8 -*-
+import hashlib
+import mmap
+import os
+import six
+import struct
+
+
+class EntityCorpus(object):
+
+    ### CLASS VARIABLES ###
+
+    __slots__ = (
+        '_count',
+        '_file_pointer',
+        '_file_path',
+        '_map',
+        '_overlay',
+        )
+
+    _header = struct.Struct('<8sQ')
+
+    _magic = b'DGCORPUS'
+
+    _record = struct.Struct('<qq')
+
+    ### INITIALIZER ###
+
+    def __init__(self, file_path):
+        self._file_path = file_path
+        self._file_pointer = open(file_path, 'rb')
+        self._map = mmap.mmap(
+            self._file_pointer.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count = self._header.unpack_from(self._map, 0)
+        if magic != self._magic:
+            self.close()
+            raise ValueError('Not an entity corpus: {}'.format(file_path))
+        self._overlay = {}
+
+    ### SPECIAL METHODS ###
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __len__(self):
+        return self._count + len(self._overlay)
+
+    def __setitem__(self, key, value):
+        self._overlay[key] = value
+
+    ### PRIVATE METHODS ###
+
+    def _find(self, key_hash):
+        low, high = 0, self._count
+        offset = self._header.size
+        size = self._record.size
+        while low < high:
+            middle = (low + high) // 2
+            record_hash, entity_id = self._record.unpack_from(
+                self._map, offset + middle * size)
+            if record_hash < key_hash:
+                low = middle + 1
+            elif key_hash < record_hash:
+                high = middle
+            else:
+                return entity_id
+        return None
+
+    ### PUBLIC METHODS ###
+
+    @classmethod
+    def build(cls, file_path=None, rows=None):
+        if file_path is None:
+            file_path = cls.get_corpus_path()
+        if rows is None:
+            rows = cls.iterate_entity_rows()
+        corpus = {}
+        for entity_type, name, entity_id in rows:
+            key_hash = cls.hash_key((entity_type, name))
+            if key_hash not in corpus or entity_id < corpus[key_hash]:
+                corpus[key_hash] = entity_id
+        key_hashes = sorted(corpus)
+        temporary_path = '{}.tmp'.format(file_path)
+        with open(temporary_path, 'wb') as file_pointer:
+            file_pointer.write(cls._header.pack(cls._magic, len(key_hashes)))
+            for key_hash in key_hashes:
+                file_pointer.write(cls._record.pack(
+                    key_hash, corpus[key_hash]))
+        os.rename(temporary_path, file_path)
+        return file_path
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file_pointer is not None:
+            self._file_pointer.close()
+            self._file_pointer = None
+
+    def get(self, key, default=None):
+        if key in self._overlay:
+            return self._overlay[key]
+        entity_id = self._find(self.hash_key(key))
+        if entity_id is None:
+            return default
+        return entity_id
+
+    @staticmethod
+    def get_corpus_path():
+        return os.path.join(
+            os.path.abspath(os.path.dirname(__file__)),
+            '..',
+            'data',
+            'discogs_entity_corpus.bin',
+            )
+
+    @staticmethod
+    def hash_key(key):
+        entity_type, name = key
+        string = u'{}\x00{}'.format(entity_type, name)
+        if isinstance(string, six.text_type):
+            string = string.encode('utf-8')
+        digest = hashlib.md5(string).digest()
+        return struct.unpack('<q', digest[:8])[0]
+
+    @staticmethod
+    def iterate_entity_rows(batch_size=10000):
+        import discograph
+        entity_class = discograph.PostgresEntity
+        database = entity_class._meta.database
+        with database.execution_context():
+            cursor = database.get_conn().cursor('entity_corpus')
+            cursor.itersize = batch_size
+            cursor.execute(
+                'SELECT entity_type, name, entity_id FROM entities')
+            for row in cursor:
+                yield row
+            cursor.close()
+
+    ### PUBLIC PROPERTIES ###
+
+    @property
+    def file_path(self):
+        return self._file_path
+
+    @property
+    def is_exhaustive(self):
+        return True
@@ -0,0 +1,115 @@
+# -*- encoding: utf-8 -*-
+import datetime
+import peewee
+from discograph.library.PostgresModel import PostgresModel
+
+
+class PostgresBootstrapState(PostgresModel):
+
+    ### PEEWEE FIELDS ###
+
+    stage = peewee.CharField(index=False)
+    key = peewee.CharField(index=False)
+    start = peewee.BigIntegerField(null=True)
+    stop = peewee.BigIntegerField(null=True)
+    position = peewee.BigIntegerField(null=True)
+    is_completed = peewee.BooleanField(default=False)
+    updated = peewee.DateTimeField(null=True)
+
+    ### PEEWEE META ###
+
+    class Meta:
+        db_table = 'bootstrap_state'
+        primary_key = peewee.CompositeKey('stage', 'key')
+
+    ### PUBLIC METHODS ###
+
+    @classmethod
+    def get_position(cls, stage, key):
+        query = cls.select(cls.position).where(
+            cls.stage == stage,
+            cls.key == key,
+            )
+        query = query.tuples()
+        for position, in query:
+            return position
+        return None
+
+    @classmethod
+    def get_ranges(cls, stage):
+        query = cls.select().where(
+            cls.stage == stage,
+            cls.key != '*',
+            )
+        query = query.order_by(cls.start)
+        return list(query)
+
+    @classmethod
+    def get_completed_keys(cls, stage):
+        query = cls.select(cls.key).where(
+            cls.stage == stage,
+            cls.is_completed == True,
+            )
+        return set(_[0] for _ in query.tuples())
+
+    @classmethod
+    def is_completed(cls, stage, key='*'):
+        query = cls.select().where(
+            cls.stage == stage,
+            cls.key == key,
+            cls.is_completed == True,
+            )
+        return bool(query.count())
+
+    @staticmethod
+    def make_range_key(start, stop):
+        if stop is None:
+            stop = ''
+        return '{}-{}'.format(start, stop)
+
+    @classmethod
+    def mark_completed(cls, stage, key='*', start=None, stop=None):
+        cls.upsert(stage, key, start=start, stop=stop, is_completed=True)
+
+    @classmethod
+    def reset(cls, stage=None):
+        query = cls.delete()
+        if stage is not None:
+            query = query.where(cls.stage == stage)
+        query.execute()
+
+    @classmethod
+    def set_position(cls, stage, key, position, start=None, stop=None):
+        cls.upsert(stage, key, start=start, stop=stop, position=position)
+
+    @classmethod
+    def upsert(
+        cls,
+        stage,
+        key,
+        start=None,
+        stop=None,
+        position=None,
+        is_completed=False,
+        ):
+        cls._meta.database.execute_sql("""
+            INSERT INTO bootstrap_state
+                (stage, key, start, stop, position, is_completed, updated)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (stage, key) DO UPDATE SET
+                start = COALESCE(EXCLUDED.start, bootstrap_state.start),
+                stop = COALESCE(EXCLUDED.stop, bootstrap_state.stop),
+                position = COALESCE(
+                    EXCLUDED.position, bootstrap_state.position),
+                is_completed = EXCLUDED.is_completed
+                    OR bootstrap_state.is_completed,
+                updated = EXCLUDED.updated
+            """, (
+            stage,
+            key,
+            start,
+            stop,
+            position,
+            is_completed,
+            datetime.datetime.now(),
+            ))
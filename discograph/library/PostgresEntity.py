@@ -1,13 +1,14 @@
 # -*- encoding: utf-8 -*-
-import multiprocessing
+import functools
 import peewee
 import re
+import time
 import traceback
-from abjad.tools import sequencetools
 from abjad.tools import stringtools
 from abjad.tools import systemtools
 from playhouse import postgres_ext
 from discograph.library.Bootstrapper import Bootstrapper
+from discograph.library.EntityCorpus import EntityCorpus
 from discograph.library.PostgresModel import PostgresModel
 
 
@@ -17,60 +18,100 @@ class PostgresEntity(PostgresModel):
 
     _strip_pattern = re.compile(r'(\(\d+\)|[^(\w\s)]+)')
 
-    class BootstrapPassTwoWorker(multiprocessing.Process):
-
-        def __init__(self, entity_type, indices):
-            multiprocessing.Process.__init__(self)
-            self.entity_type = entity_type
-            self.indices = indices
-
-        def run(self):
-            proc_number = self.name.split('-')[-1]
-            corpus = {}
-            total = len(self.indices)
-            for i, entity_id in enumerate(self.indices):
-                with PostgresEntity._meta.database.execution_context():
-                    progress = float(i) / total
-                    try:
-                        PostgresEntity.bootstrap_pass_two_single(
-                            entity_type=self.entity_type,
-                            entity_id=entity_id,
-                            annotation=proc_number,
-                            corpus=corpus,
-                            progress=progress,
-                            )
-                    except:
-                        print(
-                            'ERROR:',
-                            self.entity_type,
-                            entity_id,
-                            proc_number,
+    _pass_two_sections = {
+        1: ['aliases', 'groups', 'members'],
+        2: ['parent_label', 'sublabels'],
+        }
+
+    _pass_two_statement = """
+        UPDATE entities AS target
+        SET entities = resolved.entities
+        FROM (
+            SELECT source.entity_id,
+                jsonb_object_agg(
+                    sections.key,
+                    CASE WHEN sections.key = ANY(%(sections)s) THEN COALESCE((
+                        SELECT jsonb_object_agg(
+                            names.key,
+                            COALESCE(
+                                to_jsonb(entity_names.entity_id),
+                                names.value
+                                )
                             )
-                        traceback.print_exc()
-
-    class BootstrapPassThreeWorker(multiprocessing.Process):
-
-        def __init__(self, entity_type, indices):
-            multiprocessing.Process.__init__(self)
-            self.entity_type = entity_type
-            self.indices = indices
-
-        def run(self):
-            proc_name = self.name
-            total = len(self.indices)
-            for i, entity_id in enumerate(self.indices):
-                with PostgresEntity._meta.database.execution_context():
-                    progress= float(i) / total
-                    try:
-                        PostgresEntity.bootstrap_pass_three_single(
-                            entity_type=self.entity_type,
-                            entity_id=entity_id,
-                            annotation=proc_name,
-                            progress=progress,
+                        FROM jsonb_each(sections.value) AS names
+                        LEFT JOIN entity_names
+                            ON entity_names.entity_type = source.entity_type
+                            AND entity_names.name = names.key
+                        ), sections.value)
+                    ELSE sections.value END
+                    ) AS entities
+            FROM entities AS source
+            CROSS JOIN LATERAL jsonb_each(source.entities) AS sections
+            WHERE source.entity_type = %(entity_type)s
+                AND %(start)s <= source.entity_id
+                AND source.entity_id < %(stop)s
+            GROUP BY source.entity_id
+            ) AS resolved
+        WHERE target.entity_type = %(entity_type)s
+            AND target.entity_id = resolved.entity_id
+            AND target.entities IS DISTINCT FROM resolved.entities
+        """
+
+    _referrer_statement = """
+        SELECT DISTINCT source.entity_id
+        FROM entities AS source
+        CROSS JOIN LATERAL jsonb_each(source.entities) AS sections
+        CROSS JOIN LATERAL jsonb_each(sections.value) AS names
+        WHERE source.entity_type = %(entity_type)s
+            AND sections.key = ANY(%(sections)s)
+            AND (
+                names.key = ANY(%(names)s)
+                OR (
+                    jsonb_typeof(names.value) = 'number'
+                    AND (names.value #>> '{}')::int = ANY(%(entity_ids)s)
+                    )
+                )
+        """
+
+    _pass_three_statement = """
+        UPDATE entities
+        SET relation_counts = NULL
+        WHERE entity_type = %(entity_type)s
+            AND %(start)s <= entity_id
+            AND entity_id < %(stop)s
+            AND relation_counts IS NOT NULL;
+        UPDATE entities AS target
+        SET relation_counts = counts.relation_counts
+        FROM (
+            SELECT role_counts.entity_id,
+                jsonb_object_agg(role_counts.role, role_counts.count)
+                    AS relation_counts
+            FROM (
+                SELECT endpoints.entity_id, endpoints.role, count(*) AS count
+                FROM (
+                    SELECT entity_one_id AS entity_id, role
+                    FROM relations
+                    WHERE entity_one_type = %(entity_type)s
+                        AND %(start)s <= entity_one_id
+                        AND entity_one_id < %(stop)s
+                    UNION ALL
+                    SELECT entity_two_id AS entity_id, role
+                    FROM relations
+                    WHERE entity_two_type = %(entity_type)s
+                        AND %(start)s <= entity_two_id
+                        AND entity_two_id < %(stop)s
+                        AND NOT (
+                            entity_one_type = entity_two_type AND
+                            entity_one_id = entity_two_id
                             )
-                    except:
-                        print('ERROR:', self.entity_type, entity_id, proc_name)
-                        traceback.print_exc()
+                    ) AS endpoints
+                GROUP BY endpoints.entity_id, endpoints.role
+                ) AS role_counts
+            GROUP BY role_counts.entity_id
+            ) AS counts
+        WHERE target.entity_type = %(entity_type)s
+            AND target.entity_id = counts.entity_id
+        """
 
     ### PEEWEE FIELDS ###
 
@@ -81,6 +122,7 @@ class PostgresEntity(PostgresModel):
     metadata = postgres_ext.BinaryJSONField(null=True, index=False)
     entities = postgres_ext.BinaryJSONField(null=True, index=False)
     search_content = postgres_ext.TSVectorField(index=True)
+    content_hash = peewee.BigIntegerField(null=True, index=False)
 
     ### PEEWEE META ###
 
@@ -98,13 +140,39 @@ class PostgresEntity(PostgresModel):
         cls.bootstrap_pass_two()
 
     @classmethod
-    def bootstrap_pass_one(cls):
+    def bootstrap_corpus(cls, resume=False, corpus_path=None):
+        with systemtools.Timer(verbose=False) as timer:
+            corpus_path = EntityCorpus.build(file_path=corpus_path)
+        print('{} [CORPUS] {} [{:.3f}s]'.format(
+            cls.__name__.upper(),
+            corpus_path,
+            timer.elapsed_time,
+            ))
+        return corpus_path
+
+    @classmethod
+    def bootstrap_entity_names(cls, resume=False):
+        cls.build_entity_names()
+
+    @classmethod
+    def bootstrap_pass_one(
+        cls,
+        bulk=True,
+        batch_size=10000,
+        processes=1,
+        resume=False,
+        ):
         PostgresModel.bootstrap_pass_one(
             cls,
             'artist',
             id_attr='entity_id',
             name_attr='name',
             skip_without=['name'],
+            bulk=bulk,
+            batch_size=batch_size,
+            processes=processes,
+            resume=resume,
+            where=(cls.entity_type == 1),
             )
         PostgresModel.bootstrap_pass_one(
             cls,
@@ -112,103 +180,268 @@ class PostgresEntity(PostgresModel):
             id_attr='entity_id',
             name_attr='name',
             skip_without=['name'],
+            bulk=bulk,
+            batch_size=batch_size,
+            processes=processes,
+            resume=resume,
+            where=(cls.entity_type == 2),
             )
 
+    @classmethod
+    def bootstrap_delta(cls, batch_size=1000):
+        entity_keys = set()
+        for entity_type, xml_tag in ((1, 'artist'), (2, 'label')):
+            delta = PostgresModel.bootstrap_delta_pass_one(
+                cls,
+                xml_tag,
+                key_field=cls.entity_id,
+                where=(cls.entity_type == entity_type),
+                skip_without=['name'],
+                batch_size=batch_size,
+                )
+            corpus = {}
+            entity_ids = delta['new'] | delta['changed']
+            with cls._meta.database.execution_context():
+                names = cls.get_entity_names(entity_type, entity_ids)
+                referrer_ids = cls.get_referrer_ids(
+                    entity_type, names, delta['deleted'])
+            entity_ids = sorted(entity_ids | referrer_ids)
+            total = len(entity_ids)
+            for i, entity_id in enumerate(entity_ids):
+                with cls._meta.database.execution_context():
+                    cls.bootstrap_pass_two_single(
+                        entity_type=entity_type,
+                        entity_id=entity_id,
+                        annotation='DELTA',
+                        corpus=corpus,
+                        progress=float(i) / total,
+                        deleted_ids=delta['deleted'],
+                        )
+            for entity_id in entity_ids:
+                entity_keys.add((entity_type, entity_id))
+            entity_keys.update(delta['entity_keys'])
+        return entity_keys
+
+    @classmethod
+    def get_entity_names(cls, entity_type, entity_ids, batch_size=1000):
+        names = set()
+        entity_ids = sorted(entity_ids)
+        for i in range(0, len(entity_ids), batch_size):
+            query = cls.select(cls.name).where(
+                cls.entity_type == entity_type,
+                cls.entity_id.in_(entity_ids[i:i + batch_size]),
+                )
+            names.update(_[0] for _ in query.tuples())
+        return names
+
     @classmethod
     def get_entity_iterator(cls, entity_type, pessimistic=False):
-        if not pessimistic:
-            id_query = cls.select(peewee.fn.Max(cls.entity_id))
-            id_query = id_query.where(cls.entity_type == entity_type)
-            max_id = id_query.scalar()
-            for i in range(1, max_id + 1):
-                query = cls.select().where(
-                    cls.entity_id == i,
-                    cls.entity_type == entity_type,
-                    )
-                if not query.count():
-                    continue
-                document = query.get()
-                yield document
-        else:
-            id_query = cls.select(cls.entity_id)
-            id_query = id_query.where(cls.entity_type == entity_type)
-            for entity in id_query:
-                entity_id = entity.entity_id
-                entity = cls.select().where(
-                    cls.entity_id == entity_id,
-                    cls.entity_type == entity_type,
-                    ).get()
-                yield entity
+        return cls.iterate_by_key(
+            cls,
+            cls.entity_id,
+            where=(cls.entity_type == entity_type),
+            )
 
     @classmethod
-    def get_indices(cls, entity_type, pessimistic=False):
-        indices = []
-        if not pessimistic:
-            maximum_id = cls.select(
-                peewee.fn.Max(cls.entity_id)).where(
-                    cls.entity_type == entity_type
-                    ).scalar()
-            step = maximum_id // multiprocessing.cpu_count()
-            for start in range(0, maximum_id, step):
-                stop = start + step
-                indices.append(range(start, stop))
-        else:
-            query = cls.select(cls.entity_id)
-            query = query.where(cls.entity_type == entity_type)
-            query = query.order_by(cls.entity_id)
-            query = query.tuples()
-            all_ids = tuple(_[0] for _ in query)
-            ratio = [1] * multiprocessing.cpu_count()
-            for chunk in sequencetools.partition_sequence_by_ratio_of_lengths(
-                all_ids, ratio):
-                indices.append(chunk)
-        return indices
+    def bootstrap_pass_two(
+        cls,
+        pessimistic=False,
+        resume=False,
+        corpus_path=None,
+        bulk=False,
+        processes=None,
+        ):
+        if bulk:
+            cls.bootstrap_pass_two_bulk(processes=processes, resume=resume)
+            return
+        if corpus_path is None:
+            corpus_path = EntityCorpus.build()
+        for entity_type in (1, 2):
+            stage = 'entities:pass-two:{}'.format(entity_type)
+            cls.bootstrap_pass_scheduled(
+                cls,
+                cls.entity_id,
+                functools.partial(cls.bootstrap_pass_two_range, entity_type),
+                stage,
+                where=(cls.entity_type == entity_type),
+                processes=processes,
+                resume=resume,
+                corpus_path=corpus_path,
+                )
 
     @classmethod
-    def bootstrap_pass_two(cls, pessimistic=False):
-        entity_type = 1
-        indices = cls.get_indices(entity_type, pessimistic=pessimistic)
-        workers = [cls.BootstrapPassTwoWorker(entity_type, x)
-            for x in indices]
-        for worker in workers:
-            worker.start()
-        for worker in workers:
-            worker.join()
-        for worker in workers:
-            worker.terminate()
-        entity_type = 2
-        indices = cls.get_indices(entity_type, pessimistic=pessimistic)
-        workers = [cls.BootstrapPassTwoWorker(entity_type, x)
-            for x in indices]
-        for worker in workers:
-            worker.start()
-        for worker in workers:
-            worker.join()
-        for worker in workers:
-            worker.terminate()
+    def bootstrap_pass_two_range(
+        cls,
+        entity_type,
+        id_range,
+        corpus=None,
+        annotation='',
+        stage=None,
+        telemetry=None,
+        ):
+        start, stop = id_range
+        documents = cls.iterate_range_documents(
+            cls,
+            cls.entity_id,
+            start,
+            stop,
+            where=(cls.entity_type == entity_type),
+            stage=stage,
+            )
+        count = 0
+        for document in documents:
+            start_time = time.time()
+            with cls._meta.database.execution_context():
+                progress = float(document.entity_id - start) / (stop - start)
+                try:
+                    status = cls.bootstrap_pass_two_single(
+                        entity_type=entity_type,
+                        entity_id=document.entity_id,
+                        annotation=annotation,
+                        corpus=corpus,
+                        progress=progress,
+                        document=document,
+                        )
+                except:
+                    status = 'errors'
+                    print(
+                        'ERROR:',
+                        entity_type,
+                        document.entity_id,
+                        annotation,
+                        )
+                    traceback.print_exc()
+            if telemetry is not None:
+                telemetry.record(time.time() - start_time, status)
+            count += 1
+        return count
 
     @classmethod
-    def bootstrap_pass_three(cls, pessimistic=False):
-        entity_type = 1
-        indices = cls.get_indices(entity_type, pessimistic=pessimistic)
-        workers = [cls.BootstrapPassThreeWorker(entity_type, x)
-            for x in indices]
-        for worker in workers:
-            worker.start()
-        for worker in workers:
-            worker.join()
-        for worker in workers:
-            worker.terminate()
-        entity_type = 2
-        indices = cls.get_indices(entity_type, pessimistic=pessimistic)
-        workers = [cls.BootstrapPassThreeWorker(entity_type, _)
-            for _ in indices]
-        for worker in workers:
-            worker.start()
-        for worker in workers:
-            worker.join()
-        for worker in workers:
-            worker.terminate()
+    def bootstrap_pass_two_bulk(cls, processes=None, resume=False):
+        for entity_type in (1, 2):
+            stage = 'entities:pass-two-bulk:{}'.format(entity_type)
+            parameters = {
+                'entity_type': entity_type,
+                'sections': cls._pass_two_sections[entity_type],
+                }
+            cls.bootstrap_range_statement(
+                cls,
+                cls._pass_two_statement,
+                stage,
+                cls.entity_id,
+                where=(cls.entity_type == entity_type),
+                parameters=parameters,
+                processes=processes,
+                resume=resume,
+                )
+
+    @classmethod
+    def build_entity_names(cls):
+        statements = (
+            'DROP TABLE IF EXISTS entity_names',
+            """
+            CREATE UNLOGGED TABLE entity_names AS
+            SELECT DISTINCT ON (entity_type, name)
+                entity_type, name, entity_id
+            FROM entities
+            ORDER BY entity_type, name, entity_id
+            """,
+            """
+            CREATE UNIQUE INDEX entity_names_type_name
+            ON entity_names (entity_type, name)
+            """,
+            'ANALYZE entity_names',
+            )
+        database = cls._meta.database
+        with systemtools.Timer(verbose=False) as timer:
+            with database.execution_context():
+                for statement in statements:
+                    database.execute_sql(statement)
+        print('{} (Pass 2) [SQL] entity_names [{:.3f}s]'.format(
+            cls.__name__.upper(),
+            timer.elapsed_time,
+            ))
+
+    @classmethod
+    def bootstrap_pass_three(
+        cls,
+        pessimistic=False,
+        resume=False,
+        bulk=False,
+        processes=None,
+        ):
+        if bulk:
+            cls.bootstrap_pass_three_bulk(processes=processes, resume=resume)
+            return
+        for entity_type in (1, 2):
+            stage = 'entities:pass-three:{}'.format(entity_type)
+            cls.bootstrap_pass_scheduled(
+                cls,
+                cls.entity_id,
+                functools.partial(cls.bootstrap_pass_three_range, entity_type),
+                stage,
+                where=(cls.entity_type == entity_type),
+                processes=processes,
+                resume=resume,
+                )
+
+    @classmethod
+    def bootstrap_pass_three_range(
+        cls,
+        entity_type,
+        id_range,
+        corpus=None,
+        annotation='',
+        stage=None,
+        telemetry=None,
+        ):
+        start, stop = id_range
+        documents = cls.iterate_range_documents(
+            cls,
+            cls.entity_id,
+            start,
+            stop,
+            where=(cls.entity_type == entity_type),
+            fields=cls.pass_three_fields(),
+            stage=stage,
+            )
+        count = 0
+        for document in documents:
+            entity_id = document.entity_id
+            start_time = time.time()
+            with cls._meta.database.execution_context():
+                progress = float(entity_id - start) / (stop - start)
+                try:
+                    status = cls.bootstrap_pass_three_single(
+                        entity_type=entity_type,
+                        entity_id=entity_id,
+                        annotation=annotation,
+                        progress=progress,
+                        document=document,
+                        )
+                except:
+                    status = 'errors'
+                    print('ERROR:', entity_type, entity_id, annotation)
+                    traceback.print_exc()
+            if telemetry is not None:
+                telemetry.record(time.time() - start_time, status)
+            count += 1
+        return count
+
+    @classmethod
+    def bootstrap_pass_three_bulk(cls, processes=None, resume=False):
+        for entity_type in (1, 2):
+            stage = 'entities:pass-three-bulk:{}'.format(entity_type)
+            cls.bootstrap_range_statement(
+                cls,
+                cls._pass_three_statement,
+                stage,
+                cls.entity_id,
+                where=(cls.entity_type == entity_type),
+                parameters={'entity_type': entity_type},
+                processes=processes,
+                resume=resume,
+                )
 
     @classmethod
     def bootstrap_pass_two_single(
@@ -218,40 +451,49 @@ class PostgresEntity(PostgresModel):
         annotation='',
         corpus=None,
         progress=None,
+        document=None,
+        deleted_ids=None,
         ):
         skipped_template = u'{} (Pass 2) {:.3%} [{}]\t[SKIPPED] (id:{}) [{:.8f}]: {}'
         changed_template = u'{} (Pass 2) {:.3%} [{}]\t          (id:{}) [{:.8f}]: {}'
-        query = cls.select().where(
-            cls.entity_id == entity_id,
-            cls.entity_type == entity_type,
-            )
-        if not query.count():
-            return
-        document = query.get()
-        corpus = corpus or {}
-        with systemtools.Timer(verbose=False) as timer:
-            changed = document.resolve_references(corpus)
+        if document is None:
+            query = cls.select().where(
+                cls.entity_id == entity_id,
+                cls.entity_type == entity_type,
+                )
+            if not query.count():
+                return
+            document = query.get()
+        if corpus is None:
+            corpus = {}
+        start_time = time.time()
+        changed = document.resolve_references(
+            corpus, deleted_ids=deleted_ids)
+        elapsed_time = time.time() - start_time
         if not changed:
-            message = skipped_template.format(
+            if cls.log_rows:
+                message = skipped_template.format(
+                    cls.__name__.upper(),
+                    progress,
+                    annotation,
+                    (document.entity_type, document.entity_id),
+                    elapsed_time,
+                    document.name,
+                    )
+                print(message)
+            return 'skipped'
+        document.save()
+        if cls.log_rows:
+            message = changed_template.format(
                 cls.__name__.upper(),
                 progress,
                 annotation,
                 (document.entity_type, document.entity_id),
-                timer.elapsed_time,
+                elapsed_time,
                 document.name,
                 )
             print(message)
-            return
-        document.save()
-        message = changed_template.format(
-            cls.__name__.upper(),
-            progress,
-            annotation,
-            (document.entity_type, document.entity_id),
-            timer.elapsed_time,
-            document.name,
-            )
-        print(message)
+        return 'changed'
 
     @classmethod
     def bootstrap_pass_three_single(
@@ -260,20 +502,17 @@ class PostgresEntity(PostgresModel):
         entity_id,
         annotation='',
         progress=None,
+        document=None,
         ):
         import discograph
-        query = cls.select(
-            cls.entity_id,
-            cls.entity_type,
-            cls.name,
-            cls.relation_counts,
-            ).where(
-            cls.entity_id == entity_id,
-            cls.entity_type == entity_type,
-            )
-        if not query.count():
-            return
-        document = query.get()
+        if document is None:
+            query = cls.select(*cls.pass_three_fields()).where(
+                cls.entity_id == entity_id,
+                cls.entity_type == entity_type,
+                )
+            if not query.count():
+                return
+            document = query.get()
         entity_id = document.entity_id
         where_clause = (
             (discograph.PostgresRelation.entity_one_id == entity_id) &
@@ -297,21 +536,23 @@ class PostgresEntity(PostgresModel):
             relation_counts[relation.role].add(key)
         for role, keys in relation_counts.items():
             relation_counts[role] = len(keys)
-        if not relation_counts:
-            return
+        if not relation_counts and not document.relation_counts:
+            return 'skipped'
         document.relation_counts = relation_counts
         document.save()
-        message_pieces = [
-            cls.__name__.upper(),
-            progress,
-            annotation,
-            (document.entity_type, document.entity_id),
-            document.name,
-            len(relation_counts),
-            ]
-        template = u'{} (Pass 3) {:.3%} [{}]\t(id:{}) {}: {}'
-        message = template.format(*message_pieces)
-        print(message)
+        if cls.log_rows:
+            message_pieces = [
+                cls.__name__.upper(),
+                progress,
+                annotation,
+                (document.entity_type, document.entity_id),
+                document.name,
+                len(relation_counts),
+                ]
+            template = u'{} (Pass 3) {:.3%} [{}]\t(id:{}) {}: {}'
+            message = template.format(*message_pieces)
+            print(message)
+        return 'changed'
 
     @classmethod
     def element_to_names(cls, names):
@@ -388,9 +629,32 @@ class PostgresEntity(PostgresModel):
 
     @classmethod
     def from_element(cls, element):
-        data = cls.tags_to_fields(element)
+        data = cls.extract_fields(element)
         return cls(**data)
 
+    @classmethod
+    def get_referrer_ids(cls, entity_type, names, entity_ids):
+        if not names and not entity_ids:
+            return set()
+        database = cls._meta.database
+        cursor = database.get_cursor()
+        cursor.execute(cls._referrer_statement, {
+            'entity_ids': sorted(entity_ids),
+            'entity_type': entity_type,
+            'names': sorted(names),
+            'sections': cls._pass_two_sections[entity_type],
+            })
+        return set(_[0] for _ in cursor.fetchall())
+
+    @classmethod
+    def pass_three_fields(cls):
+        return (
+            cls.entity_id,
+            cls.entity_type,
+            cls.name,
+            cls.relation_counts,
+            )
+
     @classmethod
     def preprocess_data(cls, data, element):
         data['metadata'] = {}
@@ -424,32 +688,24 @@ class PostgresEntity(PostgresModel):
             data['entity_type'] = 2
         return data
 
-    def resolve_references(self, corpus):
+    def resolve_references(self, corpus, deleted_ids=None):
         changed = False
         if not self.entities:
             return changed
-        if self.entity_type == 1:
-            entity_type = 1
-            for section in ('aliases', 'groups', 'members'):
-                if section not in self.entities:
-                    continue
-                for entity_name in self.entities[section].keys():
-                    key = (entity_type, entity_name)
-                    self.update_corpus(corpus, key)
-                    if key in corpus:
-                        self.entities[section][entity_name] = corpus[key]
-                        changed = True
-        elif self.entity_type == 2:
-            entity_type = 2
-            for section in ('parent_label', 'sublabels'):
-                if section not in self.entities:
-                    continue
-                for entity_name in self.entities[section].keys():
-                    key = (entity_type, entity_name)
-                    self.update_corpus(corpus, key)
-                    if key in corpus:
-                        self.entities[section][entity_name] = corpus[key]
-                        changed = True
+        entity_type = self.entity_type
+        for section in self._pass_two_sections.get(entity_type, ()):
+            if section not in self.entities:
+                continue
+            references = self.entities[section]
+            for entity_name, entity_id in list(references.items()):
+                key = (entity_type, entity_name)
+                self.update_corpus(corpus, key)
+                if key in corpus:
+                    references[entity_name] = corpus[key]
+                    changed = True
+                elif deleted_ids and entity_id in deleted_ids:
+                    references[entity_name] = None
+                    changed = True
         return changed
 
     def roles_to_relation_count(self, roles):
@@ -634,6 +890,8 @@ class PostgresEntity(PostgresModel):
     def update_corpus(cls, corpus, key):
         if key in corpus:
             return
+        if getattr(corpus, 'is_exhaustive', False):
+            return
         entity_type, entity_name = key
         query = cls.select().where(
             cls.entity_type == entity_type,
@@ -679,3 +937,8 @@ PostgresEntity._tags_to_fields_mapping = {
     'sublabels': ('sublabels', PostgresEntity.element_to_sublabels),
     'urls': ('urls', Bootstrapper.element_to_strings),
     }
+
+
+PostgresEntity._tags_to_fields_extractor = \
+    PostgresModel.compile_tags_to_fields(
+        PostgresEntity._tags_to_fields_mapping)
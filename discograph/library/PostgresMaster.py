@@ -33,16 +33,26 @@ class PostgresMaster(PostgresModel):
 
     @classmethod
     def from_element(cls, element):
-        data = cls.tags_to_fields(element)
+        data = cls.extract_fields(element)
         return cls(**data)
 
     @classmethod
-    def bootstrap_pass_one(cls):
+    def bootstrap_pass_one(
+        cls,
+        bulk=True,
+        batch_size=10000,
+        processes=1,
+        resume=False,
+        ):
         PostgresModel.bootstrap_pass_one(
             model_class=cls,
             xml_tag='master',
             name_attr='title',
             skip_without=['title'],
+            bulk=bulk,
+            batch_size=batch_size,
+            processes=processes,
+            resume=resume,
             )
 
 
@@ -53,4 +63,9 @@ PostgresMaster._tags_to_fields_mapping = {
     'styles': ('styles', Bootstrapper.element_to_strings),
     'title': ('title', Bootstrapper.element_to_string),
     'year': ('year', Bootstrapper.element_to_integer),
-    }
\ No newline at end of file
+    }
+
+
+PostgresMaster._tags_to_fields_extractor = \
+    PostgresModel.compile_tags_to_fields(
+        PostgresMaster._tags_to_fields_mapping)
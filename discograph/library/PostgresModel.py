@@ -1,14 +1,25 @@
 # -*- encoding: utf-8 -*-
-import gzip
+import hashlib
+import json
+import multiprocessing
+import os
 import peewee
 import pprint
 import random
+import struct
+import time
 import traceback
 from abjad.tools import systemtools
 from playhouse import gfk
 from playhouse import pool
 from discograph.app import app
+from discograph.library.BootstrapScheduler import BootstrapScheduler
+from discograph.library.BootstrapStageGraph import BootstrapStageGraph
+from discograph.library.BootstrapTelemetry import BootstrapTelemetry
+from discograph.library.BootstrapThrottle import BootstrapThrottle
 from discograph.library.Bootstrapper import Bootstrapper
+from discograph.library.BulkLoader import BulkLoader
+from discograph.library.EntityCorpus import EntityCorpus
 
 
 database = pool.PostgresqlExtDatabase(
@@ -21,6 +32,54 @@ database = pool.PostgresqlExtDatabase(
 
 class PostgresModel(gfk.Model):
 
+    ### CLASS VARIABLES ###
+
+    class BootstrapPassOneWorker(multiprocessing.Process):
+
+        def __init__(
+            self,
+            model_class,
+            xml_path,
+            xml_tag,
+            stage,
+            record_range,
+            skip_without=None,
+            batch_size=10000,
+            ):
+            multiprocessing.Process.__init__(self)
+            self.model_class = model_class
+            self.xml_path = xml_path
+            self.xml_tag = xml_tag
+            self.stage = stage
+            self.record_range = record_range
+            self.skip_without = skip_without
+            self.batch_size = batch_size
+
+        def run(self):
+            PostgresModel.bootstrap_pass_one_range(
+                self.model_class,
+                self.xml_path,
+                self.xml_tag,
+                self.stage,
+                self.record_range,
+                skip_without=self.skip_without,
+                batch_size=self.batch_size,
+                )
+
+    _tags_to_fields_extractor = None
+
+    log_rows = False
+
+    retired_schema = 'discograph_retired'
+
+    serving_schema = 'public'
+
+    shadow_schema = 'discograph_shadow'
+
+    swap_lock_timeout = '10s'
+
+    telemetry_directory = None
+
     ### PEEWEE FIELDS ###
 
     random = peewee.FloatField(index=True, null=True)
@@ -67,20 +126,243 @@ class PostgresModel(gfk.Model):
     ### PUBLIC METHODS ###
 
     @classmethod
-    def bootstrap_postgres_models(cls, pessimistic=False):
+    def bootstrap_postgres_models(
+        cls,
+        pessimistic=False,
+        processes=None,
+        resume=False,
+        bulk=True,
+        fused=False,
+        pruning_profile=None,
+        only=None,
+        skip=None,
+        rerun=None,
+        ):
         import discograph
-        discograph.PostgresEntity.drop_table(True)
-        discograph.PostgresRelease.drop_table(True)
-        discograph.PostgresRelation.drop_table(True)
-        discograph.PostgresEntity.create_table(True)
-        discograph.PostgresRelease.create_table(True)
-        discograph.PostgresRelation.create_table(True)
-        discograph.PostgresEntity.bootstrap_pass_one()
-        discograph.PostgresEntity.bootstrap_pass_two(pessimistic=pessimistic)
-        discograph.PostgresRelease.bootstrap_pass_one()
-        discograph.PostgresRelease.bootstrap_pass_two(pessimistic=pessimistic)
-        discograph.PostgresRelation.bootstrap_pass_one(pessimistic=pessimistic)
-        discograph.PostgresEntity.bootstrap_pass_three(pessimistic=pessimistic)
+        if pruning_profile is not None:
+            Bootstrapper.pruning_profile = pruning_profile
+        state = discograph.PostgresBootstrapState
+        models = (
+            discograph.PostgresEntity,
+            discograph.PostgresMaster,
+            discograph.PostgresRelease,
+            discograph.PostgresRelation,
+            discograph.PostgresRelationRelease,
+            )
+        graph = cls.get_bootstrap_stage_graph(
+            pessimistic=pessimistic,
+            processes=processes,
+            bulk=bulk,
+            fused=fused,
+            )
+        graph.get_pending(only=only, skip=skip, rerun=rerun)
+        if not (resume or only or rerun):
+            for model in models:
+                model.drop_table(True)
+            state.drop_table(True)
+        for model in models:
+            model.create_table_deferred(True)
+        state.create_table(True)
+        return graph.run(only=only, skip=skip, rerun=rerun, resume=resume)
+
+    @classmethod
+    def bootstrap_shadow_models(
+        cls,
+        swap=True,
+        duty_cycle=None,
+        **keywords
+        ):
+        if duty_cycle is not None:
+            BootstrapThrottle.set_duty_cycle(duty_cycle)
+        cls.create_schema(cls.shadow_schema)
+        cls.use_schema(cls.shadow_schema)
+        try:
+            cls.bootstrap_postgres_models(**keywords)
+        finally:
+            cls.use_schema(None)
+        if swap:
+            cls.swap_schemas()
+
+    @classmethod
+    def bootstrap_indexes(
+        cls,
+        model_classes,
+        processes=None,
+        resume=False,
+        maintenance_work_mem=None,
+        ):
+        database = cls._meta.database
+        tasks = []
+        for model_class in model_classes:
+            tasks.extend(model_class.get_index_statements())
+        def procedure(task, context, annotation, telemetry):
+            index_name, statement = task
+            start_time = time.time()
+            with database.execution_context():
+                if maintenance_work_mem:
+                    database.execute_sql(
+                        'SET maintenance_work_mem = %s',
+                        (maintenance_work_mem,),
+                        )
+                database.execute_sql(statement)
+            elapsed_time = time.time() - start_time
+            telemetry.record(elapsed_time, 'indexes')
+            print(u'{} [INDEX] {} [{:.3f}s]'.format(
+                annotation,
+                index_name,
+                elapsed_time,
+                ))
+            return 1
+        with systemtools.Timer(verbose=False) as timer:
+            scheduler = BootstrapScheduler(
+                procedure,
+                tasks,
+                processes=processes,
+                name='INDEXES',
+                )
+            cls.close_connections()
+            scheduler.run()
+            with database.execution_context():
+                for model_class in model_classes:
+                    database.execute_sql(
+                        'ANALYZE {}'.format(model_class._meta.db_table))
+        print(u'INDEXES [SQL] {} indexes on {} [{:.3f}s]'.format(
+            len(tasks),
+            ', '.join(_._meta.db_table for _ in model_classes),
+            timer.elapsed_time,
+            ))
+
+    @classmethod
+    def bootstrap_delta_apply(
+        cls,
+        model_class,
+        key_field,
+        where,
+        pending,
+        delta,
+        ):
+        replaced_keys = [key for key, _ in pending if key in delta['changed']]
+        if replaced_keys:
+            cls.bootstrap_delta_retract(
+                model_class, key_field, where, replaced_keys, delta)
+        loader = BulkLoader(
+            model_class,
+            batch_size=max(len(pending), 1),
+            verbose=False,
+            )
+        with loader:
+            for _, data in pending:
+                loader.add(data)
+        pending[:] = []
+
+    @classmethod
+    def bootstrap_delta_pass_one(
+        cls,
+        model_class,
+        xml_tag,
+        key_field,
+        where=None,
+        skip_without=None,
+        batch_size=1000,
+        ):
+        xml_path = Bootstrapper.get_xml_path(xml_tag)
+        print(xml_path)
+        stored_documents = cls.iterate_by_key(
+            model_class,
+            key_field,
+            where=where,
+            batch_size=batch_size,
+            fields=(key_field, model_class.content_hash),
+            )
+        stored_rows = (
+            (getattr(_, key_field.name), _.content_hash)
+            for _ in stored_documents
+            )
+        stored_key, stored_hash = next(stored_rows, (None, None))
+        delta = {
+            'changed': set(),
+            'deleted': set(),
+            'entity_keys': set(),
+            'new': set(),
+            }
+        pending = []
+        deleted_keys = []
+        previous_key = None
+        for element in Bootstrapper.iterparse_records(xml_path, xml_tag):
+            data = cls.element_to_bootstrap_data(
+                model_class,
+                element,
+                skip_without=skip_without,
+                )
+            if data is None:
+                continue
+            key = int(data[key_field.name])
+            if previous_key is not None and key <= previous_key:
+                raise ValueError('{} is not ordered by {}: {} after {}'.format(
+                    xml_path, key_field.name, key, previous_key))
+            previous_key = key
+            while stored_key is not None and stored_key < key:
+                deleted_keys.append(stored_key)
+                stored_key, stored_hash = next(stored_rows, (None, None))
+            if batch_size <= len(deleted_keys):
+                cls.bootstrap_delta_retract(
+                    model_class, key_field, where, deleted_keys, delta)
+                delta['deleted'].update(deleted_keys)
+                deleted_keys = []
+            if stored_key == key:
+                is_unchanged = stored_hash == data['content_hash']
+                stored_key, stored_hash = next(stored_rows, (None, None))
+                if is_unchanged:
+                    continue
+                delta['changed'].add(key)
+            else:
+                delta['new'].add(key)
+            pending.append((key, data))
+            if batch_size <= len(pending):
+                cls.bootstrap_delta_apply(
+                    model_class, key_field, where, pending, delta)
+        if pending:
+            cls.bootstrap_delta_apply(
+                model_class, key_field, where, pending, delta)
+        while stored_key is not None:
+            deleted_keys.append(stored_key)
+            stored_key, stored_hash = next(stored_rows, (None, None))
+            if stored_key is None or batch_size <= len(deleted_keys):
+                cls.bootstrap_delta_retract(
+                    model_class, key_field, where, deleted_keys, delta)
+                delta['deleted'].update(deleted_keys)
+                deleted_keys = []
+        if deleted_keys:
+            cls.bootstrap_delta_retract(
+                model_class, key_field, where, deleted_keys, delta)
+            delta['deleted'].update(deleted_keys)
+        template = u'{} (Delta) {}: {} new, {} changed, {} deleted'
+        print(template.format(
+            model_class.__name__.upper(),
+            xml_tag,
+            len(delta['new']),
+            len(delta['changed']),
+            len(delta['deleted']),
+            ))
+        return delta
+
+    @classmethod
+    def bootstrap_delta_retract(
+        cls,
+        model_class,
+        key_field,
+        where,
+        keys,
+        delta,
+        ):
+        where_clause = key_field.in_(keys)
+        if where is not None:
+            where_clause &= where
+        with model_class._meta.database.execution_context():
+            documents = model_class.select().where(where_clause)
+            entity_keys = model_class.retract_documents(documents)
+            delta['entity_keys'].update(entity_keys)
+            model_class.delete().where(where_clause).execute()
 
     @classmethod
     def bootstrap_pass_one(
@@ -90,86 +372,937 @@ class PostgresModel(gfk.Model):
         id_attr='id',
         name_attr='name',
         skip_without=None,
+        bulk=True,
+        batch_size=10000,
+        processes=1,
+        resume=False,
+        where=None,
         ):
         # Pass one.
-        template = u'{} (Pass 1) (idx:{}) (id:{}) [{:.8f}]: {}'
         xml_path = Bootstrapper.get_xml_path(xml_tag)
         print(xml_path)
-        with gzip.GzipFile(xml_path, 'r') as file_pointer:
+        if not resume:
+            cls.clear_rows(model_class, where=where)
+        if bulk:
+            cls.bootstrap_pass_one_bulk(
+                model_class,
+                xml_path,
+                xml_tag,
+                skip_without=skip_without,
+                batch_size=batch_size,
+                processes=processes,
+                resume=resume,
+                )
+            return
+        template = u'{} (Pass 1) (idx:{}) (id:{}): {}'
+        telemetry = BootstrapTelemetry(name=model_class.__name__.upper())
+        batch_start_time = time.time()
+        batch_count = 0
+        with Bootstrapper.open_xml(xml_path) as file_pointer:
             iterator = Bootstrapper.iterparse(file_pointer, xml_tag)
             for i, element in enumerate(iterator):
                 data = None
                 try:
-                    with systemtools.Timer(verbose=False) as timer:
-                        data = model_class.tags_to_fields(element)
-                        if skip_without:
-                            if any(not data.get(_) for _ in skip_without):
-                                continue
-                        if element.get('id'):
-                            data['id'] = element.get('id')
-                        data['random'] = random.random()
-                        document = model_class.create(**data)
-                    message = template.format(
-                        model_class.__name__.upper(),
-                        i,
-                        getattr(document, id_attr),
-                        timer.elapsed_time,
-                        getattr(document, name_attr),
+                    data = cls.element_to_bootstrap_data(
+                        model_class,
+                        element,
+                        skip_without=skip_without,
                         )
-                    print(message)
+                    if data is None:
+                        telemetry.increment('skipped')
+                        continue
+                    document = model_class.create(**data)
                 except peewee.DataError as e:
                     pprint.pprint(data)
                     traceback.print_exc()
                     raise(e)
+                batch_count += 1
+                if cls.log_rows:
+                    print(template.format(
+                        model_class.__name__.upper(),
+                        i,
+                        getattr(document, id_attr),
+                        getattr(document, name_attr),
+                        ))
+                if batch_count < batch_size:
+                    continue
+                telemetry.record(
+                    time.time() - batch_start_time,
+                    'changed',
+                    amount=batch_count,
+                    )
+                telemetry.maybe_report()
+                batch_start_time = time.time()
+                batch_count = 0
+        if batch_count:
+            telemetry.record(
+                time.time() - batch_start_time,
+                'changed',
+                amount=batch_count,
+                )
+        telemetry.report(annotation='Pass 1')
+
+    @classmethod
+    def bootstrap_pass_one_bulk(
+        cls,
+        model_class,
+        xml_path,
+        xml_tag,
+        skip_without=None,
+        batch_size=10000,
+        processes=1,
+        resume=False,
+        ):
+        import discograph
+        state = discograph.PostgresBootstrapState
+        stage = '{}:pass-one:{}'.format(model_class._meta.db_table, xml_tag)
+        cls.prepare_bootstrap_stage(stage, resume=resume)
+        record_ranges = state.get_ranges(stage)
+        if not record_ranges:
+            if 1 < processes:
+                slices = Bootstrapper.get_record_slices(
+                    xml_path, xml_tag, processes)
+            else:
+                slices = [(0, None)]
+            for start, stop in slices:
+                key = state.make_range_key(start, stop)
+                state.set_position(stage, key, None, start=start, stop=stop)
+            record_ranges = state.get_ranges(stage)
+        record_ranges = [_ for _ in record_ranges if not _.is_completed]
+        workers = [
+            cls.BootstrapPassOneWorker(
+                model_class,
+                xml_path,
+                xml_tag,
+                stage,
+                record_range,
+                skip_without=skip_without,
+                batch_size=batch_size,
+                )
+            for record_range in record_ranges
+            ]
+        if len(workers) == 1:
+            workers[0].run()
+        else:
+            cls.close_connections()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            failed_keys = [
+                worker.record_range.key
+                for worker in workers
+                if worker.exitcode
+                ]
+            if failed_keys:
+                raise RuntimeError('{} (Pass 1) failed ranges: {}'.format(
+                    model_class.__name__.upper(),
+                    ', '.join(failed_keys),
+                    ))
+        with model_class._meta.database.execution_context():
+            incomplete_keys = [
+                _.key for _ in state.get_ranges(stage)
+                if not _.is_completed
+                ]
+        if incomplete_keys:
+            raise RuntimeError('{} (Pass 1) incomplete ranges: {}'.format(
+                model_class.__name__.upper(),
+                ', '.join(incomplete_keys),
+                ))
+
+    @classmethod
+    def bootstrap_pass_one_range(
+        cls,
+        model_class,
+        xml_path,
+        xml_tag,
+        stage,
+        record_range,
+        skip_without=None,
+        batch_size=10000,
+        ):
+        import discograph
+        state = discograph.PostgresBootstrapState
+        key = record_range.key
+        start = record_range.start
+        if record_range.position is not None:
+            start = record_range.position + 1
+            print('{} (Pass 1) [RESUMING] {} at record {}'.format(
+                model_class.__name__.upper(),
+                key,
+                start,
+                ))
+        iterator = Bootstrapper.iterparse_records(
+            xml_path,
+            xml_tag,
+            start=start,
+            stop=record_range.stop,
+            )
+        def checkpoint(position):
+            state.set_position(stage, key, position)
+        loader = BulkLoader(
+            model_class,
+            batch_size=batch_size,
+            checkpoint=checkpoint,
+            )
+        with loader:
+            for i, element in enumerate(iterator, start):
+                data = cls.element_to_bootstrap_data(
+                    model_class,
+                    element,
+                    skip_without=skip_without,
+                    )
+                if data is None:
+                    continue
+                loader.add(data, position=i)
+        with model_class._meta.database.execution_context():
+            state.mark_completed(stage, key)
+        if Bootstrapper.malformed_release_date_count:
+            print('{} (Pass 1) [{}] {} malformed release dates'.format(
+                model_class.__name__.upper(),
+                key,
+                Bootstrapper.malformed_release_date_count,
+                ))
+
+    @classmethod
+    def bootstrap_pass_scheduled(
+        cls,
+        model_class,
+        key_field,
+        procedure,
+        stage,
+        where=None,
+        processes=None,
+        resume=False,
+        corpus_path=None,
+        chunk_size=1000,
+        ):
+        with model_class._meta.database.execution_context():
+            cls.prepare_bootstrap_stage(stage, resume=resume)
+            id_ranges = cls.get_id_ranges(
+                model_class,
+                key_field,
+                where=where,
+                chunk_size=chunk_size,
+                )
+        def initializer():
+            if corpus_path:
+                return EntityCorpus(corpus_path)
+            return {}
+        def finalizer(corpus):
+            if corpus_path:
+                corpus.close()
+        def run_range(id_range, corpus, annotation, telemetry):
+            return procedure(
+                id_range,
+                corpus=corpus,
+                annotation=annotation,
+                stage=stage,
+                telemetry=telemetry,
+                )
+        cls.schedule_id_ranges(
+            run_range,
+            id_ranges,
+            stage=stage,
+            processes=processes,
+            initializer=initializer,
+            finalizer=finalizer,
+            name=model_class.__name__.upper(),
+            )
 
     @classmethod
     def bootstrap_pass_two(
         cls,
         model_class,
         name_attr='name',
+        batch_size=1000,
         ):
-        skipped_template = u'{} [SKIPPED] (Pass 2) (id:{}) [{:.8f}]: {}'
-        changed_template = u'{}           (Pass 2) (id:{}) [{:.8f}]: {}'
+        template = u'{} (Pass 2) [{}] (id:{}): {}'
+        telemetry = BootstrapTelemetry(name=model_class.__name__.upper())
         corpus = {}
-        maximum_id = model_class.select(peewee.fn.Max(model_class.id)).scalar()
-        for i in range(1, maximum_id + 1):
-            query = model_class.select().where(model_class.id == i)
-            if not query.count():
-                continue
-            document = list(query)[0]
-            with systemtools.Timer(verbose=False) as timer:
-                changed = document.resolve_references(corpus)
-            if not changed:
-                message = skipped_template.format(
+        batch_start_time = time.time()
+        batch_count = 0
+        for document in cls.iterate_by_key(model_class, model_class.id):
+            changed = document.resolve_references(corpus)
+            if changed:
+                document.save()
+            status = 'changed' if changed else 'skipped'
+            telemetry.increment(status)
+            batch_count += 1
+            if cls.log_rows:
+                print(template.format(
                     model_class.__name__.upper(),
+                    status.upper(),
                     document.id,
-                    timer.elapsed_time,
                     getattr(document, name_attr),
-                    )
-                print(message)
+                    ))
+            if batch_count < batch_size:
                 continue
-            document.save()
-            message = changed_template.format(
-                model_class.__name__.upper(),
-                document.id,
-                timer.elapsed_time,
-                getattr(document, name_attr),
+            telemetry.record(
+                time.time() - batch_start_time, amount=batch_count)
+            telemetry.maybe_report()
+            batch_start_time = time.time()
+            batch_count = 0
+        if batch_count:
+            telemetry.record(
+                time.time() - batch_start_time, amount=batch_count)
+        telemetry.report(annotation='Pass 2')
+
+    @classmethod
+    def bootstrap_range_statement(
+        cls,
+        model_class,
+        statement,
+        stage,
+        id_field,
+        where=None,
+        parameters=None,
+        processes=None,
+        resume=False,
+        chunk_size=10000,
+        ):
+        database = model_class._meta.database
+        with database.execution_context():
+            cls.prepare_bootstrap_stage(stage, resume=resume)
+            id_ranges = cls.get_id_ranges(
+                model_class, id_field, where=where, chunk_size=chunk_size)
+        def procedure(id_range, context, annotation, telemetry):
+            return cls.execute_range_statement(
+                model_class,
+                statement,
+                stage,
+                [id_range],
+                parameters=parameters,
+                annotation=annotation,
+                telemetry=telemetry,
+                )
+        with systemtools.Timer(verbose=False) as timer:
+            cls.schedule_id_ranges(
+                procedure,
+                id_ranges,
+                stage=stage,
+                processes=processes,
+                name=model_class.__name__.upper(),
                 )
-            print(message)
+        print(u'{} ({}) [SQL] {} ranges [{:.3f}s]'.format(
+            model_class.__name__.upper(),
+            stage,
+            len(id_ranges),
+            timer.elapsed_time,
+            ))
+
+    @staticmethod
+    def compile_tags_to_fields(mapping, ignore_none=None):
+        string_procedure = Bootstrapper.element_to_string
+        integer_procedure = Bootstrapper.element_to_integer
+        strings_procedure = Bootstrapper.element_to_strings
+        compiled_mapping = {}
+        for tag, (field_name, procedure) in mapping.items():
+            if procedure is string_procedure:
+                kind = 1
+            elif procedure is integer_procedure:
+                kind = 2
+            elif procedure is strings_procedure:
+                kind = 3
+            else:
+                kind = 0
+            compiled_mapping[tag] = (field_name, kind, procedure)
+        get_entry = compiled_mapping.get
+        def extract(element):
+            data = {}
+            for child_element in element:
+                entry = get_entry(child_element.tag)
+                if entry is None:
+                    continue
+                field_name, kind, procedure = entry
+                if kind == 1:
+                    value = child_element.text or None
+                elif kind == 2:
+                    value = int(child_element.text)
+                elif kind == 3:
+                    if len(child_element):
+                        value = [_.text for _ in child_element]
+                    else:
+                        value = None
+                else:
+                    value = procedure(child_element)
+                if ignore_none and value is None:
+                    continue
+                data[field_name] = value
+            return data
+        return extract
+
+    @classmethod
+    def clear_rows(cls, model_class, where=None):
+        database = model_class._meta.database
+        with database.execution_context():
+            if where is None:
+                database.execute_sql('TRUNCATE {}'.format(
+                    model_class._meta.db_table))
+            else:
+                model_class.delete().where(where).execute()
+
+    @classmethod
+    def close_connections(cls):
+        database = cls._meta.database
+        if not database.is_closed():
+            database.close()
+        if isinstance(database, pool.PooledDatabase):
+            database.close_all()
 
     @staticmethod
     def connect():
         database.connect()
 
+    @classmethod
+    def create_schema(cls, schema):
+        database = cls._meta.database
+        with database.execution_context():
+            database.execute_sql(
+                'CREATE SCHEMA IF NOT EXISTS {}'.format(schema))
+
+    @classmethod
+    def create_table_deferred(cls, fail_silently=False):
+        if fail_silently and cls.table_exists():
+            return
+        cls._meta.database.create_table(cls)
+
+    @classmethod
+    def element_to_bootstrap_data(cls, model_class, element, skip_without=None):
+        data = model_class.extract_fields(element)
+        if skip_without:
+            if any(not data.get(_) for _ in skip_without):
+                return None
+        if element.get('id'):
+            data['id'] = element.get('id')
+        if 'content_hash' in model_class._meta.fields:
+            data['content_hash'] = cls.get_content_hash(data)
+        data['random'] = random.random()
+        return data
+
+    @staticmethod
+    def get_content_hash(data):
+        data = dict(
+            (key, value) for key, value in data.items()
+            if not isinstance(value, peewee.Func)
+            )
+        string = json.dumps(data, sort_keys=True, default=str)
+        digest = hashlib.md5(string.encode('utf-8')).digest()
+        return struct.unpack('<q', digest[:8])[0]
+
+    @classmethod
+    def execute_range_statement(
+        cls,
+        model_class,
+        statement,
+        stage,
+        id_ranges,
+        parameters=None,
+        annotation='',
+        telemetry=None,
+        ):
+        import discograph
+        state = discograph.PostgresBootstrapState
+        database = model_class._meta.database
+        template = u'{} ({}) [{}]\t[SQL] (ids:{}) {} rows [{:.3f}s]'
+        total = 0
+        for start, stop in id_ranges:
+            key = state.make_range_key(start, stop)
+            keywords = dict(parameters or {})
+            keywords.update(start=start, stop=stop)
+            with systemtools.Timer(verbose=False) as timer:
+                with database.execution_context():
+                    cursor = database.get_cursor()
+                    cursor.execute(statement, keywords)
+                    row_count = cursor.rowcount
+                    state.mark_completed(stage, key, start=start, stop=stop)
+            total += row_count
+            if telemetry is not None:
+                telemetry.record(
+                    timer.elapsed_time, 'changed', amount=row_count)
+                telemetry.increment('ranges')
+                continue
+            print(template.format(
+                model_class.__name__.upper(),
+                stage,
+                annotation,
+                key,
+                row_count,
+                timer.elapsed_time,
+                ))
+        return total
+
+    @classmethod
+    def extract_fields(cls, element):
+        if cls._tags_to_fields_extractor is None:
+            return cls.tags_to_fields(element)
+        data = cls._tags_to_fields_extractor(element)
+        data = cls.preprocess_data(data, element)
+        return data
+
+    @classmethod
+    def get_bootstrap_stage_graph(
+        cls,
+        pessimistic=False,
+        processes=None,
+        bulk=True,
+        fused=False,
+        ):
+        import discograph
+        entity_class = discograph.PostgresEntity
+        master_class = discograph.PostgresMaster
+        relation_class = discograph.PostgresRelation
+        release_class = discograph.PostgresRelease
+        graph = BootstrapStageGraph(
+            processes=processes,
+            state=discograph.PostgresBootstrapState,
+            )
+        graph.add_stage(
+            'entities:pass-one',
+            entity_class.bootstrap_pass_one,
+            bulk=bulk,
+            )
+        graph.add_stage(
+            'masters:pass-one',
+            master_class.bootstrap_pass_one,
+            bulk=bulk,
+            )
+        corpus_dependencies = ()
+        if not bulk or fused:
+            graph.add_stage(
+                'entities:corpus',
+                entity_class.bootstrap_corpus,
+                dependencies=('entities:pass-one',),
+                parallel=False,
+                )
+            corpus_dependencies = ('entities:corpus',)
+        names_dependencies = ()
+        if bulk:
+            graph.add_stage(
+                'entities:names',
+                entity_class.bootstrap_entity_names,
+                dependencies=('entities:pass-one',),
+                parallel=False,
+                )
+            names_dependencies = ('entities:names',)
+        graph.add_stage(
+            'entities:pass-two',
+            entity_class.bootstrap_pass_two,
+            dependencies=(
+                ('entities:pass-one',) +
+                corpus_dependencies +
+                names_dependencies
+                ),
+            pessimistic=pessimistic,
+            bulk=bulk,
+            corpus_path=EntityCorpus.get_corpus_path(),
+            )
+        if fused:
+            graph.add_stage(
+                'releases:fused',
+                release_class.bootstrap_fused,
+                dependencies=corpus_dependencies,
+                corpus_path=EntityCorpus.get_corpus_path(),
+                )
+            release_stage = relation_stage = 'releases:fused'
+        else:
+            graph.add_stage(
+                'releases:pass-one',
+                release_class.bootstrap_pass_one,
+                bulk=bulk,
+                )
+            graph.add_stage(
+                'releases:pass-two',
+                release_class.bootstrap_pass_two,
+                dependencies=(
+                    ('entities:pass-one', 'releases:pass-one') +
+                    corpus_dependencies +
+                    names_dependencies
+                    ),
+                pessimistic=pessimistic,
+                bulk=bulk,
+                corpus_path=EntityCorpus.get_corpus_path(),
+                )
+            graph.add_stage(
+                'relations:pass-one',
+                relation_class.bootstrap_pass_one,
+                dependencies=('releases:pass-two',),
+                pessimistic=pessimistic,
+                bulk=bulk,
+                )
+            release_stage = 'releases:pass-two'
+            relation_stage = 'relations:pass-one'
+        if not (bulk or fused):
+            graph.add_stage(
+                'relations:cluster',
+                relation_class.bootstrap_cluster,
+                dependencies=(relation_stage,),
+                parallel=False,
+                )
+            relation_stage = 'relations:cluster'
+        graph.add_stage(
+            'relations:indexes',
+            cls.bootstrap_indexes,
+            dependencies=(relation_stage,),
+            model_classes=(
+                relation_class,
+                discograph.PostgresRelationRelease,
+                ),
+            )
+        graph.add_stage(
+            'entities:pass-three',
+            entity_class.bootstrap_pass_three,
+            dependencies=('entities:pass-two', 'relations:indexes'),
+            pessimistic=pessimistic,
+            bulk=bulk,
+            )
+        graph.add_stage(
+            'entities:indexes',
+            cls.bootstrap_indexes,
+            dependencies=('entities:pass-three',),
+            model_classes=(entity_class,),
+            )
+        graph.add_stage(
+            'masters:indexes',
+            cls.bootstrap_indexes,
+            dependencies=('masters:pass-one',),
+            model_classes=(master_class,),
+            )
+        graph.add_stage(
+            'releases:indexes',
+            cls.bootstrap_indexes,
+            dependencies=(release_stage,),
+            model_classes=(release_class,),
+            )
+        return graph
+
+    @classmethod
+    def get_id_ranges(
+        cls,
+        model_class,
+        id_field,
+        where=None,
+        count=1,
+        chunk_size=None,
+        ):
+        query = model_class.select(
+            peewee.fn.Min(id_field),
+            peewee.fn.Max(id_field),
+            )
+        if where is not None:
+            query = query.where(where)
+        minimum_id, maximum_id = query.tuples().get()
+        if minimum_id is None:
+            return []
+        if chunk_size is not None:
+            step = chunk_size
+        else:
+            step = max((maximum_id - minimum_id) // count + 1, 1)
+        id_ranges = []
+        for start in range(minimum_id, maximum_id + 1, step):
+            id_ranges.append((start, start + step))
+        return id_ranges
+
+    @classmethod
+    def get_index_statements(cls):
+        table_name = cls._meta.db_table
+        primary_key_names = tuple(
+            getattr(cls._meta.primary_key, 'field_names', ()))
+        indexes = []
+        for field in cls._meta.sorted_fields:
+            if field.primary_key:
+                continue
+            if field.index or field.unique:
+                indexes.append(((field.name,), field.unique))
+        indexes.extend(cls._meta.indexes or ())
+        statements = []
+        for field_names, is_unique in indexes:
+            if tuple(field_names) == primary_key_names:
+                continue
+            fields = [cls._meta.fields[_] for _ in field_names]
+            columns = [_.db_column for _ in fields]
+            index_name = '{}_{}'.format(table_name, '_'.join(columns))
+            if 64 < len(index_name):
+                index_hash = hashlib.md5(index_name.encode('utf-8'))
+                index_name = '{}_{}'.format(
+                    table_name[:55], index_hash.hexdigest()[:8])
+            statement = 'CREATE {}INDEX IF NOT EXISTS {} ON {}'.format(
+                'UNIQUE ' if is_unique else '',
+                index_name,
+                table_name,
+                )
+            index_type = getattr(fields[0], 'index_type', None)
+            if index_type:
+                statement += ' USING {}'.format(index_type)
+            statement += ' ({})'.format(', '.join(columns))
+            statements.append((index_name, statement))
+        return statements
+
+    @classmethod
+    def iterate_by_key(
+        cls,
+        model_class,
+        key_field,
+        where=None,
+        start=None,
+        stop=None,
+        batch_size=1000,
+        fields=None,
+        ):
+        database = model_class._meta.database
+        last_key = None
+        while True:
+            query = model_class.select(*(fields or ()))
+            if where is not None:
+                query = query.where(where)
+            if last_key is not None:
+                query = query.where(key_field > last_key)
+            elif start is not None:
+                query = query.where(key_field >= start)
+            if stop is not None:
+                query = query.where(key_field < stop)
+            query = query.order_by(key_field).limit(batch_size)
+            with database.execution_context():
+                documents = list(query)
+            for document in documents:
+                yield document
+            if len(documents) < batch_size:
+                return
+            last_key = getattr(documents[-1], key_field.name)
+
+    @classmethod
+    def iterate_range_documents(
+        cls,
+        model_class,
+        key_field,
+        start,
+        stop,
+        where=None,
+        fields=None,
+        stage=None,
+        ):
+        if stage:
+            return cls.iterate_resumable_documents(
+                stage,
+                model_class,
+                key_field,
+                start,
+                stop,
+                where=where,
+                fields=fields,
+                )
+        return cls.iterate_by_key(
+            model_class,
+            key_field,
+            where=where,
+            start=start,
+            stop=stop,
+            fields=fields,
+            )
+
+    @classmethod
+    def iterate_resumable_documents(
+        cls,
+        stage,
+        model_class,
+        key_field,
+        start,
+        stop,
+        where=None,
+        fields=None,
+        checkpoint_every=1000,
+        ):
+        import discograph
+        state = discograph.PostgresBootstrapState
+        database = model_class._meta.database
+        key = state.make_range_key(start, stop)
+        with database.execution_context():
+            if state.is_completed(stage, key):
+                return
+            position = state.get_position(stage, key)
+        documents = cls.iterate_by_key(
+            model_class,
+            key_field,
+            where=where,
+            start=start if position is None else position + 1,
+            stop=stop,
+            fields=fields,
+            )
+        for i, document in enumerate(documents, 1):
+            yield document
+            if not i % checkpoint_every:
+                with database.execution_context():
+                    state.set_position(
+                        stage,
+                        key,
+                        getattr(document, key_field.name),
+                        start=start,
+                        stop=stop,
+                        )
+        with database.execution_context():
+            state.mark_completed(stage, key, start=start, stop=stop)
+
+    @classmethod
+    def use_schema(cls, schema=None):
+        database = cls._meta.database
+        cls.close_connections()
+        if schema is None:
+            database.connect_kwargs.pop('options', None)
+        else:
+            database.connect_kwargs['options'] = \
+                '-c search_path={}'.format(schema)
+
+    @classmethod
+    def update_postgres_models(cls, batch_size=1000):
+        import discograph
+        entity_keys = discograph.PostgresEntity.bootstrap_delta(
+            batch_size=batch_size)
+        entity_keys.update(discograph.PostgresRelease.bootstrap_delta(
+            batch_size=batch_size))
+        entity_keys = sorted(entity_keys)
+        total = len(entity_keys)
+        for i, (entity_type, entity_id) in enumerate(entity_keys):
+            with cls._meta.database.execution_context():
+                discograph.PostgresEntity.bootstrap_pass_three_single(
+                    entity_type=entity_type,
+                    entity_id=entity_id,
+                    annotation='DELTA',
+                    progress=float(i) / total,
+                    )
+
     @classmethod
     def get_random(cls):
         n = random.random()
         return cls.select().where(cls.random > n).order_by(cls.random).get()
 
+    @classmethod
+    def prepare_bootstrap_stage(cls, stage, resume=False):
+        import discograph
+        state = discograph.PostgresBootstrapState
+        state.create_table(True)
+        if not resume:
+            state.reset(stage)
+
     @classmethod
     def preprocess_data(cls, data, element):
         return data
 
+    @classmethod
+    def retract_documents(cls, documents):
+        return set()
+
+    @classmethod
+    def schedule_id_ranges(
+        cls,
+        procedure,
+        id_ranges,
+        stage=None,
+        processes=None,
+        initializer=None,
+        finalizer=None,
+        name='BOOTSTRAP',
+        ):
+        import discograph
+        summary_path = None
+        if stage is not None and cls.telemetry_directory is not None:
+            summary_path = os.path.join(
+                cls.telemetry_directory,
+                '{}.json'.format(stage.replace(':', '-')),
+                )
+        if stage is not None:
+            state = discograph.PostgresBootstrapState
+            with cls._meta.database.execution_context():
+                completed_keys = state.get_completed_keys(stage)
+            id_ranges = [
+                _ for _ in id_ranges
+                if state.make_range_key(*_) not in completed_keys
+                ]
+        scheduler = BootstrapScheduler(
+            procedure,
+            id_ranges,
+            processes=processes,
+            initializer=initializer,
+            finalizer=finalizer,
+            name=name,
+            summary_path=summary_path,
+            )
+        cls.close_connections()
+        return scheduler.run()
+
+    @classmethod
+    def swap_schemas(
+        cls,
+        model_classes=None,
+        source_schema=None,
+        target_schema=None,
+        retired_schema=None,
+        ):
+        import discograph
+        if model_classes is None:
+            model_classes = (
+                discograph.PostgresEntity,
+                discograph.PostgresMaster,
+                discograph.PostgresRelease,
+                discograph.PostgresRelation,
+                discograph.PostgresRelationRelease,
+                )
+        source_schema = source_schema or cls.shadow_schema
+        target_schema = target_schema or cls.serving_schema
+        retired_schema = retired_schema or cls.retired_schema
+        table_names = [_._meta.db_table for _ in model_classes]
+        database = cls._meta.database
+        with systemtools.Timer(verbose=False) as timer:
+            with database.execution_context():
+                for table_name in table_names:
+                    if not cls.table_exists_in_schema(
+                        source_schema, table_name):
+                        raise ValueError('Missing table: {}.{}'.format(
+                            source_schema, table_name))
+                database.execute_sql(
+                    'SET LOCAL lock_timeout = %s',
+                    (cls.swap_lock_timeout,),
+                    )
+                database.execute_sql(
+                    'DROP SCHEMA IF EXISTS {} CASCADE'.format(retired_schema))
+                database.execute_sql(
+                    'CREATE SCHEMA {}'.format(retired_schema))
+                for table_name in table_names:
+                    if not cls.table_exists_in_schema(
+                        target_schema, table_name):
+                        continue
+                    database.execute_sql(
+                        'ALTER TABLE {}.{} SET SCHEMA {}'.format(
+                            target_schema, table_name, retired_schema))
+                for table_name in table_names:
+                    database.execute_sql(
+                        'ALTER TABLE {}.{} SET SCHEMA {}'.format(
+                            source_schema, table_name, target_schema))
+        print('BOOTSTRAP [SWAP] {} -> {} -> {}: {} [{:.3f}s]'.format(
+            source_schema,
+            target_schema,
+            retired_schema,
+            ', '.join(table_names),
+            timer.elapsed_time,
+            ))
+        version = discograph.RelationGrapher.invalidate_cache()
+        print('BOOTSTRAP [SWAP] dataset version {}'.format(version))
+
+    @classmethod
+    def table_exists(cls):
+        database = cls._meta.database
+        cursor = database.execute_sql(
+            'SELECT to_regclass(%s)', (cls._meta.db_table,))
+        return cursor.fetchone()[0] is not None
+
+    @classmethod
+    def table_exists_in_schema(cls, schema, table_name):
+        database = cls._meta.database
+        cursor = database.execute_sql(
+            'SELECT to_regclass(%s)',
+            ('{}.{}'.format(schema, table_name),),
+            )
+        return cursor.fetchone()[0] is not None
+
     @classmethod
     def tags_to_fields(cls, element, ignore_none=None, mapping=None):
         data = {}
@@ -1,13 +1,20 @@
 # -*- encoding: utf-8 -*-
+import glob
+import heapq
 import itertools
+import os
 import peewee
 import random
-import multiprocessing
 import re
+import shutil
+import tempfile
+import time
 import traceback
 from abjad.tools import datastructuretools
+from abjad.tools import systemtools
+from six.moves import cPickle as pickle
+from discograph.library.BulkLoader import BulkLoader
 from discograph.library.PostgresModel import PostgresModel
-from playhouse import postgres_ext
 
 
 class PostgresRelation(PostgresModel):
@@ -18,26 +25,6 @@ class PostgresRelation(PostgresModel):
         ARTIST = 1
         LABEL = 2
 
-    class BootstrapWorker(multiprocessing.Process):
-
-        corpus = {}
-
-        def __init__(self, indices):
-            multiprocessing.Process.__init__(self)
-            self.indices = indices
-
-        def run(self):
-            proc_name = self.name
-            for release_id in self.indices:
-                try:
-                    PostgresRelation.bootstrap_pass_one_inner(
-                        release_id,
-                        self.corpus,
-                        annotation=proc_name,
-                        )
-                except:
-                    traceback.print_exc()
-
     aggregate_roles = (
         'Compiled By',
         'Curated By',
@@ -46,6 +33,18 @@ class PostgresRelation(PostgresModel):
         'Presenter',
         )
 
+    max_triples_per_release = 10000
+
+    truncated_release_count = 0
+
+    _link_fields = (
+        'entity_one_type',
+        'entity_one_id',
+        'entity_two_type',
+        'entity_two_id',
+        'role',
+        )
+
     word_pattern = re.compile('\s+')
 
     ### PEEWEE FIELDS ###
@@ -55,7 +54,9 @@ class PostgresRelation(PostgresModel):
     entity_two_type = peewee.IntegerField(index=False)
     entity_two_id = peewee.IntegerField(index=False)
     role = peewee.CharField(index=False)
-    releases = postgres_ext.BinaryJSONField(null=True, index=False)
+    first_year = peewee.IntegerField(null=True, index=False)
+    last_year = peewee.IntegerField(null=True, index=False)
+    release_count = peewee.IntegerField(default=0, index=False)
 
     ### PEEWEE META ###
 
@@ -77,6 +78,12 @@ class PostgresRelation(PostgresModel):
                 'entity_two_type', 'entity_two_id',
                 'entity_one_type', 'entity_one_id',
                 'role'), True),
+            ((
+                'entity_one_type', 'entity_one_id',
+                'first_year', 'last_year'), False),
+            ((
+                'entity_two_type', 'entity_two_id',
+                'first_year', 'last_year'), False),
             )
 
     ### PRIVATE METHODS ###
@@ -93,6 +100,22 @@ class PostgresRelation(PostgresModel):
             artists.append(artist)
         return artists
 
+    @staticmethod
+    def _max_year(year_one, year_two):
+        if year_one is None:
+            return year_two
+        if year_two is None:
+            return year_one
+        return max(year_one, year_two)
+
+    @staticmethod
+    def _min_year(year_one, year_two):
+        if year_one is None:
+            return year_two
+        if year_two is None:
+            return year_one
+        return min(year_one, year_two)
+
     ### PUBLIC METHODS ###
 
     def as_json(self):
@@ -115,35 +138,169 @@ class PostgresRelation(PostgresModel):
         cls.bootstrap_pass_one()
 
     @classmethod
-    def bootstrap_pass_one(cls, pessimistic=False):
+    def bootstrap_cluster(cls, resume=False):
+        database = cls._meta.database
+        table_name = cls._meta.db_table
+        with systemtools.Timer(verbose=False) as timer:
+            with database.execution_context():
+                database.execute_sql('CLUSTER {} USING {}_pkey'.format(
+                    table_name, table_name))
+                database.execute_sql('ANALYZE {}'.format(table_name))
+        print('{} [SQL] CLUSTER {} [{:.3f}s]'.format(
+            cls.__name__.upper(),
+            table_name,
+            timer.elapsed_time,
+            ))
+
+    @classmethod
+    def bootstrap_pass_one(
+        cls,
+        pessimistic=False,
+        resume=False,
+        bulk=False,
+        processes=None,
+        ):
         import discograph
-        indices = discograph.PostgresRelease.get_indices(pessimistic)
-        workers = [cls.BootstrapWorker(_) for _ in indices]
-        for worker in workers:
-            worker.start()
-        for worker in workers:
-            worker.join()
-        for worker in workers:
-            worker.terminate()
+        if bulk:
+            cls.bootstrap_pass_one_bulk(processes=processes, resume=resume)
+            return
+        release_class = discograph.PostgresRelease
+        cls.bootstrap_pass_scheduled(
+            release_class,
+            release_class.id,
+            cls.bootstrap_pass_one_range,
+            'relations:pass-one',
+            processes=processes,
+            resume=resume,
+            )
 
     @classmethod
-    def bootstrap_pass_one_inner(cls, release_id, corpus, annotation=''):
+    def bootstrap_pass_one_bulk(
+        cls,
+        processes=None,
+        resume=False,
+        batch_size=10000,
+        spill_size=1000000,
+        chunk_size=1000,
+        ):
         import discograph
-        database = cls._meta.database
-        with database.execution_context(with_transaction=False):
-            release_cls = discograph.PostgresRelease
-            query = release_cls.select().where(release_cls.id == release_id)
-            if not query.count():
+        release_class = discograph.PostgresRelease
+        state = discograph.PostgresBootstrapState
+        stage = 'relations:pass-one:bulk'
+        with cls._meta.database.execution_context():
+            cls.prepare_bootstrap_stage(stage, resume=resume)
+            if resume and state.is_completed(stage):
+                print('{} (Pass 1) [SKIPPED] {} already completed'.format(
+                    cls.__name__.upper(),
+                    stage,
+                    ))
                 return
-            document = query.get()
-            relations = cls.from_release(document)
-            print('{} (Pass 1) [{}]\t(id:{})\t[{}] {}'.format(
+            cls.clear_rows(cls)
+            cls.clear_rows(discograph.PostgresRelationRelease)
+            id_ranges = cls.get_id_ranges(
+                release_class, release_class.id, chunk_size=chunk_size)
+        spill_directory = tempfile.mkdtemp(prefix='discograph-relations-')
+        def initializer():
+            return {'records': [], 'run_count': 0}
+        def finalizer(context):
+            cls.spill_relation_records(context, spill_directory)
+        def procedure(id_range, context, annotation, telemetry):
+            return cls.spill_relations(
+                id_range,
+                context,
+                spill_directory,
+                spill_size=spill_size,
+                annotation=annotation,
+                telemetry=telemetry,
+                )
+        try:
+            with systemtools.Timer(verbose=False) as timer:
+                cls.schedule_id_ranges(
+                    procedure,
+                    id_ranges,
+                    processes=processes,
+                    initializer=initializer,
+                    finalizer=finalizer,
+                    name=cls.__name__.upper(),
+                    )
+            print('{} (Pass 1) [SPILL] [{:.3f}s]'.format(
                 cls.__name__.upper(),
-                annotation,
-                document.id,
-                len(relations),
-                document.title,
+                timer.elapsed_time,
                 ))
+            cls.load_spill_directory(spill_directory, batch_size=batch_size)
+        finally:
+            shutil.rmtree(spill_directory)
+        with cls._meta.database.execution_context():
+            state.mark_completed(stage)
+
+    @classmethod
+    def bootstrap_pass_one_range(
+        cls,
+        id_range,
+        corpus=None,
+        annotation='',
+        stage=None,
+        telemetry=None,
+        ):
+        import discograph
+        release_class = discograph.PostgresRelease
+        start, stop = id_range
+        documents = cls.iterate_range_documents(
+            release_class,
+            release_class.id,
+            start,
+            stop,
+            stage=stage,
+            )
+        count = 0
+        for document in documents:
+            start_time = time.time()
+            status = 'changed'
+            try:
+                relations = cls.bootstrap_pass_one_inner(
+                    document.id,
+                    corpus,
+                    annotation=annotation,
+                    document=document,
+                    )
+                if not relations:
+                    status = 'skipped'
+            except:
+                status = 'errors'
+                traceback.print_exc()
+            if telemetry is not None:
+                telemetry.record(time.time() - start_time, status)
+            count += 1
+        return count
+
+    @classmethod
+    def bootstrap_pass_one_inner(
+        cls,
+        release_id,
+        corpus,
+        annotation='',
+        document=None,
+        ):
+        import discograph
+        relation_release_class = discograph.PostgresRelationRelease
+        database = cls._meta.database
+        with database.execution_context(with_transaction=False):
+            if document is None:
+                release_cls = discograph.PostgresRelease
+                query = release_cls.select().where(
+                    release_cls.id == release_id)
+                if not query.count():
+                    return []
+                document = query.get()
+            relations = cls.from_release(document)
+            if cls.log_rows:
+                print('{} (Pass 1) [{}]\t(id:{})\t[{}] {}'.format(
+                    cls.__name__.upper(),
+                    annotation,
+                    document.id,
+                    len(relations),
+                    document.title,
+                    ))
             for relation in relations:
                 instance, created = cls.create_or_get(
                     entity_one_type=relation['entity_one_type'],
@@ -153,81 +310,41 @@ class PostgresRelation(PostgresModel):
                     role=relation['role'],
                     )
                 if created:
-                    instance.releases = {}
+                    instance.release_count = 0
                     instance.random = random.random()
                 if 'release_id' in relation:
-                    release_id = relation['release_id']
                     year = relation.get('year')
-                    if not instance.releases:
-                        instance.releases = {}
-                    instance.releases[release_id] = year
+                    relation_release_class.add_release(
+                        instance,
+                        relation['release_id'],
+                        year=year,
+                        master_id=document.master_id,
+                        )
+                    first_year, last_year, release_count = \
+                        relation_release_class.get_relation_summary(instance)
+                    instance.first_year = first_year
+                    instance.last_year = last_year
+                    instance.release_count = release_count
                 instance.save()
+        return relations
 
     @classmethod
-    def from_release(cls, release):
-        import discograph
+    def from_release(cls, release, max_triples=None):
+        if max_triples is None:
+            max_triples = cls.max_triples_per_release
         triples = set()
-        artists, labels, is_compilation = cls.get_release_setup(release)
-        triples.update(cls.get_artist_label_relations(
-            artists,
-            labels,
-            is_compilation,
-            ))
-        aggregate_roles = {}
-
-        if is_compilation:
-            iterator = itertools.product(labels, release.extra_artists)
-        else:
-            iterator = itertools.product(artists, release.extra_artists)
-        for entity_two, credit in iterator:
-            for role in credit['roles']:
-                role = role['name']
-                if role not in discograph.CreditRole.all_credit_roles:
-                    continue
-                elif role in cls.aggregate_roles:
-                    if role not in aggregate_roles:
-                        aggregate_roles[role] = []
-                    aggregate_credit = (cls.EntityType.ARTIST, credit['id'])
-                    aggregate_roles[role].append(aggregate_credit)
-                    continue
-                entity_one = (cls.EntityType.ARTIST, credit['id'])
-                triples.add((entity_one, role, entity_two))
-
-        if is_compilation:
-            iterator = itertools.product(labels, release.companies)
-        else:
-            iterator = itertools.product(artists, release.companies)
-        for entity_one, company in iterator:
-                role = company['entity_type_name']
-                if role not in discograph.CreditRole.all_credit_roles:
-                    continue
-                entity_two = (cls.EntityType.LABEL, company['id'])
-                triples.add((entity_one, role, entity_two))
-
-        all_track_artists = set()
-        for track in release.tracklist:
-            track_artists = set(
-                (cls.EntityType.ARTIST, _['id'])
-                for _ in track.get('artists', ())
-                )
-            all_track_artists.update(track_artists)
-            if not track.get('extra_artists'):
+        for triple in cls.iterate_release_triples(release):
+            if triple in triples:
                 continue
-            track_artists = track_artists or artists or labels
-            iterator = itertools.product(track_artists, track['extra_artists'])
-            for entity_two, credit in iterator:
-                for role in credit.get('roles', ()):
-                    role = role['name']
-                    if role not in discograph.CreditRole.all_credit_roles:
-                        continue
-                    entity_one = (cls.EntityType.ARTIST, credit['id'])
-                    triples.add((entity_one, role, entity_two))
-        for role, aggregate_artists in aggregate_roles.items():
-            iterator = itertools.product(all_track_artists, aggregate_artists)
-            for track_artist, aggregate_artist in iterator:
-                entity_one = aggregate_artist
-                entity_two = track_artist
-                triples.add((entity_one, role, entity_two))
+            if max_triples is not None and max_triples <= len(triples):
+                cls.truncated_release_count += 1
+                print('{} [TRUNCATED] (id:{}) at {} triples'.format(
+                    cls.__name__.upper(),
+                    release.id,
+                    max_triples,
+                    ))
+                break
+            triples.add(triple)
         triples = sorted(triples)
         relations = cls.from_triples(triples, release=release)
         return relations
@@ -265,6 +382,17 @@ class PostgresRelation(PostgresModel):
             print('Query:', query)
         return query.get()
 
+    @classmethod
+    def get_year_clause(cls, year):
+        if isinstance(year, int):
+            start = stop = year
+        else:
+            start, stop = year
+        return (
+            cls.first_year.is_null(True) |
+            ((cls.first_year <= stop) & (cls.last_year >= start))
+            )
+
     @classmethod
     def get_release_setup(cls, release):
         is_compilation = False
@@ -292,6 +420,46 @@ class PostgresRelation(PostgresModel):
         #            break
         return artists, labels, is_compilation
 
+    @classmethod
+    def fold_master_records(cls, records):
+        previous = None
+        for record in records:
+            if previous is not None and record[5] and \
+                record[:6] == previous[:6]:
+                previous = previous[:6] + (
+                    min(previous[6], record[6]),
+                    cls._min_year(previous[7], record[7]),
+                    tuple(sorted(set(previous[8]) | set(record[8]))),
+                    )
+                continue
+            if previous is not None:
+                yield previous
+            previous = record
+        if previous is not None:
+            yield previous
+
+    @classmethod
+    def fold_relation_records(cls, records):
+        for link, group in itertools.groupby(records, key=lambda x: x[:5]):
+            data = dict(zip(cls._link_fields, link))
+            data['first_year'] = None
+            data['last_year'] = None
+            data['release_count'] = 0
+            releases = []
+            group = cls.fold_master_records(group)
+            for master_id, release_id, year, release_ids in (
+                    _[5:] for _ in group):
+                if release_id is None:
+                    continue
+                releases.append(
+                    (master_id or None, release_id, year, release_ids))
+                data['first_year'] = cls._min_year(data['first_year'], year)
+                data['last_year'] = cls._max_year(data['last_year'], year)
+                data['release_count'] += len(release_ids)
+            data['random'] = random.random()
+            data['releases'] = releases
+            yield data
+
     @classmethod
     def from_triples(cls, triples, release=None):
         relations = []
@@ -312,6 +480,223 @@ class PostgresRelation(PostgresModel):
             relations.append(relation)
         return relations
 
+    @classmethod
+    def iterate_release_triples(cls, release):
+        import discograph
+        artists, labels, is_compilation = cls.get_release_setup(release)
+        for triple in cls.get_artist_label_relations(
+            artists,
+            labels,
+            is_compilation,
+            ):
+            yield triple
+        aggregate_roles = {}
+
+        if is_compilation:
+            iterator = itertools.product(labels, release.extra_artists)
+        else:
+            iterator = itertools.product(artists, release.extra_artists)
+        for entity_two, credit in iterator:
+            for role in credit['roles']:
+                role = role['name']
+                if role not in discograph.CreditRole.all_credit_roles:
+                    continue
+                elif role in cls.aggregate_roles:
+                    if role not in aggregate_roles:
+                        aggregate_roles[role] = []
+                    aggregate_credit = (cls.EntityType.ARTIST, credit['id'])
+                    aggregate_roles[role].append(aggregate_credit)
+                    continue
+                entity_one = (cls.EntityType.ARTIST, credit['id'])
+                yield entity_one, role, entity_two
+
+        if is_compilation:
+            iterator = itertools.product(labels, release.companies)
+        else:
+            iterator = itertools.product(artists, release.companies)
+        for entity_one, company in iterator:
+                role = company['entity_type_name']
+                if role not in discograph.CreditRole.all_credit_roles:
+                    continue
+                entity_two = (cls.EntityType.LABEL, company['id'])
+                yield entity_one, role, entity_two
+
+        all_track_artists = set()
+        for track in release.tracklist:
+            track_artists = set(
+                (cls.EntityType.ARTIST, _['id'])
+                for _ in track.get('artists', ())
+                )
+            all_track_artists.update(track_artists)
+            if not track.get('extra_artists'):
+                continue
+            track_artists = track_artists or artists or labels
+            iterator = itertools.product(track_artists, track['extra_artists'])
+            for entity_two, credit in iterator:
+                for role in credit.get('roles', ()):
+                    role = role['name']
+                    if role not in discograph.CreditRole.all_credit_roles:
+                        continue
+                    entity_one = (cls.EntityType.ARTIST, credit['id'])
+                    yield entity_one, role, entity_two
+        for role, aggregate_artists in aggregate_roles.items():
+            iterator = itertools.product(all_track_artists, aggregate_artists)
+            for track_artist, aggregate_artist in iterator:
+                entity_one = aggregate_artist
+                entity_two = track_artist
+                yield entity_one, role, entity_two
+
+    @classmethod
+    def retract_release(cls, release):
+        import discograph
+        relation_release_class = discograph.PostgresRelationRelease
+        entity_keys = set()
+        for relation in cls.from_release(release):
+            query = cls.select().where(
+                cls.entity_one_type == relation['entity_one_type'],
+                cls.entity_one_id == relation['entity_one_id'],
+                cls.entity_two_type == relation['entity_two_type'],
+                cls.entity_two_id == relation['entity_two_id'],
+                cls.role == relation['role'],
+                )
+            if not query.count():
+                continue
+            instance = query.get()
+            relation_release_class.remove_release(
+                instance,
+                release.id,
+                master_id=release.master_id,
+                )
+            first_year, last_year, release_count = \
+                relation_release_class.get_relation_summary(instance)
+            if release_count:
+                instance.first_year = first_year
+                instance.last_year = last_year
+                instance.release_count = release_count
+                instance.save()
+            else:
+                instance.delete_instance()
+            entity_keys.add(
+                (relation['entity_one_type'], relation['entity_one_id']))
+            entity_keys.add(
+                (relation['entity_two_type'], relation['entity_two_id']))
+        return entity_keys
+
+    @classmethod
+    def iterate_spill_file(cls, spill_path):
+        with open(spill_path, 'rb') as file_pointer:
+            while True:
+                try:
+                    records = pickle.load(file_pointer)
+                except EOFError:
+                    return
+                for record in records:
+                    yield record
+
+    @classmethod
+    def spill_relation_records(cls, context, spill_directory, chunk_size=1000):
+        records = context['records']
+        if not records:
+            return
+        records.sort()
+        records[:] = list(cls.fold_master_records(records))
+        spill_path = os.path.join(spill_directory, '{}-{}.spill'.format(
+            os.getpid(), context['run_count']))
+        with open(spill_path, 'wb') as file_pointer:
+            for i in range(0, len(records), chunk_size):
+                pickle.dump(
+                    records[i:i + chunk_size],
+                    file_pointer,
+                    protocol=2,
+                    )
+        records[:] = []
+        context['run_count'] += 1
+
+    @classmethod
+    def spill_relations(
+        cls,
+        id_range,
+        context,
+        spill_directory,
+        spill_size=1000000,
+        annotation='',
+        telemetry=None,
+        ):
+        import discograph
+        release_class = discograph.PostgresRelease
+        start, stop = id_range
+        with cls._meta.database.execution_context():
+            query = release_class.select().where(
+                release_class.id >= start,
+                release_class.id < stop,
+                )
+            releases = list(query)
+        records = context['records']
+        truncated_count = cls.truncated_release_count
+        for release in releases:
+            start_time = time.time()
+            status = 'changed'
+            try:
+                records.extend(cls.release_to_relation_records(release))
+            except:
+                status = 'errors'
+                print('ERROR:', release.id, annotation)
+                traceback.print_exc()
+            if telemetry is not None:
+                telemetry.record(time.time() - start_time, status)
+        if spill_size <= len(records):
+            cls.spill_relation_records(context, spill_directory)
+        truncated_count = cls.truncated_release_count - truncated_count
+        if telemetry is not None and truncated_count:
+            telemetry.increment('truncated_releases', truncated_count)
+        return len(releases)
+
+    @classmethod
+    def load_spill_directory(cls, spill_directory, batch_size=10000):
+        import discograph
+        spill_paths = sorted(glob.glob(
+            os.path.join(spill_directory, '*.spill')))
+        print('{} (Pass 1) [MERGE] {} runs'.format(
+            cls.__name__.upper(),
+            len(spill_paths),
+            ))
+        iterators = [cls.iterate_spill_file(_) for _ in spill_paths]
+        loader = BulkLoader(cls, batch_size=batch_size)
+        release_loader = BulkLoader(
+            discograph.PostgresRelationRelease,
+            batch_size=batch_size,
+            )
+        with loader, release_loader:
+            records = heapq.merge(*iterators)
+            for data in cls.fold_relation_records(records):
+                for master_id, release_id, year, release_ids in \
+                    data['releases']:
+                    release_data = dict(
+                        (_, data[_]) for _ in cls._link_fields)
+                    release_data.update(
+                        master_id=master_id,
+                        release_id=release_id,
+                        year=year,
+                        release_ids=list(release_ids) if master_id else None,
+                        release_count=len(release_ids),
+                        )
+                    release_loader.add(release_data)
+                loader.add(data)
+
+    @classmethod
+    def release_to_relation_records(cls, release):
+        records = []
+        for relation in cls.from_release(release):
+            record = tuple(relation[_] for _ in cls._link_fields)
+            record += (
+                release.master_id or 0,
+                relation.get('release_id'),
+                relation.get('year'),
+                (relation.get('release_id'),),
+                )
+            records.append(record)
+        return records
+
     @classmethod
     def search(
         cls,
@@ -332,19 +717,14 @@ class PostgresRelation(PostgresModel):
         if roles:
             where_clause &= (cls.role.in_(roles))
         if year is not None:
-            year_clause = cls.year.is_null(True)
-            if isinstance(year, int):
-                year_clause |= cls.year == year
-            else:
-                year_clause |= cls.year.between(year[0], year[1])
-            where_clause &= year_clause
+            where_clause &= cls.get_year_clause(year)
         query = cls.select().where(where_clause)
         if query_only:
             return query
         return list(query)
 
     @classmethod
-    def search_multi(cls, entity_keys, roles=None):
+    def search_multi(cls, entity_keys, roles=None, year=None):
         assert entity_keys
         artist_ids, label_ids = [], []
         for entity_type, entity_id in entity_keys:
@@ -374,6 +754,8 @@ class PostgresRelation(PostgresModel):
             where_clause = label_where_clause
         if roles:
             where_clause &= (cls.role.in_(roles))
+        if year is not None:
+            where_clause &= cls.get_year_clause(year)
         query = cls.select().where(where_clause)
         relations = {}
         for relation in query:
@@ -397,12 +779,7 @@ class PostgresRelation(PostgresModel):
             if roles:
                 where_clause &= cls.role.in_(roles)
             if year is not None:
-                year_clause = cls.year.is_null(True)
-                if isinstance(year, int):
-                    year_clause |= cls.year == year
-                else:
-                    year_clause |= cls.year.between(year[0], year[1])
-                where_clause &= year_clause
+                where_clause &= cls.get_year_clause(year)
             query = cls.select().where(where_clause)
             return query
         lh_artist_ids = []
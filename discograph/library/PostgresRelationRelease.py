@@ -0,0 +1,170 @@
+# -*- encoding: utf-8 -*-
+import peewee
+from playhouse import postgres_ext
+from discograph.library.PostgresModel import PostgresModel
+
+
+class PostgresRelationRelease(PostgresModel):
+
+    ### CLASS VARIABLES ###
+
+    _add_master_statement = """
+        INSERT INTO relation_releases (
+            entity_one_type, entity_one_id,
+            entity_two_type, entity_two_id,
+            role, release_id, master_id, year, release_ids, release_count
+            )
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 1)
+        ON CONFLICT (
+            entity_one_type, entity_one_id,
+            entity_two_type, entity_two_id,
+            role, master_id
+            )
+        DO UPDATE SET
+            release_id = LEAST(
+                EXCLUDED.release_id, relation_releases.release_id),
+            year = LEAST(EXCLUDED.year, relation_releases.year),
+            release_ids = ARRAY(
+                SELECT DISTINCT id
+                FROM unnest(
+                    relation_releases.release_ids || EXCLUDED.release_ids
+                    ) AS id
+                ORDER BY id
+                ),
+            release_count = (
+                SELECT count(DISTINCT id)
+                FROM unnest(
+                    relation_releases.release_ids || EXCLUDED.release_ids
+                    ) AS id
+                )
+        """
+
+    _add_release_statement = """
+        INSERT INTO relation_releases (
+            entity_one_type, entity_one_id,
+            entity_two_type, entity_two_id,
+            role, release_id, master_id, year, release_count
+            )
+        VALUES (%s, %s, %s, %s, %s, %s, NULL, %s, 1)
+        ON CONFLICT DO NOTHING
+        """
+
+    ### PEEWEE FIELDS ###
+
+    entity_one_type = peewee.IntegerField(index=False)
+    entity_one_id = peewee.IntegerField(index=False)
+    entity_two_type = peewee.IntegerField(index=False)
+    entity_two_id = peewee.IntegerField(index=False)
+    role = peewee.CharField(index=False)
+    release_id = peewee.IntegerField(index=True)
+    master_id = peewee.IntegerField(null=True, index=False)
+    year = peewee.IntegerField(null=True, index=False)
+    release_ids = postgres_ext.ArrayField(
+        peewee.IntegerField, null=True, index=False)
+    release_count = peewee.IntegerField(default=1, index=False)
+    random = None
+
+    ### PEEWEE META ###
+
+    class Meta:
+        db_table = 'relation_releases'
+        primary_key = peewee.CompositeKey(
+            'entity_one_type',
+            'entity_one_id',
+            'entity_two_type',
+            'entity_two_id',
+            'role',
+            'release_id',
+            )
+        indexes = (
+            ((
+                'entity_one_type', 'entity_one_id',
+                'entity_two_type', 'entity_two_id',
+                'role', 'master_id'), True),
+            )
+
+    ### PUBLIC METHODS ###
+
+    @classmethod
+    def add_release(cls, relation, release_id, year=None, master_id=None):
+        relation_key = (
+            relation.entity_one_type,
+            relation.entity_one_id,
+            relation.entity_two_type,
+            relation.entity_two_id,
+            relation.role,
+            )
+        if master_id:
+            cls._meta.database.execute_sql(
+                cls._add_master_statement,
+                relation_key + (release_id, master_id, year, [release_id]),
+                )
+        else:
+            cls._meta.database.execute_sql(
+                cls._add_release_statement,
+                relation_key + (release_id, year),
+                )
+
+    @classmethod
+    def create_table_deferred(cls, fail_silently=False):
+        super(PostgresRelationRelease, cls).create_table_deferred(
+            fail_silently=fail_silently)
+        database = cls._meta.database
+        for index_name, statement in cls.get_index_statements():
+            if 'UNIQUE' in statement:
+                database.execute_sql(statement)
+
+    @classmethod
+    def get_relation_summary(cls, relation):
+        where_clause = cls.get_relation_where_clause(relation)
+        query = cls.select(
+            peewee.fn.Min(cls.year),
+            peewee.fn.Max(cls.year),
+            peewee.fn.Sum(cls.release_count),
+            ).where(where_clause).tuples()
+        for first_year, last_year, release_count in query:
+            return first_year, last_year, release_count or 0
+        return None, None, 0
+
+    @classmethod
+    def get_relation_where_clause(cls, relation):
+        return (
+            (cls.entity_one_type == relation.entity_one_type) &
+            (cls.entity_one_id == relation.entity_one_id) &
+            (cls.entity_two_type == relation.entity_two_type) &
+            (cls.entity_two_id == relation.entity_two_id) &
+            (cls.role == relation.role)
+            )
+
+    @classmethod
+    def remove_release(cls, relation, release_id, master_id=None):
+        import discograph
+        where_clause = cls.get_relation_where_clause(relation)
+        if not master_id:
+            where_clause &= (cls.release_id == release_id)
+            cls.delete().where(where_clause).execute()
+            return
+        where_clause &= (cls.master_id == master_id)
+        query = cls.select().where(where_clause)
+        if not query.count():
+            return
+        instance = query.get()
+        release_ids = [
+            _ for _ in (instance.release_ids or ())
+            if _ != release_id
+            ]
+        if not release_ids:
+            cls.delete().where(where_clause).execute()
+            return
+        release_class = discograph.PostgresRelease
+        query = release_class.select(release_class.release_date).where(
+            release_class.id.in_(release_ids),
+            release_class.release_date.is_null(False),
+            )
+        years = [release_date.year for release_date, in query.tuples()]
+        cls.update(
+            release_id=min(release_ids),
+            release_ids=release_ids,
+            release_count=len(release_ids),
+            year=min(years) if years else None,
+            ).where(where_clause).execute()
@@ -1,11 +1,17 @@
 # -*- encoding: utf-8 -*-
 import multiprocessing
 import peewee
+import shutil
+import tempfile
+import time
 import traceback
-from abjad.tools import sequencetools
 from abjad.tools import systemtools
 from playhouse import postgres_ext
+from discograph.library.BootstrapScheduler import BootstrapScheduler
 from discograph.library.Bootstrapper import Bootstrapper
+from discograph.library.BulkLoader import BulkLoader
+from discograph.library.CreditRole import CreditRole
+from discograph.library.EntityCorpus import EntityCorpus
 from discograph.library.PostgresModel import PostgresModel
 
 
@@ -13,35 +19,43 @@ class PostgresRelease(PostgresModel):
 
     ### CLASS VARIABLES ###
 
+    _artists_extractor = None
+
     _artists_mapping = {}
 
+    _companies_extractor = None
+
     _companies_mapping = {}
 
+    _tracks_extractor = None
+
     _tracks_mapping = {}
 
-    class BootstrapPassTwoWorker(multiprocessing.Process):
-
-        def __init__(self, indices):
-            multiprocessing.Process.__init__(self)
-            self.indices = indices
-
-        def run(self):
-            proc_name = self.name
-            corpus = {}
-            total = len(self.indices)
-            for i, release_id in enumerate(self.indices):
-                with PostgresRelease._meta.database.execution_context():
-                    progress = float(i) / total
-                    try:
-                        PostgresRelease.bootstrap_pass_two_single(
-                            release_id=release_id,
-                            annotation=proc_name,
-                            corpus=corpus,
-                            progress=progress,
-                            )
-                    except:
-                        print('ERROR:', release_id, proc_name)
-                        traceback.print_exc()
+    _pass_two_statement = """
+        UPDATE releases AS target
+        SET labels = resolved.labels
+        FROM (
+            SELECT source.id,
+                jsonb_agg(
+                    CASE WHEN entity_names.entity_id IS NULL THEN labels.value
+                    ELSE labels.value || jsonb_build_object(
+                        'id', entity_names.entity_id)
+                    END
+                    ORDER BY labels.ordinality
+                    ) AS labels
+            FROM releases AS source
+            CROSS JOIN LATERAL jsonb_array_elements(source.labels)
+                WITH ORDINALITY AS labels (value, ordinality)
+            LEFT JOIN entity_names
+                ON entity_names.entity_type = 2
+                AND entity_names.name = labels.value ->> 'name'
+            WHERE %(start)s <= source.id
+                AND source.id < %(stop)s
+            GROUP BY source.id
+            ) AS resolved
+        WHERE target.id = resolved.id
+            AND target.labels IS DISTINCT FROM resolved.labels
+        """
 
     ### PEEWEE FIELDS ###
 
@@ -60,6 +74,7 @@ class PostgresRelease(PostgresModel):
     styles = postgres_ext.ArrayField(peewee.TextField, null=True, index=False)
     title = peewee.TextField(index=False)
     tracklist = postgres_ext.BinaryJSONField(null=True, index=False)
+    content_hash = peewee.BigIntegerField(null=True, index=False)
 
     ### PEEWEE META ###
 
@@ -76,62 +91,262 @@ class PostgresRelease(PostgresModel):
         cls.bootstrap_pass_two()
 
     @classmethod
-    def bootstrap_pass_one(cls):
+    def bootstrap_pass_one(
+        cls,
+        bulk=True,
+        batch_size=10000,
+        processes=1,
+        resume=False,
+        ):
         PostgresModel.bootstrap_pass_one(
             model_class=cls,
             xml_tag='release',
             name_attr='title',
             skip_without=['title'],
+            bulk=bulk,
+            batch_size=batch_size,
+            processes=processes,
+            resume=resume,
             )
 
     @classmethod
-    def get_indices(cls, pessimistic=False):
-        indices = []
-        if not pessimistic:
-            maximum_id = cls.select(
-                peewee.fn.Max(cls.id)).scalar()
-            step = maximum_id // multiprocessing.cpu_count()
-            for start in range(0, maximum_id, step):
-                stop = start + step
-                indices.append(range(start, stop))
-        else:
-            query = cls.select(cls.id)
-            query = query.order_by(cls.id)
-            query = query.tuples()
-            all_ids = tuple(_[0] for _ in query)
-            ratio = [1] * (multiprocessing.cpu_count() * 2)
-            for chunk in sequencetools.partition_sequence_by_ratio_of_lengths(
-                all_ids, ratio):
-                indices.append(chunk)
-        return indices
+    def bootstrap_delta(cls, batch_size=1000):
+        import discograph
+        delta = PostgresModel.bootstrap_delta_pass_one(
+            cls,
+            'release',
+            key_field=cls.id,
+            skip_without=['title'],
+            batch_size=batch_size,
+            )
+        corpus = {}
+        entity_keys = set(delta['entity_keys'])
+        release_ids = sorted(delta['new'] | delta['changed'])
+        total = len(release_ids)
+        for i, release_id in enumerate(release_ids):
+            with cls._meta.database.execution_context():
+                cls.bootstrap_pass_two_single(
+                    release_id=release_id,
+                    annotation='DELTA',
+                    corpus=corpus,
+                    progress=float(i) / total,
+                    )
+            relations = discograph.PostgresRelation.bootstrap_pass_one_inner(
+                release_id,
+                corpus,
+                annotation='DELTA',
+                )
+            for relation in relations:
+                entity_keys.add(
+                    (relation['entity_one_type'], relation['entity_one_id']))
+                entity_keys.add(
+                    (relation['entity_two_type'], relation['entity_two_id']))
+        return entity_keys
 
     @classmethod
-    def get_release_iterator(cls, pessimistic=False):
-        if not pessimistic:
-            maximum_id = cls.select(peewee.fn.Max(cls.id)).scalar()
-            for i in range(1, maximum_id + 1):
-                query = cls.select().where(cls.id == i)
-                if not query.count():
+    def bootstrap_fused(
+        cls,
+        processes=None,
+        resume=False,
+        batch_size=10000,
+        spill_size=1000000,
+        corpus_path=None,
+        ):
+        import discograph
+        relation_class = discograph.PostgresRelation
+        processes = processes or multiprocessing.cpu_count()
+        if corpus_path is None:
+            corpus_path = EntityCorpus.build()
+        xml_path = Bootstrapper.get_xml_path('release')
+        print(xml_path)
+        with cls._meta.database.execution_context():
+            cls.delete().execute()
+            relation_class.delete().execute()
+            discograph.PostgresRelationRelease.delete().execute()
+        record_slices = Bootstrapper.get_record_slices(
+            xml_path, 'release', processes)
+        spill_directory = tempfile.mkdtemp(prefix='discograph-releases-')
+        def initializer():
+            return {
+                'corpus': EntityCorpus(corpus_path),
+                'records': [],
+                'run_count': 0,
+                }
+        def finalizer(context):
+            relation_class.spill_relation_records(context, spill_directory)
+            context['corpus'].close()
+        def procedure(record_slice, context, annotation, telemetry):
+            return cls.bootstrap_fused_slice(
+                xml_path,
+                record_slice,
+                context,
+                spill_directory,
+                batch_size=batch_size,
+                spill_size=spill_size,
+                annotation=annotation,
+                telemetry=telemetry,
+                )
+        try:
+            with systemtools.Timer(verbose=False) as timer:
+                scheduler = BootstrapScheduler(
+                    procedure,
+                    record_slices,
+                    processes=processes,
+                    initializer=initializer,
+                    finalizer=finalizer,
+                    name=cls.__name__.upper(),
+                    )
+                cls.close_connections()
+                scheduler.run()
+            print('{} (Fused) {} slices [{:.3f}s]'.format(
+                cls.__name__.upper(),
+                len(record_slices),
+                timer.elapsed_time,
+                ))
+            relation_class.load_spill_directory(
+                spill_directory, batch_size=batch_size)
+        finally:
+            shutil.rmtree(spill_directory)
+
+    @classmethod
+    def bootstrap_fused_slice(
+        cls,
+        xml_path,
+        record_slice,
+        context,
+        spill_directory,
+        batch_size=10000,
+        spill_size=1000000,
+        annotation='',
+        telemetry=None,
+        ):
+        import discograph
+        relation_class = discograph.PostgresRelation
+        start, stop = record_slice
+        elements = Bootstrapper.iterparse_records(
+            xml_path, 'release', start=start, stop=stop)
+        records = context['records']
+        loader = BulkLoader(cls, batch_size=batch_size, verbose=False)
+        malformed_count = Bootstrapper.malformed_release_date_count
+        truncated_count = relation_class.truncated_release_count
+        count = 0
+        with loader:
+            for element in elements:
+                start_time = time.time()
+                data = cls.element_to_bootstrap_data(
+                    cls, element, skip_without=['title'])
+                if data is None:
+                    if telemetry is not None:
+                        telemetry.increment('skipped')
                     continue
-                document = query.get()
-                yield document
-        else:
-            id_query = cls.select(cls.id)
-            for release in id_query:
-                release_id = release.id
-                release = cls.select().where(cls.id == release_id).get()
-                yield release
+                data['id'] = int(data['id'])
+                document = cls(**data)
+                status = 'changed'
+                try:
+                    if document.labels:
+                        document.resolve_references(context['corpus'])
+                    records.extend(
+                        relation_class.release_to_relation_records(document))
+                except:
+                    status = 'errors'
+                    print('ERROR:', document.id, annotation)
+                    traceback.print_exc()
+                loader.add(data)
+                if telemetry is not None:
+                    telemetry.record(time.time() - start_time, status)
+                count += 1
+                if spill_size <= len(records):
+                    relation_class.spill_relation_records(
+                        context, spill_directory)
+        if telemetry is not None:
+            malformed_count = (
+                Bootstrapper.malformed_release_date_count - malformed_count)
+            if malformed_count:
+                telemetry.increment('malformed_dates', malformed_count)
+            truncated_count = (
+                relation_class.truncated_release_count - truncated_count)
+            if truncated_count:
+                telemetry.increment('truncated_releases', truncated_count)
+        return count
+
+    @classmethod
+    def get_release_iterator(cls, pessimistic=False):
+        return cls.iterate_by_key(cls, cls.id)
+
+    @classmethod
+    def bootstrap_pass_two(
+        cls,
+        pessimistic=False,
+        resume=False,
+        corpus_path=None,
+        bulk=False,
+        processes=None,
+        ):
+        if bulk:
+            cls.bootstrap_pass_two_bulk(processes=processes, resume=resume)
+            return
+        if corpus_path is None:
+            corpus_path = EntityCorpus.build()
+        cls.bootstrap_pass_scheduled(
+            cls,
+            cls.id,
+            cls.bootstrap_pass_two_range,
+            'releases:pass-two',
+            processes=processes,
+            resume=resume,
+            corpus_path=corpus_path,
+            )
+
+    @classmethod
+    def bootstrap_pass_two_bulk(cls, processes=None, resume=False):
+        cls.bootstrap_range_statement(
+            cls,
+            cls._pass_two_statement,
+            'releases:pass-two-bulk',
+            cls.id,
+            processes=processes,
+            resume=resume,
+            )
 
     @classmethod
-    def bootstrap_pass_two(cls, pessimistic=False):
-        indices = cls.get_indices(pessimistic=pessimistic)
-        workers = [cls.BootstrapPassTwoWorker(x) for x in indices]
-        for worker in workers:
-            worker.start()
-        for worker in workers:
-            worker.join()
-        for worker in workers:
-            worker.terminate()
+    def bootstrap_pass_two_range(
+        cls,
+        id_range,
+        corpus=None,
+        annotation='',
+        stage=None,
+        telemetry=None,
+        ):
+        start, stop = id_range
+        documents = cls.iterate_range_documents(
+            cls,
+            cls.id,
+            start,
+            stop,
+            stage=stage,
+            )
+        count = 0
+        for document in documents:
+            release_id = document.id
+            start_time = time.time()
+            with cls._meta.database.execution_context():
+                progress = float(release_id - start) / (stop - start)
+                try:
+                    status = cls.bootstrap_pass_two_single(
+                        release_id=release_id,
+                        annotation=annotation,
+                        corpus=corpus,
+                        progress=progress,
+                        document=document,
+                        )
+                except:
+                    status = 'errors'
+                    print('ERROR:', release_id, annotation)
+                    traceback.print_exc()
+            if telemetry is not None:
+                telemetry.record(time.time() - start_time, status)
+            count += 1
+        return count
 
     @classmethod
     def bootstrap_pass_two_single(
@@ -140,36 +355,42 @@ class PostgresRelease(PostgresModel):
         annotation='',
         corpus=None,
         progress=None,
+        document=None,
         ):
         skipped_template = u'{} (Pass 2) {:.3%} [{}]\t[SKIPPED] (id:{}) [{:.8f}]: {}'
         changed_template = u'{} (Pass 2) {:.3%} [{}]\t          (id:{}) [{:.8f}]: {}'
-        query = cls.select().where(cls.id == release_id)
-        if not query.count():
-            return
-        document = query.get()
-        with systemtools.Timer(verbose=False) as timer:
-            changed = document.resolve_references(corpus)
+        if document is None:
+            query = cls.select().where(cls.id == release_id)
+            if not query.count():
+                return
+            document = query.get()
+        start_time = time.time()
+        changed = document.resolve_references(corpus)
+        elapsed_time = time.time() - start_time
         if not changed:
-            message = skipped_template.format(
+            if cls.log_rows:
+                message = skipped_template.format(
+                    cls.__name__.upper(),
+                    progress,
+                    annotation,
+                    document.id,
+                    elapsed_time,
+                    document.title,
+                    )
+                print(message)
+            return 'skipped'
+        document.save()
+        if cls.log_rows:
+            message = changed_template.format(
                 cls.__name__.upper(),
                 progress,
                 annotation,
                 document.id,
-                timer.elapsed_time,
+                elapsed_time,
                 document.title,
                 )
             print(message)
-            return
-        document.save()
-        message = changed_template.format(
-            cls.__name__.upper(),
-            progress,
-            annotation,
-            document.id,
-            timer.elapsed_time,
-            document.title,
-            )
-        print(message)
+        return 'changed'
 
     @classmethod
     def element_to_artist_credits(cls, element):
@@ -177,11 +398,8 @@ class PostgresRelease(PostgresModel):
         if element is None or not len(element):
             return result
         for subelement in element:
-            data = cls.tags_to_fields(
-                subelement,
-                ignore_none=True,
-                mapping=cls._artists_mapping,
-                )
+            data = cls._artists_extractor(subelement)
+            data = cls.preprocess_data(data, subelement)
             result.append(data)
         return result
 
@@ -191,11 +409,8 @@ class PostgresRelease(PostgresModel):
         if element is None or not len(element):
             return result
         for subelement in element:
-            data = cls.tags_to_fields(
-                subelement,
-                ignore_none=True,
-                mapping=cls._companies_mapping,
-                )
+            data = cls._companies_extractor(subelement)
+            data = cls.preprocess_data(data, subelement)
             result.append(data)
         return result
 
@@ -247,58 +462,14 @@ class PostgresRelease(PostgresModel):
 
     @classmethod
     def element_to_roles(cls, element):
-        def from_text(text):
-            name = ''
-            current_buffer = ''
-            details = []
-            had_detail = False
-            bracket_depth = 0
-            for character in text:
-                if character == '[':
-                    bracket_depth += 1
-                    if bracket_depth == 1 and not had_detail:
-                        name = current_buffer
-                        current_buffer = ''
-                        had_detail = True
-                    elif 1 < bracket_depth:
-                        current_buffer += character
-                elif character == ']':
-                    bracket_depth -= 1
-                    if not bracket_depth:
-                        details.append(current_buffer)
-                        current_buffer = ''
-                    else:
-                        current_buffer += character
-                else:
-                    current_buffer += character
-            if current_buffer and not had_detail:
-                name = current_buffer
-            name = name.strip()
-            detail = ', '.join(_.strip() for _ in details)
-            result = {'name': name}
-            if detail:
-                result['detail'] = detail
-            return result
-        credit_roles = []
         if element is None or not element.text:
-            return credit_roles or None
-        current_text = ''
-        bracket_depth = 0
-        for character in element.text:
-            if character == '[':
-                bracket_depth += 1
-            elif character == ']':
-                bracket_depth -= 1
-            elif not bracket_depth and character == ',':
-                current_text = current_text.strip()
-                if current_text:
-                    credit_roles.append(from_text(current_text))
-                current_text = ''
-                continue
-            current_text += character
-        current_text = current_text.strip()
-        if current_text:
-            credit_roles.append(from_text(current_text))
+            return None
+        credit_roles = []
+        for name, detail in CreditRole.parse_roles(element.text):
+            credit_role = {'name': name}
+            if detail:
+                credit_role['detail'] = detail
+            credit_roles.append(credit_role)
         return credit_roles or None
 
     @classmethod
@@ -307,20 +478,26 @@ class PostgresRelease(PostgresModel):
         if element is None or not len(element):
             return result
         for subelement in element:
-            data = cls.tags_to_fields(
-                subelement,
-                ignore_none=True,
-                mapping=cls._tracks_mapping,
-                )
+            data = cls._tracks_extractor(subelement)
+            data = cls.preprocess_data(data, subelement)
             result.append(data)
         return result
 
     @classmethod
     def from_element(cls, element):
-        data = cls.tags_to_fields(element)
+        data = cls.extract_fields(element)
         data['id'] = int(element.get('id'))
         return cls(**data)
 
+    @classmethod
+    def retract_documents(cls, documents):
+        import discograph
+        entity_keys = set()
+        for document in documents:
+            entity_keys.update(
+                discograph.PostgresRelation.retract_release(document))
+        return entity_keys
+
     def resolve_references(self, corpus, spuriously=False):
         import discograph
         changed = False
@@ -386,3 +563,17 @@ PostgresRelease._tracks_mapping = {
     'extraartists': ('extra_artists',
         PostgresRelease.element_to_artist_credits),
     }
+
+
+PostgresRelease._tags_to_fields_extractor = \
+    PostgresModel.compile_tags_to_fields(
+        PostgresRelease._tags_to_fields_mapping)
+
+PostgresRelease._artists_extractor = PostgresModel.compile_tags_to_fields(
+    PostgresRelease._artists_mapping, ignore_none=True)
+
+PostgresRelease._companies_extractor = PostgresModel.compile_tags_to_fields(
+    PostgresRelease._companies_mapping, ignore_none=True)
+
+PostgresRelease._tracks_extractor = PostgresModel.compile_tags_to_fields(
+    PostgresRelease._tracks_mapping, ignore_none=True)
@@ -4,6 +4,8 @@ import itertools
 import math
 import re
 import six
+import time
+import traceback
 from discograph.library.CreditRole import CreditRole
 from discograph.library.TrellisNode import TrellisNode
 from discograph.library.PostgresEntity import PostgresEntity
@@ -25,6 +27,7 @@ class RelationGrapher(object):
         '_nodes',
         '_relational_roles',
         '_structural_roles',
+        '_year',
         )
 
     roles_to_prune = [
@@ -38,6 +41,10 @@ class RelationGrapher(object):
 
     word_pattern = re.compile('\s+')
 
+    dataset_version_key = 'discograph:dataset-version'
+
+    dataset_version_timeout = 60 * 60 * 24 * 365
+
     ### INITIALIZER ###
 
     def __init__(
@@ -47,6 +54,7 @@ class RelationGrapher(object):
         link_ratio=None,
         max_nodes=None,
         roles=None,
+        year=None,
         ):
         assert isinstance(center_entity, PostgresEntity)
         self._center_entity = center_entity
@@ -81,6 +89,10 @@ class RelationGrapher(object):
                     relational_roles.append(role)
         self._structural_roles = tuple(structural_roles)
         self._relational_roles = tuple(relational_roles)
+        if year is not None and not isinstance(year, int):
+            year = tuple(sorted(int(_) for _ in year))
+            assert len(year) == 2
+        self._year = year
         self._nodes = collections.OrderedDict()
         self._links = {}
         self._should_break_loop = False
@@ -398,6 +410,7 @@ class RelationGrapher(object):
                 lh_entities,
                 rh_entities,
                 roles=self.relational_roles,
+                year=self.year,
                 )
             relations.update(found)
         self._process_relations(relations)
@@ -535,6 +548,7 @@ class RelationGrapher(object):
                     PostgresRelation.search_multi(
                         key_slice,
                         roles=provisional_roles,
+                        year=self.year,
                         )
                     )
 
@@ -583,26 +597,54 @@ class RelationGrapher(object):
 
     @classmethod
     def cache_get(cls, key, use_redis=False):
-        from discograph import app
-        if use_redis:
-            cache = app.rcache
-        else:
-            cache = app.fcache
+        cache = cls.get_cache(use_redis=use_redis)
+        key = cls.make_versioned_cache_key(key, use_redis=use_redis)
         data = cache.get(key)
         #print('CACHE GET: {} [{}]'.format(data is not None, key))
         return data
 
     @classmethod
     def cache_set(cls, key, value, timeout=None, use_redis=False):
-        from discograph import app
         if not timeout:
             timeout = 60 * 60 * 24
-        if use_redis:
-            cache = app.rcache
-        else:
-            cache = app.fcache
+        cache = cls.get_cache(use_redis=use_redis)
+        key = cls.make_versioned_cache_key(key, use_redis=use_redis)
         cache.set(key, value, timeout=timeout)
 
+    @staticmethod
+    def get_cache(use_redis=False):
+        from discograph import app
+        if use_redis:
+            return app.rcache
+        return app.fcache
+
+    @classmethod
+    def get_dataset_version(cls, use_redis=False):
+        cache = cls.get_cache(use_redis=use_redis)
+        return cache.get(cls.dataset_version_key) or 0
+
+    @classmethod
+    def invalidate_cache(cls, version=None):
+        version = version or int(time.time())
+        for use_redis in (False, True):
+            cache = cls.get_cache(use_redis=use_redis)
+            try:
+                cache.set(
+                    cls.dataset_version_key,
+                    version,
+                    timeout=cls.dataset_version_timeout,
+                    )
+            except Exception:
+                print('CACHE [INVALIDATE] FAILED: {}'.format(
+                    type(cache).__name__))
+                traceback.print_exc()
+        return version
+
+    @classmethod
+    def make_versioned_cache_key(cls, key, use_redis=False):
+        version = cls.get_dataset_version(use_redis=use_redis)
+        return '{}@{}'.format(key, version)
+
     ### PUBLIC PROPERTIES ###
 
     @property
@@ -656,3 +698,7 @@ class RelationGrapher(object):
     @property
     def structural_roles(self):
         return self._structural_roles
+
+    @property
+    def year(self):
+        return self._year
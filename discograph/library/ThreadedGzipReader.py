@@ -0,0 +1,125 @@
+# -*- encoding: utf-8 -*-
+import gzip
+import threading
+from six.moves import queue
+
+
+class ThreadedGzipReader(object):
+
+    ### CLASS VARIABLES ###
+
+    __slots__ = (
+        '_block',
+        '_block_offset',
+        '_blocks',
+        '_file_path',
+        '_is_finished',
+        '_position',
+        '_should_stop',
+        '_thread',
+        )
+
+    ### INITIALIZER ###
+
+    def __init__(self, file_path, block_size=4 * 1024 * 1024, max_blocks=8):
+        self._file_path = file_path
+        self._blocks = queue.Queue(maxsize=max_blocks)
+        self._block = b''
+        self._block_offset = 0
+        self._position = 0
+        self._is_finished = False
+        self._should_stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._decompress,
+            args=(block_size,),
+            )
+        self._thread.daemon = True
+        self._thread.start()
+
+    ### SPECIAL METHODS ###
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    ### PRIVATE METHODS ###
+
+    def _decompress(self, block_size):
+        try:
+            with gzip.GzipFile(self._file_path, 'r') as file_pointer:
+                while not self._should_stop.is_set():
+                    block = file_pointer.read(block_size)
+                    self._put(block)
+                    if not block:
+                        return
+        except Exception as e:
+            self._put(e)
+
+    def _next_block(self):
+        if self._is_finished:
+            return False
+        block = self._blocks.get()
+        if isinstance(block, Exception):
+            self._is_finished = True
+            raise block
+        if not block:
+            self._is_finished = True
+            return False
+        self._block = block
+        self._block_offset = 0
+        return True
+
+    def _put(self, block):
+        while not self._should_stop.is_set():
+            try:
+                self._blocks.put(block, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    ### PUBLIC METHODS ###
+
+    def close(self):
+        self._should_stop.set()
+        self._is_finished = True
+        self._thread.join()
+
+    def read(self, size=-1):
+        pieces = []
+        while size < 0 or 0 < size:
+            available = len(self._block) - self._block_offset
+            if not available:
+                if not self._next_block():
+                    break
+                continue
+            if size < 0 or available <= size:
+                piece = self._block[self._block_offset:]
+            else:
+                piece = self._block[
+                    self._block_offset:self._block_offset + size]
+            self._block_offset += len(piece)
+            self._position += len(piece)
+            pieces.append(piece)
+            if 0 < size:
+                size -= len(piece)
+        return b''.join(pieces)
+
+    def seek(self, offset, whence=0):
+        assert whence == 0
+        if offset < self._position:
+            raise IOError('Backward seeks are not supported.')
+        while self._position < offset:
+            if not self.read(min(offset - self._position, 1024 * 1024)):
+                break
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    ### PUBLIC PROPERTIES ###
+
+    @property
+    def file_path(self):
+        return self._file_path
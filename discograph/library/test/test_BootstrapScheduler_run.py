@@ -0,0 +1,42 @@
+# -*- encoding: utf-8 -*-
+import discograph
+import pytest
+
+
+def procedure(task, context, annotation, telemetry):
+    start, stop = task
+    if start == 30:
+        raise ValueError(task)
+    for _ in range(start, stop):
+        telemetry.record(0.001, 'changed')
+    return stop - start
+
+
+class Test(discograph.DiscographTestCase):
+
+    def test_01(self):
+        tasks = [(start, start + 10) for start in range(100, 200, 10)]
+        scheduler = discograph.BootstrapScheduler(
+            procedure,
+            tasks,
+            processes=3,
+            name='TEST',
+            )
+        assert scheduler.run() == 10
+        assert not scheduler.is_cancelled
+
+    def test_02(self):
+        scheduler = discograph.BootstrapScheduler(procedure, [], processes=3)
+        assert scheduler.run() == 0
+
+    def test_03(self):
+        tasks = [(start, start + 10) for start in range(0, 100, 10)]
+        scheduler = discograph.BootstrapScheduler(procedure, tasks, processes=2)
+        with pytest.raises(RuntimeError):
+            scheduler.run()
+        assert scheduler.failed_tasks == [(30, 40)]
+        telemetry = scheduler.get_telemetry()
+        assert telemetry.get_count('tasks') == 10
+        assert telemetry.get_count('errors') == 1
+        assert telemetry.get_count('rows') == 90
+        assert telemetry.get_count('changed') == 90
@@ -0,0 +1,68 @@
+# -*- encoding: utf-8 -*-
+import discograph
+import pytest
+
+
+def make_procedure(name, log, fail=False):
+    def procedure(resume=False, processes=None):
+        if fail:
+            raise ValueError(name)
+        log.append((name, processes))
+    return procedure
+
+
+def make_graph(log, processes=4):
+    graph = discograph.BootstrapStageGraph(processes=processes)
+    graph.add_stage('a', make_procedure('a', log))
+    graph.add_stage('b', make_procedure('b', log))
+    graph.add_stage(
+        'c', make_procedure('c', log), dependencies=('a',), parallel=False)
+    graph.add_stage('d', make_procedure('d', log), dependencies=('b', 'c'))
+    return graph
+
+
+class Test(discograph.DiscographTestCase):
+
+    def test_01(self):
+        log = []
+        graph = make_graph(log, processes=1)
+        assert graph.run() == ['a', 'b', 'c', 'd']
+        assert log == [('a', 1), ('b', 1), ('c', None), ('d', 1)]
+
+    def test_02(self):
+        graph = make_graph([])
+        assert graph.run() == ['a', 'b', 'c', 'd']
+        assert graph.run(only=['c'], skip=['a']) == ['c']
+
+    def test_03(self):
+        graph = make_graph([])
+        with pytest.raises(ValueError):
+            graph.add_stage('e', None, dependencies=('f',))
+        with pytest.raises(ValueError):
+            graph.add_stage('a', None)
+        with pytest.raises(ValueError):
+            graph.run(only=['c'])
+        assert graph.get_dependents(['c']) == ['c', 'd']
+        pending, rerun = graph.get_pending(rerun=['b'])
+        assert pending == ['a', 'b', 'c', 'd']
+        assert rerun == set(['b', 'd'])
+
+    def test_04(self):
+        log = []
+        graph = make_graph(log)
+        graph.add_stage(
+            'e', make_procedure('e', log, fail=True), dependencies=('a',))
+        graph.add_stage('f', make_procedure('f', log), dependencies=('e',))
+        with pytest.raises(RuntimeError):
+            graph.run()
+
+    def test_05(self):
+        state = discograph.PostgresBootstrapState
+        state.drop_table(True)
+        graph = discograph.BootstrapStageGraph(processes=1, state=state)
+        graph.add_stage('a', make_procedure('a', []))
+        graph.add_stage('b', make_procedure('b', []), dependencies=('a',))
+        pending, rerun = graph.get_pending(rerun=['a'])
+        assert pending == ['a', 'b']
+        assert not any(graph.get_status().values())
+        assert not state.table_exists()
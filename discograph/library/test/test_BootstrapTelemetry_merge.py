@@ -0,0 +1,46 @@
+# -*- encoding: utf-8 -*-
+import discograph
+
+
+class Test(discograph.DiscographTestCase):
+
+    def test_01(self):
+        telemetry_one = discograph.BootstrapTelemetry(name='ONE')
+        telemetry_one.record(0.001, 'changed')
+        telemetry_one.record(0.002, 'skipped')
+        telemetry_two = discograph.BootstrapTelemetry(name='TWO')
+        telemetry_two.record(0.5, 'changed')
+        telemetry_two.increment('errors')
+        telemetry = discograph.BootstrapTelemetry()
+        telemetry.merge(telemetry_one).merge(telemetry_two.as_dict())
+        assert telemetry.get_count('rows') == 3
+        assert telemetry.get_count('changed') == 2
+        assert telemetry.get_count('skipped') == 1
+        assert telemetry.get_count('errors') == 1
+
+    def test_02(self):
+        telemetry = discograph.BootstrapTelemetry()
+        assert telemetry.percentile(0.5) is None
+        for _ in range(99):
+            telemetry.record(0.001)
+        telemetry.record(1.0)
+        assert 0.0009 < telemetry.percentile(0.5) < 0.0011
+        assert 0.0009 < telemetry.percentile(0.99) < 0.0011
+        assert 0.9 < telemetry.percentile(1.0) < 1.1
+
+    def test_03(self):
+        telemetry = discograph.BootstrapTelemetry(name='TEST')
+        telemetry.record(0.25, 'changed', amount=10)
+        copied = discograph.BootstrapTelemetry.from_dict(telemetry.as_dict())
+        assert copied.name == 'TEST'
+        assert copied.as_dict()['counters'] == {'changed': 10, 'rows': 10}
+        assert copied.percentile(0.5) == telemetry.percentile(0.5)
+
+    def test_04(self):
+        telemetry = discograph.BootstrapTelemetry()
+        telemetry.record(1.0, 'changed', amount=1000)
+        telemetry.record(0.1)
+        assert telemetry.get_count('rows') == 1001
+        assert 0.0009 < telemetry.percentile(0.5) < 0.0011
+        assert 0.0009 < telemetry.percentile(0.99) < 0.0011
+        assert 0.09 < telemetry.percentile(1.0) < 0.11
@@ -0,0 +1,26 @@
+# -*- encoding: utf-8 -*-
+import discograph
+import pytest
+
+
+class Test(discograph.DiscographTestCase):
+
+    def tearDown(self):
+        discograph.BootstrapThrottle.set_duty_cycle(1.)
+
+    def test_01(self):
+        assert discograph.BootstrapThrottle.get_pause(2.) == 0.
+        assert discograph.BootstrapThrottle.pause(2.) == 0.
+
+    def test_02(self):
+        discograph.BootstrapThrottle.set_duty_cycle(0.25)
+        assert discograph.BootstrapThrottle.get_pause(0.) == 0.
+        assert discograph.BootstrapThrottle.get_pause(1.) == 3.
+        assert discograph.BootstrapThrottle.get_pause(1000.) == \
+            discograph.BootstrapThrottle.maximum_pause
+
+    def test_03(self):
+        with pytest.raises(ValueError):
+            discograph.BootstrapThrottle.set_duty_cycle(0.)
+        with pytest.raises(ValueError):
+            discograph.BootstrapThrottle.set_duty_cycle(1.5)
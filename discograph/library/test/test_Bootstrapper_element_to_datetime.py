@@ -59,3 +59,17 @@ class Test(discograph.DiscographTestCase):
         date_string = ''
         date = discograph.Bootstrapper.parse_release_date(date_string)
         assert date is None
+
+    def test_12(self):
+        bootstrapper = discograph.Bootstrapper
+        for date_string in bootstrapper.release_date_samples * 2:
+            date = bootstrapper.parse_release_date_cached(date_string)
+            assert date == bootstrapper.parse_release_date(date_string)
+
+    def test_13(self):
+        bootstrapper = discograph.Bootstrapper
+        count = bootstrapper.malformed_release_date_count
+        assert bootstrapper.parse_release_date_cached('2015-13-14') is None
+        assert bootstrapper.parse_release_date_cached('2015-13-14') is None
+        assert bootstrapper.parse_release_date_cached('????') is None
+        assert bootstrapper.malformed_release_date_count == count + 2
@@ -0,0 +1,63 @@
+# -*- encoding: utf-8 -*-
+import discograph
+import io
+
+
+class Test(discograph.DiscographTestCase):
+
+    source = b'''<releases>
+        <release id="1">
+            <title>Anti EP</title>
+            <notes>Printed on sticker placed as a seal.</notes>
+            <formats><format name="Vinyl" qty="1" /></formats>
+            <identifiers>
+                <identifier type="Matrix / Runout" value="AUT 001 A" />
+            </identifiers>
+            <tracklist>
+                <track>
+                    <position>A1</position>
+                    <title>Lost</title>
+                    <extraartists><artist><id>42</id></artist></extraartists>
+                </track>
+            </tracklist>
+        </release>
+        <release id="2"><title>Incunabula</title></release>
+    </releases>'''
+
+    def test_01(self):
+        iterator = discograph.Bootstrapper.iterparse(
+            io.BytesIO(self.source), 'release', profile='full')
+        elements = list(iterator)
+        assert [_.get('id') for _ in elements] == ['1', '2']
+        assert elements[0].find('notes') is not None
+        assert elements[0].find('tracklist/track/title') is not None
+
+    def test_02(self):
+        iterator = discograph.Bootstrapper.iterparse(
+            io.BytesIO(self.source), 'release', profile='graph-only')
+        elements = list(iterator)
+        assert [_.get('id') for _ in elements] == ['1', '2']
+        assert elements[0].find('title').text == 'Anti EP'
+        assert elements[0].find('notes') is None
+        track = elements[0].find('tracklist/track')
+        assert [_.tag for _ in track] == ['extraartists']
+        assert track.find('extraartists/artist/id').text == '42'
+
+    def test_03(self):
+        for profile, fields, track_fields in (
+            (
+                'full',
+                ['formats', 'identifiers', 'title', 'tracklist'],
+                ['extra_artists', 'position', 'title'],
+                ),
+            (
+                'graph-only',
+                ['title', 'tracklist'],
+                ['extra_artists'],
+                ),
+            ):
+            iterator = discograph.Bootstrapper.iterparse(
+                io.BytesIO(self.source), 'release', profile=profile)
+            data = discograph.PostgresRelease.extract_fields(next(iterator))
+            assert sorted(data) == fields
+            assert sorted(data['tracklist'][0]) == track_fields
@@ -0,0 +1,40 @@
+# -*- encoding: utf-8 -*-
+import datetime
+import discograph
+
+
+class Test(discograph.DiscographTestCase):
+
+    def test_01(self):
+        field = discograph.PostgresRelease.title
+        assert discograph.BulkLoader.encode_value(field, None) == u'\\N'
+
+    def test_02(self):
+        field = discograph.PostgresRelease.title
+        value = u'Tab\there\nNew line \\ backslash'
+        encoded = discograph.BulkLoader.encode_value(field, value)
+        assert encoded == u'Tab\\there\\nNew line \\\\ backslash'
+
+    def test_03(self):
+        field = discograph.PostgresRelease.genres
+        value = ['Electronic', 'Folk, World, & Country', 'Say "Hi"']
+        encoded = discograph.BulkLoader.encode_value(field, value)
+        assert encoded == (
+            u'{"Electronic","Folk, World, & Country","Say \\\\"Hi\\\\""}'
+            )
+
+    def test_04(self):
+        field = discograph.PostgresRelease.labels
+        value = [{'name': 'Warp\tRecords'}]
+        encoded = discograph.BulkLoader.encode_value(field, value)
+        assert encoded == u'[{"name": "Warp\\\\tRecords"}]'
+
+    def test_05(self):
+        field = discograph.PostgresRelease.release_date
+        value = datetime.datetime(1989, 6, 23)
+        encoded = discograph.BulkLoader.encode_value(field, value)
+        assert encoded == u'1989-06-23T00:00:00'
+
+    def test_06(self):
+        field = discograph.PostgresRelease.id
+        assert discograph.BulkLoader.encode_value(field, 157) == u'157'
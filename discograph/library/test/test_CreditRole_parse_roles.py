@@ -0,0 +1,42 @@
+# -*- encoding: utf-8 -*-
+import discograph
+
+
+class Test(discograph.DiscographTestCase):
+
+    def test_01(self):
+        roles = discograph.CreditRole.parse_roles(
+            'Engineer [Remix] [Assistant], Producer')
+        assert roles == (
+            ('Engineer', 'Remix, Assistant'),
+            ('Producer', None),
+            )
+
+    def test_02(self):
+        roles = discograph.CreditRole.parse_roles(
+            'Performer [Enigmatic [K] Voice, Moog], , Lyrics By ')
+        assert roles == (
+            ('Performer', 'Enigmatic [K] Voice, Moog'),
+            ('Lyrics By', None),
+            )
+
+    def test_03(self):
+        text = 'Written-By, Producer'
+        roles = discograph.CreditRole.parse_roles(text)
+        assert discograph.CreditRole.parse_roles(text) is roles
+        assert isinstance(roles, tuple)
+
+    def test_04(self):
+        credit_role_class = discograph.CreditRole
+        original_cache_size = credit_role_class._role_cache_size
+        try:
+            credit_role_class._role_cache_size = 2
+            credit_role_class._role_cache.clear()
+            credit_role_class.parse_roles('Bass')
+            credit_role_class.parse_roles('Drums')
+            credit_role_class.parse_roles('Bass')
+            credit_role_class.parse_roles('Guitar')
+            assert list(credit_role_class._role_cache) == ['Bass', 'Guitar']
+        finally:
+            credit_role_class._role_cache_size = original_cache_size
+            credit_role_class._role_cache.clear()
@@ -0,0 +1,38 @@
+# -*- encoding: utf-8 -*-
+import os
+import tempfile
+import discograph
+
+
+class Test(discograph.DiscographTestCase):
+
+    def setUp(self):
+        file_descriptor, self.corpus_path = tempfile.mkstemp()
+        os.close(file_descriptor)
+
+    def tearDown(self):
+        os.remove(self.corpus_path)
+
+    def test_01(self):
+        rows = [
+            (1, u'Seefeel', 2239),
+            (1, u'Seefeel', 1121),
+            (1, u'Björk', 97),
+            (2, u'Warp Records', 23528),
+            ]
+        discograph.EntityCorpus.build(self.corpus_path, rows=rows)
+        with discograph.EntityCorpus(self.corpus_path) as corpus:
+            assert len(corpus) == 3
+            assert corpus[(1, u'Seefeel')] == 1121
+            assert corpus[(1, u'Björk')] == 97
+            assert corpus.get((2, u'Warp Records')) == 23528
+            assert (2, u'Seefeel') not in corpus
+            assert corpus.get((1, u'Aphex Twin')) is None
+
+    def test_02(self):
+        discograph.EntityCorpus.build(self.corpus_path, rows=[])
+        with discograph.EntityCorpus(self.corpus_path) as corpus:
+            assert len(corpus) == 0
+            assert (2, u'Warp Records') not in corpus
+            corpus[(2, u'Warp Records')] = -1
+            assert corpus[(2, u'Warp Records')] == -1
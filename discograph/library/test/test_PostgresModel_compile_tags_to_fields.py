@@ -0,0 +1,58 @@
+# -*- encoding: utf-8 -*-
+import discograph
+try:
+    from xml.etree import cElementTree as ElementTree
+except ImportError:
+    from xml.etree import ElementTree
+
+
+class Test(discograph.DiscographTestCase):
+
+    def test_01(self):
+        element = ElementTree.fromstring('''
+            <release id="1">
+                <title>Stockholm</title>
+                <country />
+                <master_id>5427</master_id>
+                <genres><genre>Electronic</genre></genres>
+                <styles />
+                <unknown>Ignored</unknown>
+            </release>
+            ''')
+        mapping = discograph.PostgresRelease._tags_to_fields_mapping
+        extractor = discograph.PostgresModel.compile_tags_to_fields(mapping)
+        data = extractor(element)
+        assert data == {
+            'country': None,
+            'genres': ['Electronic'],
+            'master_id': 5427,
+            'styles': None,
+            'title': 'Stockholm',
+            }
+        assert data == discograph.PostgresRelease.tags_to_fields(element)
+
+    def test_02(self):
+        element = ElementTree.fromstring('''
+            <artist>
+                <id>2</id>
+                <name>Mr. James Barth &amp; A.D.</name>
+                <anv />
+                <join>,</join>
+                <role>Producer, Written-By [Lyrics]</role>
+            </artist>
+            ''')
+        mapping = discograph.PostgresRelease._artists_mapping
+        extractor = discograph.PostgresModel.compile_tags_to_fields(
+            mapping, ignore_none=True)
+        data = extractor(element)
+        assert data == {
+            'id': 2,
+            'join': ',',
+            'name': 'Mr. James Barth & A.D.',
+            'roles': [
+                {'name': 'Producer'},
+                {'name': 'Written-By', 'detail': 'Lyrics'},
+                ],
+            }
+        assert data == discograph.PostgresRelease.tags_to_fields(
+            element, ignore_none=True, mapping=mapping)
@@ -0,0 +1,26 @@
+# -*- encoding: utf-8 -*-
+import peewee
+import discograph
+
+
+class Test(discograph.DiscographTestCase):
+
+    def test_01(self):
+        one = {'name': 'Seefeel', 'entity_type': 1, 'entity_id': 2239}
+        two = {'entity_id': 2239, 'entity_type': 1, 'name': 'Seefeel'}
+        hash_one = discograph.PostgresModel.get_content_hash(one)
+        hash_two = discograph.PostgresModel.get_content_hash(two)
+        assert hash_one == hash_two
+        assert -2 ** 63 <= hash_one < 2 ** 63
+
+    def test_02(self):
+        one = {'name': 'Seefeel'}
+        two = {'name': 'Seefeel', 'search_content': peewee.fn.to_tsvector('x')}
+        assert discograph.PostgresModel.get_content_hash(one) == \
+            discograph.PostgresModel.get_content_hash(two)
+
+    def test_03(self):
+        one = {'name': 'Seefeel'}
+        two = {'name': 'Seefeel ', 'search_content': None}
+        assert discograph.PostgresModel.get_content_hash(one) != \
+            discograph.PostgresModel.get_content_hash(two)
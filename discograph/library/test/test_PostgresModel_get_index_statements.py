@@ -0,0 +1,60 @@
+# -*- encoding: utf-8 -*-
+import discograph
+
+
+class Test(discograph.DiscographTestCase):
+
+    def test_01(self):
+        statements = dict(
+            discograph.PostgresRelation.get_index_statements())
+        assert len(statements) == 4
+        assert statements['relations_random'] == (
+            'CREATE INDEX IF NOT EXISTS relations_random '
+            'ON relations (random)'
+            )
+        index_name = (
+            'relations_entity_two_type_entity_two_id_first_year_last_year')
+        assert statements[index_name] == (
+            'CREATE INDEX IF NOT EXISTS {} ON relations '
+            '(entity_two_type, entity_two_id, first_year, last_year)'
+            ).format(index_name)
+        index_name = [
+            _ for _ in statements
+            if _ != 'relations_random' and 'first_year' not in _
+            ][0]
+        assert len(index_name) <= 64
+        assert statements[index_name] == (
+            'CREATE UNIQUE INDEX IF NOT EXISTS {} ON relations '
+            '(entity_two_type, entity_two_id, entity_one_type, '
+            'entity_one_id, role)'
+            ).format(index_name)
+
+    def test_02(self):
+        statements = dict(discograph.PostgresEntity.get_index_statements())
+        assert sorted(statements) == [
+            'entities_name',
+            'entities_random',
+            'entities_search_content',
+            ]
+        assert statements['entities_name'] == (
+            'CREATE INDEX IF NOT EXISTS entities_name ON entities (name)')
+
+    def test_03(self):
+        model_class = discograph.PostgresRelationRelease
+        assert 'random' not in model_class._meta.fields
+        statements = dict(model_class.get_index_statements())
+        assert len(statements) == 2
+        assert statements['relation_releases_release_id'] == (
+            'CREATE INDEX IF NOT EXISTS relation_releases_release_id '
+            'ON relation_releases (release_id)'
+            )
+        index_name = [
+            _ for _ in statements
+            if _ != 'relation_releases_release_id'
+            ][0]
+        assert len(index_name) <= 64
+        assert statements[index_name] == (
+            'CREATE UNIQUE INDEX IF NOT EXISTS {} ON relation_releases '
+            '(entity_one_type, entity_one_id, entity_two_type, '
+            'entity_two_id, role, master_id)'
+            ).format(index_name)
@@ -0,0 +1,37 @@
+# -*- encoding: utf-8 -*-
+import discograph
+
+
+class Test(discograph.DiscographTestCase):
+
+    def test_01(self):
+        entity_class = discograph.PostgresEntity
+        where = entity_class.entity_type == 1
+        query = entity_class.select(entity_class.entity_id).where(where)
+        query = query.order_by(entity_class.entity_id)
+        expected = [_[0] for _ in query.tuples()]
+        documents = entity_class.iterate_by_key(
+            entity_class,
+            entity_class.entity_id,
+            where=where,
+            batch_size=3,
+            )
+        actual = [_.entity_id for _ in documents]
+        assert actual == expected
+
+    def test_02(self):
+        release_class = discograph.PostgresRelease
+        query = release_class.select(release_class.id)
+        query = query.order_by(release_class.id)
+        all_ids = [_[0] for _ in query.tuples()]
+        start, stop = all_ids[1], all_ids[-1]
+        expected = [_ for _ in all_ids if start <= _ < stop]
+        documents = release_class.iterate_by_key(
+            release_class,
+            release_class.id,
+            start=start,
+            stop=stop,
+            batch_size=2,
+            )
+        actual = [_.id for _ in documents]
+        assert actual == expected
@@ -0,0 +1,24 @@
+# -*- encoding: utf-8 -*-
+import discograph
+
+
+class Test(discograph.DiscographTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.setUpTestDB()
+
+    def test_01(self):
+        relation_class = discograph.PostgresRelation
+        relation_release_class = discograph.PostgresRelationRelease
+        query = relation_class.select().where(
+            relation_class.release_count > 0).limit(100)
+        relations = list(query)
+        assert relations
+        for relation in relations:
+            summary = relation_release_class.get_relation_summary(relation)
+            assert summary == (
+                relation.first_year,
+                relation.last_year,
+                relation.release_count,
+                )
@@ -0,0 +1,114 @@
+# -*- encoding: utf-8 -*-
+import heapq
+import discograph
+
+
+class Test(discograph.DiscographTestCase):
+
+    def test_01(self):
+        run_one = sorted([
+            (1, 1, 2, 5, 'Released On', 0, 10, 1999, (10,)),
+            (1, 2, 1, 3, 'Remix', 0, 10, 1999, (10,)),
+            ])
+        run_two = sorted([
+            (1, 1, 2, 5, 'Released On', 0, 11, None, (11,)),
+            (1, 1, 2, 5, 'Producer', 0, 11, None, (11,)),
+            ])
+        records = heapq.merge(run_one, run_two)
+        relations = list(
+            discograph.PostgresRelation.fold_relation_records(records))
+        for relation in relations:
+            assert 0 <= relation.pop('random') < 1
+        assert relations == [
+            {
+                'entity_one_type': 1,
+                'entity_one_id': 1,
+                'entity_two_type': 2,
+                'entity_two_id': 5,
+                'role': 'Producer',
+                'first_year': None,
+                'last_year': None,
+                'release_count': 1,
+                'releases': [(None, 11, None, (11,))],
+                },
+            {
+                'entity_one_type': 1,
+                'entity_one_id': 1,
+                'entity_two_type': 2,
+                'entity_two_id': 5,
+                'role': 'Released On',
+                'first_year': 1999,
+                'last_year': 1999,
+                'release_count': 2,
+                'releases': [
+                    (None, 10, 1999, (10,)),
+                    (None, 11, None, (11,)),
+                    ],
+                },
+            {
+                'entity_one_type': 1,
+                'entity_one_id': 2,
+                'entity_two_type': 1,
+                'entity_two_id': 3,
+                'role': 'Remix',
+                'first_year': 1999,
+                'last_year': 1999,
+                'release_count': 1,
+                'releases': [(None, 10, 1999, (10,))],
+                },
+            ]
+
+    def test_02(self):
+        run_one = sorted([
+            (1, 1, 2, 5, 'Released On', 7, 10, 1999, (10,)),
+            (1, 1, 2, 5, 'Released On', 7, 12, 1987, (12,)),
+            (1, 1, 2, 5, 'Released On', 7, 14, None, (14,)),
+            (1, 1, 2, 5, 'Released On', 0, 16, 2001, (16,)),
+            ])
+        run_one = list(
+            discograph.PostgresRelation.fold_master_records(run_one))
+        assert run_one == [
+            (1, 1, 2, 5, 'Released On', 0, 16, 2001, (16,)),
+            (1, 1, 2, 5, 'Released On', 7, 10, 1987, (10, 12, 14)),
+            ]
+        run_two = sorted([
+            (1, 1, 2, 5, 'Released On', 7, 11, 1985, (11,)),
+            (1, 1, 2, 5, 'Released On', 8, 13, None, (13,)),
+            ])
+        records = heapq.merge(run_one, run_two)
+        relations = list(
+            discograph.PostgresRelation.fold_relation_records(records))
+        for relation in relations:
+            assert 0 <= relation.pop('random') < 1
+        assert relations == [
+            {
+                'entity_one_type': 1,
+                'entity_one_id': 1,
+                'entity_two_type': 2,
+                'entity_two_id': 5,
+                'role': 'Released On',
+                'first_year': 1985,
+                'last_year': 2001,
+                'release_count': 6,
+                'releases': [
+                    (None, 16, 2001, (16,)),
+                    (7, 10, 1985, (10, 11, 12, 14)),
+                    (8, 13, None, (13,)),
+                    ],
+                },
+            ]
+
+    def test_03(self):
+        records = sorted([
+            (1, 1, 2, 5, 'Released On', 7, 12, 1987, (12,)),
+            (1, 1, 2, 5, 'Released On', 7, 10, 1999, (10, 12)),
+            (1, 1, 2, 5, 'Released On', 7, 12, 1987, (12,)),
+            ])
+        records = list(
+            discograph.PostgresRelation.fold_master_records(records))
+        assert records == [
+            (1, 1, 2, 5, 'Released On', 7, 10, 1987, (10, 12)),
+            ]
+        relations = list(
+            discograph.PostgresRelation.fold_relation_records(records))
+        assert relations[0]['release_count'] == 2
@@ -1733,3 +1733,19 @@ class Test(discograph.DiscographTestCase):
                 },
             ]
         assert actual == expected
+
+    def test_06(self):
+        iterator = Bootstrapper.get_iterator('release')
+        for _ in range(2):
+            release_element = next(iterator)
+        release_document = discograph.PostgresRelease.from_element(release_element)
+        release_document.resolve_references({}, spuriously=True)
+        expected = discograph.PostgresRelation.from_release(release_document)
+        truncated_release_count = \
+            discograph.PostgresRelation.truncated_release_count
+        actual = discograph.PostgresRelation.from_release(
+            release_document, max_triples=3)
+        assert len(actual) < len(expected)
+        assert all(_ in expected for _ in actual)
+        assert discograph.PostgresRelation.truncated_release_count == \
+            truncated_release_count + 1
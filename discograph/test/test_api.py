@@ -21,6 +21,24 @@ class TestCase(unittest.TestCase):
         response = self.app.get('/api/label/network/1')
         assert response.status == '200 OK'
 
+    def test_network_04(self):
+        response = self.app.get('/api/artist/network/32550?year=1990-1995')
+        assert response.status == '200 OK'
+
+    def test_parse_request_args_01(self):
+        from werkzeug.datastructures import MultiDict
+        args = MultiDict([
+            ('year', '1995-1990'),
+            ('roles[]', 'Alias'),
+            ('roles[]', 'Not A Role'),
+            ])
+        assert discograph.helpers.parse_request_args(args) == (
+            ['Alias'], (1990, 1995))
+        args = MultiDict([('year', '1999')])
+        assert discograph.helpers.parse_request_args(args) == ([], 1999)
+        args = MultiDict([('year', 'nineteen')])
+        assert discograph.helpers.parse_request_args(args) == ([], None)
+
     def test_search_01(self):
         response = self.app.get('/api/search/Morris')
         assert response.status == '200 OK'